@@ -0,0 +1,17 @@
+from IA_V2.conversations import storage_fs as store
+
+
+def convert_all():
+    print("=== Conversion des conversations texte en JSONL ===")
+    items = store.list_index_items_sorted()
+    print(f"[INFO] {len(items)} conversations dans l'index.")
+
+    stats = store.convert_all_to_jsonl()
+    store.flush_index()
+
+    print(f"[OK] {stats['converted']} converties, {stats['skipped']} déjà en JSONL, {stats['failed']} en échec.")
+    print("[DONE] Conversion terminée.")
+
+
+if __name__ == "__main__":
+    convert_all()
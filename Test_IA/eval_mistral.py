@@ -5,6 +5,7 @@ from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from ollama_api import query_ollama
+from config import OLLAMA_DETERMINISTIC_OPTIONS
 
 # ==== Cas de test hardcodés ====
 TESTS = {
@@ -109,7 +110,8 @@ def calcul_z_score(mistral_score, gpt_score):
     return (mistral_score - gpt_score) / sigma
 
 # ==== Évaluation complète ====
-def exécuter_tests():
+def exécuter_tests(query=query_ollama, chemin_rapport=None):
+    """query : fonction d'appel (client dédié) ; options déterministes => cache."""
     rapport = []
     scores_totaux = {}
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -127,7 +129,7 @@ def exécuter_tests():
             print(f"Prompt : {prompt.strip()[:120]}{'...' if len(prompt) > 120 else ''}")
             rapport.append(f"\n--- Test {i} ---\nPrompt : {prompt}")
 
-            réponse = query_ollama(prompt)
+            réponse = query(prompt, options=OLLAMA_DETERMINISTIC_OPTIONS)
             print(f"📨 Réponse reçue : {réponse.strip()[:80]}{'...' if len(réponse.strip()) > 80 else ''}")
 
             rapport.append(f"Réponse : {réponse}")
@@ -155,8 +157,7 @@ def exécuter_tests():
     rapport.append(f"\nNote globale moyenne : {note_moyenne:.1f}/10")
 
     # ==== Sauvegarde ====
-    dossier = os.path.dirname(__file__)
-    chemin = os.path.join(dossier, "rapport_evaluation_mistral.txt")
+    chemin = chemin_rapport or os.path.join(os.path.dirname(__file__), "rapport_evaluation_mistral.txt")
     with open(chemin, "w", encoding="utf-8") as f:
         f.write("\n".join(rapport))
 
@@ -0,0 +1,16 @@
+from IA_V2.conversations import storage_fs as store
+
+
+def migrate_all():
+    print("=== Rangement des conversations en sous-dossiers AAAA-MM ===")
+    items = store.list_index_items_sorted()
+    print(f"[INFO] {len(items)} conversations dans l'index.")
+
+    stats = store.migrate_all_to_shards()
+
+    print(f"[OK] {stats['moved']} déplacées, {stats['skipped']} déjà rangées, {stats['failed']} en échec.")
+    print("[DONE] Migration terminée.")
+
+
+if __name__ == "__main__":
+    migrate_all()
@@ -19,9 +19,9 @@ def repair_index_and_files():
     for item in items:
         conv_file = item.get("file")
         conv_id = item.get("id")
-        txt_path = os.path.join(store.CONVERSATION_DIR, conv_file) if conv_file else None
+        txt_path = os.path.join(store.item_dir(item), conv_file) if conv_file else None
 
-        if not conv_file or not os.path.exists(txt_path):
+        if not conv_file or not (os.path.exists(txt_path) or os.path.exists(txt_path + store.ARCHIVE_EXT)):
             print(f"[REMOVE] {conv_id} - {conv_file} (fichier introuvable)")
             removed_count += 1
             continue
@@ -60,13 +60,23 @@ def repair_index_and_files():
     store.save_index(idx)
     print(f"[OK] Index nettoyé. {removed_count} entrées supprimées, {fixed_meta_count} métadonnées corrigées.")
 
-    # 4. Suppression des fichiers orphelins
-    all_files = set(os.listdir(store.CONVERSATION_DIR))
-    used_files = {it["file"] for it in new_items if "file" in it} | {it["meta"] for it in new_items if "meta" in it}
+    # 4. Suppression des fichiers orphelins (racine + sous-dossiers AAAA-MM),
+    #    seuls les fichiers de conversation sont candidats
+    all_files = {
+        os.path.join(d, f) for d in store.storage_dirs() for f in os.listdir(d)
+        if f.endswith(store.CONV_EXT) or f.startswith((f"{store.CONV_PREFIX}_", ".tmp_"))
+    }
+    used_files = set()
+    for it in new_items:
+        d = store.item_dir(it)
+        used_files.update(os.path.join(d, it[k]) for k in ("file", "meta") if it.get(k))
+        if it.get("file"):
+            used_files.add(os.path.join(d, it["file"] + store.ARCHIVE_EXT))
+        used_files.add(store.offsets_path(it["id"]))
 
     orphan_files = all_files - used_files
-    for orphan in orphan_files:
-        orphan_path = os.path.join(store.CONVERSATION_DIR, orphan)
+    for orphan_path in orphan_files:
+        orphan = os.path.relpath(orphan_path, store.CONVERSATION_DIR)
         try:
             os.remove(orphan_path)
             print(f"[DELETE] Fichier orphelin supprimé : {orphan}")
@@ -0,0 +1,85 @@
+import glob
+import os
+import tempfile
+import threading
+import time
+from api_trace import RequestTrace, TraceLogger, summarize
+
+
+def _read_all(path):
+    text = ""
+    for p in sorted(glob.glob(path + "*")):
+        with open(p, encoding="utf-8") as f:
+            text += f.read()
+    return text
+
+
+def run_tests():
+    print("=== TEST TRACE API (ÉCRITURE EN FOND) ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "api_trace.log")
+
+        # 1. Écriture non bloquante depuis plusieurs threads, rien de perdu
+        print("\n[TEST] 4 threads x 2000 lignes")
+        logger = TraceLogger(path, max_bytes=0)
+
+        def worker(n):
+            for i in range(2000):
+                logger.write(f"[TOKEN] t{n}-{i}")
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        logger.flush()
+        lines = _read_all(path).splitlines()
+        assert len(lines) == 8000 and logger.dropped == 0, f"[FAIL] {len(lines)} lignes écrites"
+        assert any(l.endswith("[TOKEN] t3-1999") for l in lines), "[FAIL] Contenu"
+        logger.close()
+        print(f"[OK] 8000 lignes en file en {elapsed * 1000:.0f} ms, toutes écrites.")
+
+        # 2. Rotation par taille
+        print("\n[TEST] Rotation")
+        rot = os.path.join(tmp, "rot.log")
+        logger = TraceLogger(rot, max_bytes=20_000, backups=2)
+        for i in range(3000):
+            logger.write(f"ligne {i:05d} " + "x" * 40)
+            if i % 500 == 0:
+                logger.flush()
+        logger.close()
+        files = sorted(os.path.basename(p) for p in glob.glob(rot + "*"))
+        assert files == ["rot.log", "rot.log.1", "rot.log.2"], f"[FAIL] Fichiers : {files}"
+        assert "ligne 02999" in _read_all(rot), "[FAIL] Dernières lignes absentes"
+        print(f"[OK] {files}")
+
+        # 3. Payload volumineux : une ligne courte avec empreinte
+        print("\n[TEST] Troncature des payloads")
+        doc = "contenu du document joint " * 40_000
+        payload = {"model": "m", "messages": [{"role": "system", "content": doc}, {"role": "user", "content": "Bonjour"}]}
+        small = summarize(payload, max_chars=200)
+        assert small["messages"][1]["content"] == "Bonjour", "[FAIL] Texte court modifié"
+        assert len(small["messages"][0]["content"]) < 300 and "sha1:" in small["messages"][0]["content"], "[FAIL] Troncature"
+        assert summarize(payload, 200) == small, "[FAIL] Empreinte instable"
+        print(f"[OK] {len(doc)} caractères -> {len(small['messages'][0]['content'])}.")
+
+        # 4. Échantillonnage : requête non tirée muette, sauf erreurs
+        print("\n[TEST] Échantillonnage")
+        sp = os.path.join(tmp, "sample.log")
+        logger = TraceLogger(sp)
+        skipped = RequestTrace(logger, sampled=False)
+        skipped.line("[OUTGOING] POST")
+        skipped.json("[PAYLOAD]", payload)
+        skipped.error("[ERROR] connexion refusée")
+        logger.close()
+        text = _read_all(sp)
+        assert "OUTGOING" not in text and "PAYLOAD" not in text and "[ERROR]" in text, f"[FAIL] {text!r}"
+        print("[OK] Seule l'erreur est tracée.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
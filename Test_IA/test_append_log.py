@@ -0,0 +1,44 @@
+import os
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+
+def run_tests():
+    print("=== TEST JOURNAL APPEND-ONLY ===")
+
+    conv = cm.create_conversation("Test journal")
+    cid = conv["id"]
+    path = store.file_path(cid)
+
+    # 1. Append : le fichier grossit, la borne validée suit
+    print("\n[TEST] Append de messages")
+    cm.append_message_by_id(cid, "user", "Bonjour !")
+    cm.append_message_by_id(cid, "assistant", "Réponse\nsur plusieurs lignes").result()
+    meta = store.read_meta(cid)
+    assert meta["committed_bytes"] == os.path.getsize(path), "[FAIL] Borne validée incohérente"
+    assert meta["message_count"] == 2, "[FAIL] Compteur de messages incorrect"
+    print("[OK] Borne validée = taille du fichier.")
+
+    # 2. Enregistrement déchiré : simulé par un append brut non validé
+    print("\n[TEST] Récupération d'un enregistrement déchiré")
+    committed = meta["committed_bytes"]
+    with open(path, "ab") as f:
+        f.write(b"\n[2025-01-01 00:00:00] USER: message coup")
+    store._recovered.discard(cid)  # simule un redémarrage du process
+    txt = cm.read_conversation_text_by_id(cid)
+    assert "coup" not in txt, "[FAIL] Enregistrement déchiré non tronqué"
+    assert os.path.getsize(path) == committed, "[FAIL] Taille après troncature incorrecte"
+    print("[OK] Enregistrement déchiré tronqué à l'ouverture.")
+
+    # 3. Les appends suivants repartent de la borne
+    cm.append_message_by_id(cid, "user", "Après récupération")
+    txt = cm.read_conversation_text_by_id(cid)
+    assert txt.count("USER:") == 2, "[FAIL] Append après récupération incorrect"
+    print("[OK] Append après récupération fonctionnel.")
+
+    cm.delete_conversation(cid)
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,78 @@
+import os
+import time
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+
+def run_tests():
+    print("=== TEST ARCHIVAGE DES CONVERSATIONS ===")
+
+    conv = cm.create_conversation("Test archive")
+    cid = conv["id"]
+    for i in range(200):
+        cm.append_message_by_id(cid, "user" if i % 2 == 0 else "assistant", f"message {i} " + "bla " * 20)
+    path = store.file_path(cid)
+    before = cm.read_messages(cid)
+    plain_size = os.path.getsize(path)
+
+    # 1. Compression : .txt remplacé par .txt.gz, plus petit
+    print("\n[TEST] Archivage")
+    assert store.archive_conv(cid), "[FAIL] Archivage refusé"
+    assert not os.path.exists(path) and os.path.exists(path + store.ARCHIVE_EXT), "[FAIL] Fichiers après archivage"
+    gz_size = os.path.getsize(path + store.ARCHIVE_EXT)
+    assert gz_size < plain_size, "[FAIL] Archive plus grosse que l'original"
+    print(f"[OK] {plain_size} -> {gz_size} octets.")
+
+    # 2. Lecture transparente (complète, plage, fin)
+    print("\n[TEST] Lecture d'une conversation archivée")
+    store._recovered.discard(cid)  # simule un redémarrage du process
+    assert cm.read_messages(cid) == before, "[FAIL] Lecture complète différente"
+    assert cm.read_messages(cid, 50, 60) == before[50:60], "[FAIL] Lecture par plage différente"
+    assert cm.tail_messages_by_id(cid, 5) == before[-5:], "[FAIL] Fin de conversation différente"
+    assert "message 199" in cm.read_conversation_text_by_id(cid), "[FAIL] Texte rendu incomplet"
+    print("[OK] Lecture identique à la version non compressée.")
+
+    # 3. Un ajout réhydrate la conversation
+    print("\n[TEST] Ajout sur une conversation archivée")
+    cm.append_message_by_id(cid, "user", "retour").result()
+    assert os.path.exists(path) and not os.path.exists(path + store.ARCHIVE_EXT), "[FAIL] Pas de réhydratation"
+    msgs = cm.read_messages(cid)
+    assert msgs[:-1] == before and msgs[-1]["content"] == "retour", "[FAIL] Contenu après réhydratation"
+    print("[OK] Conversation réhydratée puis complétée.")
+
+    # 4. Balayage des conversations inactives
+    print("\n[TEST] Archivage des conversations inactives")
+    store.index_update(cid, updated_at="2000-01-01 00:00:00")
+    stats = cm.archive_idle_conversations(days=30)
+    assert stats["archived"] >= 1 and store.get_index_item(cid).get("archived"), "[FAIL] Conversation inactive non archivée"
+    print(f"[OK] {stats['archived']} conversation(s) archivée(s).")
+
+    # 5. Rangement en shard d'une conversation archivée à plat : l'archive suit
+    print("\n[TEST] Migration en shard d'une conversation archivée")
+    time.sleep(1.1)  # conv_id horodaté à la seconde
+    layout, store.LAYOUT = store.LAYOUT, store.LAYOUT_FLAT  # conversation d'avant les shards
+    try:
+        flat = cm.create_conversation("Test archive à plat")["id"]
+    finally:
+        store.LAYOUT = layout
+    for i in range(20):
+        cm.append_message_by_id(flat, "user", f"ancien message {i}")
+    flat_before = cm.read_messages(flat)
+    assert os.path.dirname(store.file_path(flat)) == store.CONVERSATION_DIR, "[FAIL] Conversation non à plat"
+    assert store.archive_conv(flat), "[FAIL] Archivage refusé"
+    assert cm.migrate_conversations_to_shards()["moved"] >= 1, "[FAIL] Conversation non déplacée"
+    flat_path = store.file_path(flat)
+    assert os.path.dirname(flat_path) != store.CONVERSATION_DIR, "[FAIL] Chemin hors shard"
+    assert os.path.exists(flat_path + store.ARCHIVE_EXT), "[FAIL] Archive restée à la racine"
+    store._recovered.discard(flat)
+    assert cm.read_messages(flat) == flat_before, "[FAIL] Lecture après migration"
+    cm.delete_conversation(flat).result()
+    print("[OK] Archive déplacée avec la conversation, lecture identique.")
+
+    cm.delete_conversation(cid).result()
+    assert not os.path.exists(path + store.ARCHIVE_EXT), "[FAIL] Archive non supprimée"
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
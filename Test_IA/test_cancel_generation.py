@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ollama_api import AsyncOllamaClient, CancelToken, OllamaClient, get_bridge
+from IA_V2.conversations import conversation_manager as cm
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Ollama simulé : flux sans fin (un token toutes les 50 ms) ; en-têtes retardés si 'lent'."""
+    protocol_version = "HTTP/1.1"
+    disconnected = threading.Event()
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body["messages"][-1]["content"] == "lent":
+            time.sleep(3)  # modèle en cours de chargement
+        try:
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            i = 0
+            while True:
+                self._chunk({"message": {"content": f"t{i} "}, "done": False})
+                time.sleep(0.05)
+                i += 1
+        except OSError:
+            _StubOllama.disconnected.set()
+
+    def log_message(self, *args):
+        pass
+
+
+def run_tests():
+    print("=== TEST ANNULATION DES GÉNÉRATIONS ===")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+
+    # 1. Client synchrone : cancel() depuis un autre thread débloque la lecture
+    print("\n[TEST] query_ollama_stream annulé")
+    token, received, result = CancelToken(), [], {}
+
+    def on_token(t):
+        received.append(t)
+        if len(received) == 3:
+            threading.Timer(0.01, token.cancel).start()
+
+    t0 = time.perf_counter()
+    result["stats"] = OllamaClient(url=url).chat_stream("long", on_token, cancel_token=token)
+    elapsed = time.perf_counter() - t0
+    assert result["stats"] == {} and elapsed < 1.0, f"[FAIL] Retour tardif ({elapsed:.2f} s)"
+    assert not any("Erreur" in t for t in received), "[FAIL] Annulation traitée comme une erreur"
+    assert _StubOllama.disconnected.wait(2), "[FAIL] Connexion non fermée"
+    print(f"[OK] Arrêt après {len(received)} tokens, connexion fermée ({elapsed:.2f} s).")
+
+    # 2. Client asyncio : le flux se termine proprement, côté serveur la connexion tombe
+    print("\n[TEST] stream_chat annulé")
+    _StubOllama.disconnected.clear()
+    client = AsyncOllamaClient(url=url)
+    token = CancelToken()
+
+    async def consume(prompt):
+        out = []
+        async for t in client.stream_chat(prompt, cancel_token=token):
+            out.append(t)
+            if len(out) == 3:
+                threading.Thread(target=token.cancel).start()
+        return out
+
+    tokens = get_bridge().submit(consume("long")).result(timeout=5)
+    assert 3 <= len(tokens) < 6 and not any("Erreur" in t for t in tokens), f"[FAIL] Tokens : {tokens}"
+    assert _StubOllama.disconnected.wait(2), "[FAIL] Connexion non fermée"
+    print(f"[OK] Flux arrêté après {len(tokens)} tokens.")
+
+    # 3. Stop pendant le chargement du modèle (aucun token encore reçu)
+    print("\n[TEST] Annulation avant le premier token")
+    token = CancelToken()
+    future = get_bridge().submit(consume("lent"))
+    time.sleep(0.3)
+    t0 = time.perf_counter()
+    token.cancel()
+    assert future.result(timeout=2) == [] and time.perf_counter() - t0 < 0.5, "[FAIL] Attente des en-têtes"
+    print("[OK] Requête abandonnée sans attendre la réponse.")
+
+    # 3 bis. Même cas, client synchrone : connexion fermée avant les en-têtes
+    print("\n[TEST] Annulation avant le premier token (client synchrone)")
+    token, received = CancelToken(), []
+    threading.Timer(0.3, token.cancel).start()
+    t0 = time.perf_counter()
+    stats = OllamaClient(url=url).chat_stream("lent", received.append, cancel_token=token)
+    elapsed = time.perf_counter() - t0
+    assert stats == {} and received == [] and elapsed < 0.8, f"[FAIL] Attente des en-têtes ({elapsed:.2f} s)"
+    print(f"[OK] Requête abandonnée sans attendre la réponse ({elapsed:.2f} s).")
+    server.shutdown()
+    server.server_close()
+
+    # 4. Marqueur de réponse partielle en stockage
+    print("\n[TEST] Réponse partielle enregistrée")
+    conv = cm.create_conversation("Test annulation")
+    cm.append_message_by_id(conv["id"], "user", "Raconte une longue histoire")
+    cm.append_message_by_id(conv["id"], "assistant", "Il était une", partial=True).result()
+    cm.append_message_by_id(conv["id"], "assistant", "Réponse complète").result()
+    last = cm.read_messages(conv["id"], -2)
+    assert last[0].get("partial") is True and "partial" not in last[1], f"[FAIL] {last}"
+    print("[OK] Réponse interrompue marquée 'partial'.")
+    cm.delete_conversation(conv["id"]).result()
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
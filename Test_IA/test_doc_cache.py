@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+from IA_V2.conversations.doc_cache import DocCache
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def run_tests():
+    print("=== TEST CACHE DES DOCS DE RÉFÉRENCE ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        small = os.path.join(tmp, "petit.txt")
+        big = os.path.join(tmp, "gros.txt")
+        _write(small, "éléments de référence\n" * 10)
+        _write(big, "ligne de document volumineux\n" * 100_000)  # ~2.9 Mo
+
+        cache = DocCache(max_bytes=4_000_000, doc_max_bytes=3_000_000, mmap_threshold=1_000_000)
+
+        # 1. Deuxième lecture servie par le cache, gros fichier via mmap
+        print("\n[TEST] Lectures répétées")
+        assert cache.read(small) == "éléments de référence\n" * 10, "[FAIL] Contenu du petit doc"
+        text = cache.read(big)
+        assert text == "ligne de document volumineux\n" * 100_000, "[FAIL] Contenu du gros doc"
+        t0 = time.perf_counter()
+        for _ in range(100):
+            cache.read(small)
+            cache.read(big)
+        elapsed = (time.perf_counter() - t0) * 1000
+        st = cache.stats()
+        assert (st["hits"], st["misses"], st["mmap_reads"]) == (200, 2, 1), f"[FAIL] Stats : {st}"
+        print(f"[OK] 200 lectures en cache ({elapsed:.1f} ms), 1 lecture mmap.")
+
+        # 2. Fichier modifié -> relu, ancienne version évincée
+        print("\n[TEST] Invalidation par mtime/taille")
+        time.sleep(0.01)
+        _write(small, "version 2")
+        assert cache.read(small) == "version 2", "[FAIL] Ancienne version servie"
+        assert cache.stats()["entries"] == 2, "[FAIL] Ancienne version conservée"
+        print("[OK] Nouvelle version lue, une seule entrée par fichier.")
+
+        # 3. Budget en octets : éviction LRU
+        print("\n[TEST] Budget mémoire")
+        other = os.path.join(tmp, "autre.txt")
+        _write(other, "x" * 1_500_000)
+        cache.read(other)  # 2.9 Mo + 1.5 Mo > 4 Mo : le gros doc (le plus ancien) sort
+        st = cache.stats()
+        assert st["bytes"] <= st["max_bytes"] and st["evictions"] == 1, f"[FAIL] Budget dépassé : {st}"
+        cache.stats(reset=True)
+        cache.read(small)
+        assert cache.stats()["hits"] == 1, "[FAIL] Entrée récente évincée"
+        print(f"[OK] {st['bytes']} octets en cache pour un budget de {st['max_bytes']}.")
+
+        # 4. Troncature à doc_max_bytes, doc disparu
+        print("\n[TEST] Taille maximale et doc supprimé")
+        capped = DocCache(doc_max_bytes=1000)
+        assert len(capped.read(big)) == 1000, "[FAIL] Doc non tronqué"
+        os.remove(other)
+        assert cache.get_text(other) is None, "[FAIL] Doc supprimé encore servi"
+        print("[OK] Lecture bornée, doc supprimé ignoré.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
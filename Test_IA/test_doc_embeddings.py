@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from IA_V2.conversations import doc_embeddings as de
+from ollama_api import get_client
+
+DIM = 64
+
+
+def _fake_embedding(text):
+    """Sac de mots haché : textes partageant des mots => vecteurs proches."""
+    vec = [0.0] * DIM
+    for word in text.lower().split():
+        vec[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % DIM] += 1.0
+    return vec
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    calls = []
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        _StubOllama.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _StubOllama.calls.append(len(body["input"]))
+        data = json.dumps({"model": body["model"], "embeddings": [_fake_embedding(t) for t in body["input"]]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_tests():
+    print("=== TEST RECHERCHE SÉMANTIQUE (EMBEDDINGS) ===")
+    if de.np is None:
+        print("[SKIP] numpy non installé : recherche sémantique indisponible.")
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/embed"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        doc = os.path.join(tmp, "manuel.txt")
+        paragraphs = [f"paragraphe {i} " + "texte ordinaire sans rapport " * 40 for i in range(60)]
+        paragraphs[42] = "le routeur wifi clignote orange : redémarrer la box internet " * 10
+        with open(doc, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+        store = de.VectorStore(os.path.join(tmp, "vec"), de.OllamaEmbedder(url, "stub", batch_size=8))
+
+        # 1. Vectorisation par lots, une seule fois
+        print("\n[TEST] Vectorisation par lots")
+        conv_a = de.SemanticRetriever([doc], store=store)
+        n = len(conv_a.chunks)
+        top = conv_a.select("box internet routeur wifi", top_k=1)[0]
+        assert "routeur wifi" in top["text"], f"[FAIL] Mauvais passage : {top['text'][:60]!r}"
+        assert _StubOllama.calls[:-1] == [8] * (n // 8) + ([n % 8] if n % 8 else []), \
+            f"[FAIL] Lots inattendus : {_StubOllama.calls}"
+        assert _StubOllama.connections == 1, f"[FAIL] {_StubOllama.connections} connexions (session non partagée)"
+        print(f"[OK] {n} morceaux en {len(_StubOllama.calls) - 1} requêtes sur une connexion, passage pertinent trouvé.")
+
+        # 2. Réutilisation par une autre conversation (vecteurs sur disque, memmap)
+        print("\n[TEST] Réutilisation entre conversations")
+        _StubOllama.calls.clear()
+        conv_b = de.SemanticRetriever([doc], store=de.VectorStore(store.directory, store.embedder))
+        conv_b.select("routeur")
+        assert _StubOllama.calls == [1], f"[FAIL] Doc revectorisé : {_StubOllama.calls}"
+        assert isinstance(conv_b._parts[0][1], de.np.memmap), "[FAIL] Vecteurs non relus en memmap"
+        print("[OK] Seule la requête est vectorisée.")
+
+        # 3. Doc modifié : nouvelle version, ancienne supprimée
+        print("\n[TEST] Doc modifié")
+        time.sleep(0.01)
+        with open(doc, "a", encoding="utf-8") as f:
+            f.write("\n\najout")
+        de.SemanticRetriever([doc], store=store).ensure_vectors()
+        assert len(os.listdir(store.directory)) == 1, f"[FAIL] Fichiers : {os.listdir(store.directory)}"
+        print("[OK] Une seule version de vecteurs conservée.")
+
+        # 4. Ollama indisponible : repli BM25
+        print("\n[TEST] Repli BM25")
+        server.shutdown()
+        server.server_close()
+        get_client().session.close()  # connexion keep-alive encore servie sinon
+        offline = de.VectorStore(os.path.join(tmp, "vec2"), de.OllamaEmbedder(url, "stub"))
+        picked = de.SemanticRetriever([doc], store=offline).select("routeur wifi", top_k=1)
+        assert picked and "routeur wifi" in picked[0]["text"], "[FAIL] Pas de repli BM25"
+        print("[OK] Sélection BM25 quand les embeddings échouent.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
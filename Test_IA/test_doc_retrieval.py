@@ -0,0 +1,70 @@
+import os
+import random
+import tempfile
+import time
+from IA_V2.conversations import doc_retrieval as dr
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def run_tests():
+    print("=== TEST SÉLECTION DE PASSAGES (BM25) ===")
+    rnd = random.Random(0)
+    filler = [f"remplissage{i}" for i in range(500)]
+
+    # 1. Découpage : tailles bornées, aucun mot perdu
+    print("\n[TEST] Découpage")
+    text = "\n\n".join(" ".join(rnd.choices(filler, k=rnd.randint(20, 120))) for _ in range(200))
+    chunks = dr.chunk_text(text, size=1200, overlap=150)
+    assert all(len(c) <= 1200 for c in chunks), "[FAIL] Morceau trop long"
+    covered = set(" ".join(chunks).split())
+    assert covered == set(text.split()), "[FAIL] Mots perdus au découpage"
+    print(f"[OK] {len(text)} caractères -> {len(chunks)} morceaux.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manual = os.path.join(tmp, "manuel.txt")
+        recipes = os.path.join(tmp, "recettes.txt")
+        sections = [" ".join(rnd.choices(filler, k=150)) for _ in range(300)]
+        sections[123] += " Pour réinitialiser le routeur, maintenir le bouton reset dix secondes."
+        _write(manual, "\n\n".join(sections))
+        _write(recipes, "Pâte brisée : farine, beurre froid, sel, eau glacée.\n\n" + " ".join(rnd.choices(filler, k=3000)))
+
+        # 2. Pertinence et budget
+        print("\n[TEST] Meilleurs passages dans le budget")
+        retriever = dr.get_retriever([manual, recipes])
+        t0 = time.perf_counter()
+        picked = retriever.select("comment réinitialiser le routeur ?", budget_tokens=800, top_k=3)
+        elapsed = (time.perf_counter() - t0) * 1000
+        assert picked and "réinitialiser le routeur" in picked[0]["text"], "[FAIL] Passage pertinent absent"
+        assert sum(c["tokens"] for c in picked) <= 800 and len(picked) <= 3, "[FAIL] Budget dépassé"
+        assert retriever.select("pâte brisée", top_k=1)[0]["doc"] == recipes, "[FAIL] Mauvais document"
+        full = os.path.getsize(manual) + os.path.getsize(recipes)
+        sent = len(retriever.render("comment réinitialiser le routeur ?"))
+        print(f"[OK] {len(retriever.chunks)} morceaux, sélection en {elapsed:.1f} ms ; "
+              f"{sent} caractères envoyés au lieu de {full}.")
+
+        # 3. Index réutilisé, reconstruit si un doc change
+        print("\n[TEST] Réutilisation de l'index")
+        assert dr.get_retriever([manual, recipes]) is retriever, "[FAIL] Index reconstruit sans changement"
+        time.sleep(0.01)
+        _write(recipes, "Nouvelle version : tarte aux pommes.")
+        rebuilt = dr.get_retriever([manual, recipes])
+        assert rebuilt is not retriever and rebuilt.select("tarte", top_k=1)[0]["doc"] == recipes, \
+            "[FAIL] Doc modifié non pris en compte"
+        print("[OK] Même index tant que les docs sont inchangés.")
+
+        # 4. Sans terme commun : début des documents ; doc disparu ignoré
+        print("\n[TEST] Requête sans correspondance / doc supprimé")
+        assert rebuilt.select("zzzz", budget_tokens=10_000, top_k=1)[0]["index"] == 0, "[FAIL] Repli"
+        os.remove(recipes)
+        assert all(c["doc"] == manual for c in dr.get_retriever([manual, recipes]).chunks), "[FAIL] Doc supprimé"
+        print("[OK] Repli sur le début des documents, doc supprimé ignoré.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import time
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+N_MESSAGES = 50
+
+
+def _measure(mode: str) -> dict:
+    """Ajoute N_MESSAGES messages dans le mode donné ; retourne durée + compteurs fsync."""
+    store.DURABILITY_MODE = mode
+    conv = cm.create_conversation(f"Test durabilité {mode}")
+    cid = conv["id"]
+    cm.flush_writes()
+    store.sync_now()
+    store.durability_stats(reset=True)
+
+    t0 = time.perf_counter()
+    for i in range(N_MESSAGES):
+        cm.append_message_by_id(cid, "user", f"message {i}")
+    cm.flush_writes()
+    elapsed = time.perf_counter() - t0
+    store.sync_now()
+    stats = store.durability_stats(reset=True)
+
+    cm.delete_conversation(cid).result()
+    store.sync_now()
+    stats["elapsed_ms"] = elapsed * 1000
+    return stats
+
+
+def run_tests():
+    print("=== TEST POLITIQUE DE DURABILITÉ ===")
+    initial_mode = store.DURABILITY_MODE
+    try:
+        results = {mode: _measure(mode) for mode in (store.DURABILITY_NONE, store.DURABILITY_BATCH, store.DURABILITY_STRICT)}
+    finally:
+        store.DURABILITY_MODE = initial_mode
+
+    for mode, st in results.items():
+        print(f"   {mode:<6} : {st['elapsed_ms']:8.1f} ms pour {N_MESSAGES} messages, "
+              f"{st['fsync']} fsync fichiers, {st['dir_fsync']} fsync dossiers, "
+              f"{st['batches']} lots, {st['fsync_seconds'] * 1000:.1f} ms en fsync")
+
+    print("\n[TEST] Mode none : aucun fsync")
+    assert results["none"]["fsync"] == 0 and results["none"]["dir_fsync"] == 0, "[FAIL] fsync en mode none"
+    print("[OK]")
+
+    print("\n[TEST] Mode strict : au moins un fsync par message")
+    assert results["strict"]["fsync"] >= N_MESSAGES, "[FAIL] fsync manquant en mode strict"
+    print("[OK]")
+
+    print("\n[TEST] Mode batch : fsync groupés (moins qu'en strict)")
+    assert results["batch"]["batches"] >= 1, "[FAIL] Aucun lot fsync en mode batch"
+    assert results["batch"]["fsync"] >= 1, "[FAIL] Aucun fichier rendu durable en mode batch"
+    assert results["batch"]["fsync"] < results["strict"]["fsync"], "[FAIL] Mode batch non groupé"
+    print("[OK]")
+
+    print("\n[TEST] Lot fsync : chaque fichier traité, chemin disparu ignoré")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"f{i}.txt") for i in range(3)]
+        for p in paths:
+            with open(p, "wb") as f:
+                f.write(b"x")
+        store.durability_stats(reset=True)
+        for p in [paths[0], os.path.join(tmp, "supprime.txt"), paths[1], paths[2]]:
+            store._mark_dirty(p)
+        store.sync_now()
+        st = store.durability_stats(reset=True)
+        assert st["fsync"] == 3 and st["batches"] == 1, f"[FAIL] {st}"
+    print("[OK]")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
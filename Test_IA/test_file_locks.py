@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import time
+from IA_V2.conversations import storage_fs as store
+
+N_WORKERS = 4
+N_OPS = 25
+
+
+def _worker(worker_id: int, shared_id: str) -> None:
+    """Process concurrent : appends sur une conversation commune + entrées d'index propres."""
+    for i in range(N_OPS):
+        store.append_message(shared_id, "user", f"w{worker_id} message {i}")
+        store.index_put({"id": f"lock-test-w{worker_id}-{i}", "title": "x", "file": f"lock-test-w{worker_id}-{i}.txt",
+                         "updated_at": store.now_iso(), "message_count": 0})
+        store.flush_index()
+    store.sync_now()
+
+
+def _renamer(conv_id: str) -> None:
+    """Autre process : renomme la conversation (fichier déplacé, index réécrit)."""
+    store.rename_file(conv_id, "Renommée ailleurs.txt")
+    store.flush_index()
+
+
+def run_tests():
+    print("=== TEST VERROUS INTER-PROCESS ===")
+
+    conv = store.create_conv("Test verrous")
+    cid = conv["id"]
+    store.flush_index()
+    store.lock_stats(reset=True)
+
+    print(f"\n[TEST] {N_WORKERS} process x {N_OPS} appends + mises à jour d'index")
+    procs = [multiprocessing.Process(target=_worker, args=(w, cid)) for w in range(N_WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0, f"[FAIL] Process en échec (code {p.exitcode})"
+
+    # 1. Aucun message perdu ni entrelacé
+    store._recovered.discard(cid)
+    msgs = store.read_messages(cid)
+    expected = N_WORKERS * N_OPS
+    assert len(msgs) == expected, f"[FAIL] {len(msgs)} messages lus au lieu de {expected}"
+    assert store.read_meta(cid)["message_count"] == expected, "[FAIL] Compteur de messages incohérent"
+    print("[OK] Tous les messages présents, compteur et offsets cohérents.")
+
+    # 2. Aucune mise à jour d'index perdue
+    ids = {it["id"] for it in store.load_index()["items"]}
+    missing = [f"lock-test-w{w}-{i}" for w in range(N_WORKERS) for i in range(N_OPS)
+               if f"lock-test-w{w}-{i}" not in ids]
+    assert not missing, f"[FAIL] {len(missing)} entrées d'index perdues"
+    print("[OK] Aucune entrée d'index perdue.")
+
+    for w in range(N_WORKERS):
+        for i in range(N_OPS):
+            store.index_remove(f"lock-test-w{w}-{i}")
+
+    # 3. Suppression : fichier .lock de la conversation retiré
+    print("\n[TEST] Fichier de verrou supprimé avec la conversation")
+    lock_path = store._conv_lock_path(cid)
+    assert os.path.exists(lock_path), "[FAIL] Fichier de verrou absent avant suppression"
+    store.delete_conv(cid)
+    store.flush_index()
+    assert not os.path.exists(lock_path), "[FAIL] Fichier .lock laissé après suppression"
+    print("[OK] Aucun .lock orphelin.")
+
+    # 4. Chemin en cache périmé après un renommage par un autre process
+    print("\n[TEST] Renommage par un autre process")
+    time.sleep(1.1)  # conv_id horodaté à la seconde
+    other = store.create_conv("Renommée ici")["id"]
+    store.append_message(other, "user", "avant")
+    store.read_messages(other)  # chemin mis en cache
+    store.flush_index()
+    proc = multiprocessing.Process(target=_renamer, args=(other,))
+    proc.start()
+    proc.join()
+    assert proc.exitcode == 0, f"[FAIL] Process en échec (code {proc.exitcode})"
+    store.append_message(other, "user", "après")
+    assert [m["content"] for m in store.read_messages(other)] == ["avant", "après"], "[FAIL] Chemin périmé"
+    assert store.file_path(other).endswith("Renommée ailleurs.txt"), "[FAIL] Chemin non relu depuis l'index"
+    print("[OK] Chemin résolu de nouveau depuis l'index.")
+    store.delete_conv(other)
+    store.flush_index()
+    print(f"   Attente des verrous (process courant) : {store.lock_stats()}")
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
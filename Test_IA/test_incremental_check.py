@@ -0,0 +1,54 @@
+import os
+import time
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+
+def run_tests():
+    print("=== TEST VÉRIFICATION INCRÉMENTALE ===")
+
+    ids = []
+    for i in range(20):
+        conv = cm.create_conversation(f"Incrémental {i}")
+        cm.append_message_by_id(conv["id"], "user", f"message {i}").result()
+        ids.append(conv["id"])
+    time.sleep(1.1)  # watermark à la seconde : créations antérieures au 1er passage
+    cm.check_conversations_incremental()
+
+    # 1. Rien n'a changé : aucun dossier relu, aucune entrée visitée
+    print("\n[TEST] Deuxième passage sans modification")
+    report = cm.check_conversations_incremental()
+    assert not report["dir_scanned"] and report["visited"] == 0, f"[FAIL] {report}"
+    print(f"[OK] {report}")
+
+    # 2. Réécriture des métadonnées de stockage (index.json par renommage) : ignorée
+    print("\n[TEST] Index réécrit entre deux passages")
+    store.index_update(ids[0], title="Renommée", updated_at=store.now_iso())
+    store.flush_index()
+    report = cm.check_conversations_incremental()
+    assert not report["dir_scanned"], f"[FAIL] Dossier relu pour index.json : {report}"
+    assert report["visited"] == 1, f"[FAIL] Seule l'entrée modifiée devait être visitée : {report}"
+    print(f"[OK] {report}")
+
+    # 3. Fichier de conversation disparu : dossier relu, entrée fantôme retirée
+    print("\n[TEST] Fichier supprimé hors application")
+    gone = ids.pop()
+    os.remove(store.file_path(gone))
+    old = time.time() - 2 * cm.ORPHAN_MIN_AGE
+    for path in (store.meta_path(gone), store.offsets_path(gone)):  # restés : orphelins anciens
+        if os.path.exists(path):
+            os.utime(path, (old, old))
+    report = cm.check_conversations_incremental()
+    assert report["dir_scanned"] and report["removed"] == 1 and report["orphans"] >= 1, f"[FAIL] {report}"
+    assert store.get_index_item(gone) is None, "[FAIL] Entrée fantôme conservée"
+    report = cm.check_conversations_incremental()
+    assert not report["dir_scanned"], f"[FAIL] Dossier relu après réparation : {report}"
+    print("[OK] Entrée et orphelin retirés, passage suivant sans relecture.")
+
+    for cid in ids:
+        cm.delete_conversation(cid).result()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
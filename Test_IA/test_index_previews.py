@@ -0,0 +1,52 @@
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+
+def run_tests():
+    print("=== TEST APERÇUS DÉNORMALISÉS DANS L'INDEX ===")
+
+    cid = cm.create_conversation("Test aperçu")["id"]
+    assert store.get_index_item(cid).get("preview") == "", "[FAIL] Aperçu initial non vide"
+
+    # 1. Premier message utilisateur -> aperçu + libellé
+    print("\n[TEST] Premier message utilisateur")
+    cm.append_message_by_id(cid, "assistant", "Bonjour, que puis-je faire ?")
+    cm.append_message_by_id(cid, "user", "comment   trier une liste ?\nen python " + "détail " * 30)
+    cm.append_message_by_id(cid, "user", "Autre question").result()
+    item = store.get_index_item(cid)
+    assert item["display_title"] == "Comment   trier une liste ?", f"[FAIL] Libellé : {item['display_title']!r}"
+    assert item["preview"].startswith("comment trier une liste ? en python"), f"[FAIL] Aperçu : {item['preview']!r}"
+    assert len(item["preview"]) <= store.PREVIEW_MAXLEN and item["preview"].endswith("…"), "[FAIL] Aperçu non tronqué"
+    assert store.read_meta(cid)["preview"] == item["preview"], "[FAIL] Métadonnées non synchronisées"
+    print(f"[OK] {item['display_title']!r} / {item['preview']!r}")
+
+    # 2. Le renommage remplace le libellé, pas l'aperçu
+    print("\n[TEST] Renommage")
+    cm.rename_conversation(cid, "Tri en Python")
+    item = store.get_index_item(cid)
+    assert item["display_title"] == "Tri en Python" and item["preview"].startswith("comment"), "[FAIL] Après renommage"
+    print("[OK] Libellé mis à jour, aperçu conservé.")
+
+    # 3. Entrée ancienne (sans champs) complétée par backfill_previews
+    print("\n[TEST] Complétion des entrées anciennes")
+    meta = store.read_meta(cid)
+    for k in ("preview", "display_title"):
+        meta.pop(k, None)
+    store.write_meta(cid, meta)
+    legacy = dict(store.get_index_item(cid))
+    for k in ("preview", "display_title"):
+        legacy.pop(k, None)
+    store.index_put(legacy)
+    assert cm.backfill_previews() >= 1, "[FAIL] Aucune entrée complétée"
+    item = store.get_index_item(cid)
+    assert item["display_title"] == "Comment   trier une liste ?" and item["preview"].startswith("comment"), \
+        "[FAIL] Aperçu recalculé incorrect"
+    assert cm.backfill_previews() == 0, "[FAIL] Entrées recalculées deux fois"
+    print("[OK] Aperçu recalculé depuis le premier message utilisateur, une seule fois.")
+
+    cm.delete_conversation(cid).result()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,69 @@
+import os
+import time
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+
+def run_tests():
+    print("=== TEST ENREGISTREMENTS JSONL ===")
+
+    # 1. Aller-retour de messages multi-lignes + champs structurés
+    print("\n[TEST] Écriture / lecture structurée")
+    conv = cm.create_conversation("Test JSONL")
+    cid = conv["id"]
+    cm.append_message_by_id(cid, "user", "Question ?")
+    cm.append_message_by_id(
+        cid, "assistant", "Ligne 1\n[2025-01-01 00:00:00] USER: piège\nLigne 3",
+        model="mistral", tokens={"prompt": 12, "completion": 30},
+    )
+    msgs = list(cm.iter_messages_by_id(cid))
+    assert len(msgs) == 2, "[FAIL] Nombre de messages incorrect"
+    assert msgs[1]["content"].endswith("Ligne 3"), "[FAIL] Message multi-lignes mal relu"
+    assert msgs[1]["tokens"]["completion"] == 30 and msgs[1]["model"] == "mistral", "[FAIL] Champs structurés perdus"
+    assert "Question ?" in cm.read_conversation_text_by_id(cid), "[FAIL] Rendu texte incorrect"
+    print("[OK] Messages multi-lignes et métadonnées conservés.")
+
+    # 2. Lecture depuis la fin
+    print("\n[TEST] Lecture des derniers messages")
+    for i in range(50):
+        cm.append_message_by_id(cid, "user", f"message {i}")
+    tail = cm.tail_messages_by_id(cid, 3)
+    assert [m["content"] for m in tail] == ["message 47", "message 48", "message 49"], "[FAIL] tail incorrect"
+    print("[OK] tail_messages lit la fin du fichier.")
+
+    # 3. Lecture par plage via l'index d'offsets (et reconstruction si absent)
+    print("\n[TEST] Lecture par plage")
+    window = cm.read_messages(cid, 10, 13)
+    assert [m["content"] for m in window] == ["message 8", "message 9", "message 10"], "[FAIL] Plage incorrecte"
+    os.remove(store.offsets_path(cid))
+    store._recovered.discard(cid)  # simule un redémarrage du process
+    assert cm.read_messages(cid, 10, 13) == window, "[FAIL] Plage après reconstruction des offsets"
+    print("[OK] read_messages lit une plage par seek, offsets reconstruits si besoin.")
+
+    # 4. Conversion d'une conversation texte historique
+    print("\n[TEST] Conversion texte -> JSONL")
+    time.sleep(1)
+    old = store.create_conv("Historique")
+    oid = old["id"]
+    store.atomic_write_text(
+        store.file_path(oid),
+        "\n[2025-01-01 10:00:00] USER: Bonjour\n\n[2025-01-01 10:00:05] ASSISTANT: Salut\nça va ?\n",
+    )
+    store.index_update(oid, format=store.FORMAT_TEXT)
+    meta = store.read_meta(oid)
+    meta.update(format=store.FORMAT_TEXT, committed_bytes=os.path.getsize(store.file_path(oid)))
+    store.write_meta(oid, meta)
+    before = cm.read_conversation_text_by_id(oid)
+    assert store.convert_conv_to_jsonl(oid), "[FAIL] Conversion non effectuée"
+    assert cm.read_conversation_text_by_id(oid) == before, "[FAIL] Contenu modifié par la conversion"
+    assert [m["content"] for m in cm.iter_messages_by_id(oid)] == ["Bonjour", "Salut\nça va ?"], "[FAIL] Messages convertis"
+    assert cm.read_messages(oid, -1)[0]["content"] == "Salut\nça va ?", "[FAIL] Offsets après conversion"
+    print("[OK] Conversion fidèle.")
+
+    cm.delete_conversation(cid)
+    cm.delete_conversation(oid)
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,109 @@
+import threading
+import time
+from IA_V2.conversations import storage_fs as store
+from IA_V2.conversations import conversation_manager as cm
+
+N_ITEMS = 10000
+
+
+def _put(i: int, updated_at: str, tags=None) -> str:
+    conv_id = f"page-test-{i:05d}"
+    store.index_put({"id": conv_id, "title": f"Page {i}", "file": f"{conv_id}.txt",
+                     "updated_at": updated_at, "message_count": 0, "tags": tags or []})
+    return conv_id
+
+
+def _walk(limit: int, tag=None):
+    ids, cursor = [], None
+    while True:
+        page = cm.list_conversations_page(cursor=cursor, limit=limit, tag=tag)
+        ids += [it["id"] for it in page["items"] if it["id"].startswith("page-test-")]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def run_tests():
+    print("=== TEST PAGINATION DES CONVERSATIONS ===")
+
+    # dates identiques deux à deux : le tri départage par conv_id
+    ids = [_put(i, f"2001-01-01 00:{i // 2 // 60 % 60:02d}:{i // 2 % 60:02d}", ["pair"] if i % 2 == 0 else [])
+           for i in range(N_ITEMS)]
+    expected = sorted(ids, key=lambda c: (store.get_index_item(c)["updated_at"], c), reverse=True)
+
+    # 1. Parcours complet = liste triée, sans doublon ni trou
+    print("\n[TEST] Parcours page par page")
+    assert _walk(limit=37) == expected, "[FAIL] Parcours paginé différent de la liste triée"
+    assert [it["id"] for it in cm.list_conversations_index() if it["id"].startswith("page-test-")] == expected, \
+        "[FAIL] list_conversations_index incohérent"
+    print(f"[OK] {N_ITEMS} entrées parcourues dans l'ordre.")
+
+    # 2. Curseur stable malgré des mises à jour entre deux pages
+    print("\n[TEST] Stabilité du curseur")
+    first = cm.list_conversations_page(limit=20)
+    seen = [it["id"] for it in first["items"]]
+    store.index_update(expected[-1], updated_at="2099-01-01 00:00:00")  # remonte en tête
+    _put(N_ITEMS, "2099-01-02 00:00:00")                                # nouvelle entrée
+    second = cm.list_conversations_page(cursor=first["next_cursor"], limit=20)
+    assert not set(seen) & {it["id"] for it in second["items"]}, "[FAIL] Entrée dupliquée entre deux pages"
+    print("[OK] Page suivante reprise après la dernière entrée rendue.")
+
+    # 3. Filtre par tag
+    print("\n[TEST] Filtre par tag")
+    tagged = _walk(limit=50, tag="pair")
+    assert tagged and all("pair" in store.get_index_item(c)["tags"] for c in tagged), "[FAIL] Filtre par tag"
+    assert len(tagged) == N_ITEMS // 2, f"[FAIL] {len(tagged)} entrées taguées au lieu de {N_ITEMS // 2}"
+    print(f"[OK] {len(tagged)} entrées taguées.")
+
+    # 4. Curseur invalide
+    try:
+        cm.list_conversations_page(cursor="pas-un-curseur")
+        raise AssertionError("[FAIL] Curseur invalide accepté")
+    except ValueError:
+        print("\n[OK] Curseur invalide refusé (ValueError).")
+
+    # 5. Coût de la première page indépendant du volume
+    print("\n[TEST] Temps de la première page")
+    t0 = time.perf_counter()
+    for _ in range(100):
+        cm.list_conversations_page(limit=50)
+    elapsed = (time.perf_counter() - t0) * 10
+    print(f"   {elapsed:.2f} ms par page ({N_ITEMS} conversations)")
+    assert elapsed < 20, "[FAIL] Première page trop lente"
+
+    # 6. Listes lues sans attendre le thread d'écriture, écritures en file superposées
+    print("\n[TEST] Liste pendant des écritures en file")
+    created = []
+    for name in "ABC":  # ids et dates à la seconde : une création par seconde
+        created.append(cm.create_conversation(f"En file {name}")["id"])
+        time.sleep(1.1)
+    a, b, c = created
+    release = threading.Event()
+    blocker = cm._writer.submit(release.wait, 10)  # thread d'écriture occupé
+    cm.append_message_by_id(a, "user", "remonte")
+    cm.delete_conversation(b)
+    t0 = time.perf_counter()
+    page = cm.list_conversations_page(limit=50)
+    listed = cm.list_conversations_index()
+    files = cm.list_conversations()
+    elapsed = time.perf_counter() - t0
+    assert not blocker.done(), "[FAIL] Écritures terminées avant la lecture"
+    assert elapsed < 1, f"[FAIL] Liste bloquée par le thread d'écriture ({elapsed:.2f} s)"
+    recent = [it["id"] for it in listed if not it["updated_at"].startswith("2099")]
+    assert recent[:2] == [a, c], "[FAIL] Ajout en file non pris en compte dans l'ordre"
+    assert b not in {it["id"] for it in listed + page["items"]}, "[FAIL] Suppression en file visible"
+    assert store.get_index_item(b)["file"] not in files, "[FAIL] Fichier supprimé listé"
+    release.set()
+    cm.delete_conversation(a)
+    cm.delete_conversation(c).result()
+    assert not cm._pending_index, "[FAIL] Écritures en attente non retirées"
+    print(f"[OK] Listes rendues en {elapsed * 1000:.1f} ms, thread d'écriture occupé.")
+
+    for conv_id in ids + [f"page-test-{N_ITEMS:05d}"]:
+        store.index_remove(conv_id)
+    store.flush_index()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -5,6 +5,7 @@ from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from ollama_api import query_ollama
+from config import OLLAMA_DETERMINISTIC_OPTIONS
 
 # ==== Configuration du test mémoire ====
 INSTRUCTION_INITIALE = "Souviens-toi que la banane est bleue."
@@ -41,7 +42,7 @@ def test_memoire():
 
         historique.append(f"[user] {prompt}")
         context_concaténé = "\n".join(historique)
-        réponse = query_ollama(context_concaténé)
+        réponse = query_ollama(context_concaténé, options=OLLAMA_DETERMINISTIC_OPTIONS)
         réponses.append(réponse.strip())
         historique.append(f"[assistant] {réponse.strip()}")
 
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ollama_api import AsyncOllamaClient, get_bridge
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Ollama simulé : flux NDJSON en chunked, 5 tokens espacés de 0,1 s (sans fin si 'infini')."""
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    busy_left = 0  # réponses 503 (Ollama occupé) avant de répondre
+    requests = 0
+    disconnected = threading.Event()
+
+    def setup(self):
+        super().setup()
+        _StubOllama.connections += 1
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        _StubOllama.requests += 1
+        if _StubOllama.busy_left > 0:
+            _StubOllama.busy_left -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not body.get("stream"):
+            payload = json.dumps({"message": {"content": f"{body['model']}:{prompt}"}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            i = 0
+            while prompt == "infini" or i < 5:
+                self._chunk({"message": {"content": f"t{i} "}, "done": False})
+                time.sleep(0.1)
+                i += 1
+            self._chunk({"model": body["model"], "done": True, "prompt_eval_count": 1, "eval_count": 5})
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            _StubOllama.disconnected.set()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 64  # 20 connexions simultanées
+
+
+def _client_threads():
+    """Threads hors serveur simulé (qui en ouvre un par connexion)."""
+    return sum("process_request" not in t.name for t in threading.enumerate())
+
+
+async def _collect(client, prompt, stats=None):
+    return "".join([t async for t in client.stream_chat(prompt, stats)])
+
+
+def run_tests():
+    print("=== TEST CLIENT OLLAMA ASYNCIO ===")
+    server = _Server(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AsyncOllamaClient(url=f"http://127.0.0.1:{server.server_address[1]}/api/chat", model="stub")
+
+    # 1. Générations concurrentes sur une seule boucle, sans thread supplémentaire
+    print("\n[TEST] 20 générations concurrentes")
+    get_bridge().submit(_collect(client, "a")).result(timeout=10)  # boucle et trace démarrées
+    threads_before = _client_threads()
+
+    async def many():
+        stats = {}
+        t0 = time.perf_counter()
+        replies = await asyncio.gather(_collect(client, "a", stats), *(_collect(client, "b") for _ in range(19)))
+        return replies, stats, time.perf_counter() - t0, _client_threads()
+
+    replies, stats, elapsed, threads_during = get_bridge().submit(many()).result(timeout=10)
+    assert all(r == "t0 t1 t2 t3 t4 " for r in replies), f"[FAIL] Réponses : {replies[:2]}"
+    assert stats["tokens"] == {"prompt": 1, "completion": 5}, f"[FAIL] Stats : {stats}"
+    assert elapsed < 1.5, f"[FAIL] Générations sérialisées ({elapsed:.2f} s)"
+    assert threads_during == threads_before, "[FAIL] Un thread par génération"
+    print(f"[OK] 20 flux en {elapsed:.2f} s sur la boucle partagée.")
+
+    # 2. Requête simple, connexion keep-alive réutilisée
+    print("\n[TEST] chat() et réutilisation des connexions")
+    before = _StubOllama.connections
+
+    async def sequential():
+        return [await client.chat(f"q{i}") for i in range(10)]
+
+    assert get_bridge().submit(sequential()).result(timeout=10) == [f"stub:q{i}" for i in range(10)], "[FAIL] chat"
+    assert _StubOllama.connections == before, "[FAIL] Nouvelles connexions ouvertes"
+    print("[OK] Connexions du pool réutilisées.")
+
+    # 3. Annulation : la connexion est fermée, le serveur cesse d'émettre
+    print("\n[TEST] Annulation d'un flux")
+    first_token = threading.Event()
+
+    async def endless():
+        async for _ in client.stream_chat("infini"):
+            first_token.set()
+
+    future = get_bridge().submit(endless())
+    assert first_token.wait(5), "[FAIL] Aucun token reçu"
+    future.cancel()
+    assert _StubOllama.disconnected.wait(2), "[FAIL] Flux HTTP non fermé après annulation"
+    print("[OK] Flux fermé côté serveur après annulation.")
+
+    # 4. Ollama occupé (503) : requête renvoyée, nombre de tentatives borné
+    print("\n[TEST] 503 puis 200")
+    _StubOllama.busy_left, _StubOllama.requests = 1, 0
+    assert asyncio.run(client.chat("q")) == "stub:q" and _StubOllama.requests == 2, "[FAIL] 503 non retenté"
+    _StubOllama.busy_left, _StubOllama.requests = 1, 0
+    assert asyncio.run(_collect(client, "a")) == "t0 t1 t2 t3 t4 ", "[FAIL] 503 non retenté en flux"
+    assert _StubOllama.requests == 2, f"[FAIL] {_StubOllama.requests} requêtes envoyées"
+    busy = AsyncOllamaClient(url=client.url, model="stub", max_retries=2)
+    _StubOllama.busy_left, _StubOllama.requests = 10, 0
+    assert asyncio.run(busy.chat("q")) == "[Erreur de connexion à Ollama]", "[FAIL] 503 persistant"
+    assert _StubOllama.requests == 3, f"[FAIL] {_StubOllama.requests} requêtes pour max_retries=2"
+    _StubOllama.busy_left = 0
+    print("[OK] Requête renvoyée après un 503, abandon après max_retries.")
+
+    # 5. Serveur injoignable : message d'erreur habituel
+    print("\n[TEST] Serveur injoignable")
+    server.shutdown()
+    server.server_close()
+    down = AsyncOllamaClient(url=client.url, connect_timeout=1.0)
+    assert asyncio.run(down.chat("x")) == "[Erreur de connexion à Ollama]", "[FAIL] chat"
+    assert asyncio.run(_collect(down, "x")) == "\n[Erreur de connexion à Ollama]", "[FAIL] stream_chat"
+    print("[OK] Erreur de connexion rapportée.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
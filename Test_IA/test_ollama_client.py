@@ -0,0 +1,110 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ollama_api import OllamaClient
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Ollama simulé en HTTP/1.1 (keep-alive) ; une instance par connexion TCP."""
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    busy_left = 0  # réponses 503 (Ollama occupé) avant de répondre
+    requests = 0
+
+    def setup(self):
+        super().setup()
+        _StubOllama.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _StubOllama.requests += 1
+        if _StubOllama.busy_left > 0:
+            _StubOllama.busy_left -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if body["messages"][-1]["content"] == "lent":
+            time.sleep(1.0)
+        if body.get("stream"):
+            lines = [{"message": {"content": w}, "done": False} for w in ("Bon", "jour")]
+            lines.append({"model": body["model"], "done": True, "prompt_eval_count": 3, "eval_count": 2})
+            data = "".join(json.dumps(line) + "\n" for line in lines)
+        else:
+            data = json.dumps({"message": {"content": f"{body['model']}:{body['messages'][-1]['content']}"}})
+        payload = data.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except OSError:
+            pass  # client parti (timeout de lecture)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_tests():
+    print("=== TEST CLIENT OLLAMA (SESSION PERSISTANTE) ===")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+    client = OllamaClient(url=url, model="stub", read_timeout=0.5)
+
+    # 1. Connexion réutilisée entre requêtes (simples et en flux)
+    print("\n[TEST] Réutilisation de la connexion")
+    for i in range(20):
+        assert client.chat(f"q{i}") == f"stub:q{i}", "[FAIL] Réponse inattendue"
+    tokens = []
+    stats = client.chat_stream([{"role": "user", "content": "salut"}], tokens.append)
+    assert "".join(tokens) == "Bonjour" and stats["tokens"] == {"prompt": 3, "completion": 2}, "[FAIL] Flux"
+    assert _StubOllama.connections == 1, f"[FAIL] {_StubOllama.connections} connexions ouvertes"
+    print("[OK] 21 requêtes sur une seule connexion TCP.")
+
+    # 2. Endpoint / modèle propres au client
+    other = OllamaClient(url=url, model="autre")
+    assert other.chat("x") == "autre:x", "[FAIL] Modèle du client ignoré"
+    print("\n[OK] Modèle configurable par client.")
+
+    # 3. Timeout de lecture
+    print("\n[TEST] Timeout de lecture")
+    t0 = time.perf_counter()
+    assert client.chat("lent") == "[Erreur de connexion à Ollama]", "[FAIL] Timeout non déclenché"
+    assert time.perf_counter() - t0 < 0.9, "[FAIL] Timeout trop tardif"
+    print("[OK] Requête abandonnée après le timeout de lecture.")
+
+    # 4. Ollama occupé (503) : POST renvoyé, puis réponse
+    print("\n[TEST] 503 puis 200")
+    _StubOllama.busy_left, _StubOllama.requests = 1, 0
+    assert client.chat("q") == "stub:q", "[FAIL] 503 non retenté"
+    assert _StubOllama.requests == 2, f"[FAIL] {_StubOllama.requests} requêtes envoyées"
+    _StubOllama.busy_left, _StubOllama.requests = 1, 0
+    tokens = []
+    client.chat_stream("salut", tokens.append)
+    assert "".join(tokens) == "Bonjour" and _StubOllama.requests == 2, "[FAIL] 503 non retenté en flux"
+    print("[OK] Requête renvoyée après un 503.")
+
+    # 5. Serveur absent : nouvelles tentatives bornées puis erreur
+    print("\n[TEST] Serveur injoignable")
+    down = OllamaClient(url=f"http://127.0.0.1:{_free_port()}/api/chat", max_retries=2)
+    t0 = time.perf_counter()
+    assert down.chat("x") == "[Erreur de connexion à Ollama]", "[FAIL] Erreur attendue"
+    print(f"[OK] Échec rapporté après nouvelles tentatives ({time.perf_counter() - t0:.2f} s).")
+
+    server.shutdown()
+    server.server_close()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,67 @@
+import json
+import os
+import time
+from IA_V2.conversations import conversation_manager as cm
+
+REG = cm._ATTACHED_DOCS_REGISTRY
+
+
+def _write_external(data):
+    """Écriture par un "autre process" : mtime/taille changent."""
+    time.sleep(0.01)
+    with open(REG, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def run_tests():
+    print("=== TEST CACHE DU REGISTRE DES DOCS ===")
+    cm.flush_writes()
+
+    reads = []
+    original_read = cm._read_registry_file
+    cm._read_registry_file = lambda: reads.append(1) or original_read()
+    try:
+        # 1. Lectures répétées : aucune relecture du fichier
+        print("\n[TEST] Lectures en cache")
+        cm.add_reference_doc_by_id("reg-a", "doc_a.txt").result()
+        cm.flush_writes()
+        reads.clear()
+        for _ in range(1000):
+            docs = cm.get_reference_docs_by_id("reg-a")
+        assert docs == [os.path.abspath("doc_a.txt")], f"[FAIL] Docs inattendus : {docs}"
+        assert not reads, f"[FAIL] {len(reads)} relectures du registre"
+        print("[OK] 1000 lectures sans relire attached_docs.json.")
+
+        # 2. Modification externe détectée (mtime/taille)
+        print("\n[TEST] Modification par un autre process")
+        disk = json.load(open(REG, encoding="utf-8"))
+        disk["reg-ext"] = {"reference_docs": ["/ext.txt"]}
+        _write_external(disk)
+        assert cm.get_reference_docs_by_id("reg-ext") == ["/ext.txt"], "[FAIL] Modification externe ignorée"
+        assert len(reads) == 1, "[FAIL] Relecture attendue une seule fois"
+        print("[OK] Registre relu une fois après changement sur disque.")
+    finally:
+        cm._read_registry_file = original_read
+
+    # 3. Écriture différée fusionnée avec une écriture concurrente
+    print("\n[TEST] Fusion avec une écriture concurrente")
+    cm.add_reference_doc_by_id("reg-a", "doc_b.txt").result()  # en attente d'écriture
+    disk = json.load(open(REG, encoding="utf-8"))
+    disk["reg-other"] = {"reference_docs": ["/other.txt"]}
+    _write_external(disk)
+    cm.flush_writes()
+    disk = json.load(open(REG, encoding="utf-8"))
+    assert disk.get("reg-other") == {"reference_docs": ["/other.txt"]}, "[FAIL] Écriture concurrente perdue"
+    assert disk["reg-a"]["reference_docs"] == [os.path.abspath("doc_a.txt"), os.path.abspath("doc_b.txt")], \
+        "[FAIL] Ajout local perdu"
+    print("[OK] Les deux modifications sont sur disque.")
+
+    for conv_id in ("reg-a", "reg-ext", "reg-other"):
+        cm._registry_remove(conv_id)
+    cm.flush_writes()
+    assert not {"reg-a", "reg-ext", "reg-other"} & set(json.load(open(REG, encoding="utf-8"))), "[FAIL] Nettoyage"
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
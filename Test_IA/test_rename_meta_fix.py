@@ -20,11 +20,11 @@ def print_state(conv_id):
     print(f"[CHECK] META path -> {meta_path} | Exists: {os.path.exists(meta_path)}")
     print(f"Meta title: {meta.get('title')}")
     meta_file = meta.get("file", "NON DEFINI")
-    print(f"Meta file: {meta_file} | Exists: {os.path.exists(os.path.join(store.CONVERSATION_DIR, meta_file))}")
+    print(f"Meta file: {meta_file} | Exists: {os.path.exists(os.path.join(os.path.dirname(txt_path), meta_file))}")
     item = next((it for it in idx['items'] if it['id'] == conv_id), None)
     if item:
         idx_file = item.get("file", "NON DEFINI")
-        print(f"Index file: {idx_file} | Exists: {os.path.exists(os.path.join(store.CONVERSATION_DIR, idx_file))}")
+        print(f"Index file: {idx_file} | Exists: {os.path.exists(os.path.join(os.path.dirname(txt_path), idx_file))}")
     else:
         print("Index entry: ABSENT")
     print("==============================")
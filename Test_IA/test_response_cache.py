@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ollama_api import CACHE_MISS_REPLY, AsyncOllamaClient, OllamaClient
+from response_cache import ResponseCache, cache_key
+from IA_V2.Test_IA import eval_mistral
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Ollama simulé : 0,2 s par réponse, requêtes comptées."""
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _StubOllama.calls += 1
+        time.sleep(0.2)
+        payload = json.dumps({"message": {"content": f"réponse à {body['messages'][-1]['content']}"}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_tests():
+    print("=== TEST CACHE DES RÉPONSES OLLAMA ===")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+    det = {"temperature": 0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "cache"), max_bytes=1_000_000)
+        client = OllamaClient(url=url, model="stub", cache=cache)
+
+        # 1. Requête déterministe : 2e appel servi par le cache
+        print("\n[TEST] Suite d'évals rejouée")
+        prompts = [f"question {i}" for i in range(10)]
+        t0 = time.perf_counter()
+        first = [client.chat(p, options=det) for p in prompts]
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        second = [client.chat(p, options=det) for p in prompts]
+        warm = time.perf_counter() - t0
+        assert first == second and _StubOllama.calls == 10, f"[FAIL] {_StubOllama.calls} requêtes envoyées"
+        assert warm < cold / 10, f"[FAIL] Cache lent ({warm:.3f} s)"
+        print(f"[OK] 1er passage {cold:.2f} s, 2e passage {warm * 1000:.1f} ms.")
+
+        # 2. Requête échantillonnée : pas de cache, sauf forcé
+        print("\n[TEST] Température > 0")
+        client.chat("libre")
+        client.chat("libre", options={"temperature": 0.7})
+        assert _StubOllama.calls == 12, "[FAIL] Requête échantillonnée mise en cache"
+        client.chat("libre", force_cache=True)
+        client.chat("libre", force_cache=True)
+        assert _StubOllama.calls == 13, "[FAIL] force_cache ignoré"
+        print("[OK] Cache contourné, sauf force_cache.")
+
+        # 3. Clé canonique
+        print("\n[TEST] Clé canonique")
+        msgs = [{"role": "user", "content": "x"}]
+        assert cache_key("m", msgs, {"temperature": 0, "seed": 1}) == cache_key("m", msgs, {"seed": 1, "temperature": 0})
+        assert cache_key("m", msgs, det) != cache_key("autre", msgs, det), "[FAIL] Modèle ignoré"
+        print("[OK] Ordre des options indifférent, modèle pris en compte.")
+
+        # 4. Mode replay : aucune requête réseau
+        print("\n[TEST] Mode replay")
+        replay = OllamaClient(url=url, model="stub", cache=ResponseCache(cache.directory, mode="replay"))
+        assert replay.chat("question 3", options=det) == "réponse à question 3", "[FAIL] Réponse rejouée"
+        assert replay.chat("inconnue", options=det) == CACHE_MISS_REPLY, "[FAIL] Absence non signalée"
+        assert _StubOllama.calls == 13, "[FAIL] Requête envoyée en mode replay"
+        print("[OK] Réponses rejouées, absente = erreur sans appel réseau.")
+
+        # 5. Client asyncio : même cache
+        print("\n[TEST] Client asyncio")
+        async_client = AsyncOllamaClient(url=url, model="stub", cache=cache)
+        assert asyncio.run(async_client.chat("question 5", options=det)) == "réponse à question 5"
+        assert _StubOllama.calls == 13, "[FAIL] Cache ignoré par le client asyncio"
+        print("[OK] Réponse servie par le cache.")
+
+        # 5 bis. Flux (raccourcis F2-F4 de l'interface) : options déterministes -> cache
+        print("\n[TEST] stream_chat avec options déterministes")
+
+        async def _stream(prompt, options):
+            return "".join([t async for t in async_client.stream_chat(prompt, options=options)])
+
+        assert asyncio.run(_stream("raccourci F2", det)) == "réponse à raccourci F2"
+        assert asyncio.run(_stream("raccourci F2", det)) == "réponse à raccourci F2"
+        assert _StubOllama.calls == 14, f"[FAIL] {_StubOllama.calls - 13} requêtes pour un flux répété"
+        asyncio.run(_stream("raccourci F2", None))
+        assert _StubOllama.calls == 15, "[FAIL] Flux sans options servi par le cache"
+        print("[OK] Flux répété servi par le cache, flux libre envoyé.")
+
+        # 6. Éviction LRU par taille
+        print("\n[TEST] Éviction LRU")
+        small = ResponseCache(os.path.join(tmp, "small"), max_bytes=1000)
+        keys = [cache_key("m", [{"role": "user", "content": str(i)}], det) for i in range(6)]
+        for i, key in enumerate(keys[:5]):
+            small.put(key, "m", "x" * 100)
+            time.sleep(0.01)
+        small.get(keys[0])  # relue : devient la plus récente
+        small.put(keys[5], "m", "x" * 400)
+        present = [small.get(k) is not None for k in keys]
+        assert present == [True, False, False, True, True, True], f"[FAIL] {present}"
+        assert small.stats()["bytes"] <= 1000, "[FAIL] Taille max dépassée"
+        print(f"[OK] Entrées les moins récemment lues supprimées : {small.stats()}")
+
+        # 7. Évaluation Mistral rejouée : une seule requête par prompt
+        print("\n[TEST] eval_mistral exécuté deux fois")
+        evals = OllamaClient(url=url, model="stub", cache=ResponseCache(os.path.join(tmp, "evals")))
+        n_prompts = sum(len(tests) for tests in eval_mistral.TESTS.values())
+        before = _StubOllama.calls
+        for run in range(2):
+            eval_mistral.exécuter_tests(query=evals.chat, chemin_rapport=os.path.join(tmp, f"rapport{run}.txt"))
+        assert _StubOllama.calls - before == n_prompts, f"[FAIL] {_StubOllama.calls - before} requêtes pour {n_prompts} prompts"
+        print(f"[OK] {n_prompts} requêtes pour deux passages.")
+
+    server.shutdown()
+    server.server_close()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
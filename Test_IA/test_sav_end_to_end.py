@@ -78,7 +78,7 @@ def run_tests():
 
     # 5. Suppression
     print("\n[TEST] Suppression conversation")
-    cm.delete_conversation(cid)
+    cm.delete_conversation(cid).result()
     assert not os.path.exists(store.file_path(cid)), "[FAIL] Fichier TXT toujours présent après suppression"
     assert not os.path.exists(store.meta_path(cid)), "[FAIL] Fichier META toujours présent après suppression"
     print("[OK] Suppression individuelle fonctionnelle.")
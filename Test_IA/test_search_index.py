@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from IA_V2.conversations import conversation_manager as cm
+from IA_V2.conversations.search_index import SearchIndex
+
+
+def run_tests():
+    print("=== TEST RECHERCHE PLEIN TEXTE ===")
+    cm.ensure_search_index()
+
+    a = cm.create_conversation("Recettes")["id"]
+    cm.append_message_by_id(a, "user", "Comment réussir une pâte brisée ?")
+    cm.append_message_by_id(a, "assistant", "Farine, beurre froid, une pincée de sel et de l'eau glacée.").result()
+    time.sleep(1.1)  # conv_id horodaté à la seconde
+    b = cm.create_conversation("Python")["id"]
+    cm.append_message_by_id(b, "user", "Écris une fonction Python qui trie une liste.")
+    cm.append_message_by_id(b, "assistant", "Utilise sorted(liste) ; pour la pâte, voir l'autre conversation.").result()  # search() n'attend pas la file d'écriture
+
+    # 1. ET des mots, casse et accents ignorés, positions exactes
+    print("\n[TEST] Recherche multi-mots insensible aux accents")
+    res = cm.search("PATE brisee")
+    assert [(r["conv_id"], r["position"]) for r in res] == [(a, 0)], f"[FAIL] Résultats inattendus : {res}"
+    assert "pâte brisée" in res[0]["snippet"] and res[0]["title"] == "Recettes", "[FAIL] Extrait/titre incorrect"
+    print(f"[OK] {res[0]['snippet']}")
+
+    # 2. Plus récents d'abord
+    print("\n[TEST] Tri chronologique inverse")
+    res = cm.search("pâte")
+    assert [(r["conv_id"], r["position"]) for r in res] == [(b, 1), (a, 0)], "[FAIL] Ordre des résultats"
+    print("[OK] Conversation la plus récente en premier.")
+
+    # 3. Persistance : un nouvel index rejoue le journal
+    print("\n[TEST] Rechargement depuis le journal")
+    fresh = SearchIndex(cm._search.path, cm._search._read_messages)
+    assert [(r["conv_id"], r["position"]) for r in fresh.search("sorted")] == [(b, 1)], "[FAIL] Journal incomplet"
+    print("[OK] Index identique après rechargement.")
+
+    # 4. Reconstruction hors thread d'écriture : écritures pendant la construction rattrapées
+    print("\n[TEST] Reconstruction pendant des écritures")
+    snapshot = cm._writer.call(cm._search_snapshot)
+    staging, _ = cm._search.build(cm._snapshot_messages(snapshot))
+    cm.append_message_by_id(a, "user", "Et une pâte sablée ?").result(timeout=1)  # thread d'écriture libre
+    assert [r["position"] for r in cm._search.search("sablee")] == [2], "[FAIL] Index en service non alimenté"
+    cm.delete_conversation(b).result(timeout=1)
+    cm._writer.call(cm._apply_search_delta, staging, snapshot)
+    assert [(r["conv_id"], r["position"]) for r in cm.search("pâte")] == [(a, 2), (a, 0)], "[FAIL] Delta non appliqué"
+    assert not os.path.exists(staging.path), "[FAIL] Fichier de construction laissé"
+    fresh = SearchIndex(cm._search.path, cm._search._read_messages)
+    assert [r["position"] for r in fresh.search("sablee")] == [2] and not fresh.search("sorted"), "[FAIL] Journal installé"
+    print("[OK] Ajout et suppression survenus pendant la construction pris en compte.")
+
+    # 5. Suppression
+    print("\n[TEST] Suppression d'une conversation")
+    c = cm.create_conversation("Python bis")["id"]
+    cm.append_message_by_id(c, "user", "Encore de la pâte.").result()
+    cm.delete_conversation(c).result()
+    assert [r["conv_id"] for r in cm.search("pâte")] == [a, a], "[FAIL] Conversation supprimée encore trouvée"
+    print("[OK] Plus de résultats pour la conversation supprimée.")
+    cm.delete_conversation(a).result()
+
+    # 6. Journal terminé par une ligne déchirée : tronquée avant le prochain ajout
+    print("\n[TEST] Ligne déchirée en fin de journal")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search_index.jsonl")
+        with open(path, "wb") as f:
+            f.write(b'{"c": "conv-a", "p": 0, "t": ["avant"]}\n{"c": "conv-a", "p": 1, "t": ["dech')
+        idx = SearchIndex(path, lambda c, s, e: [{"content": ""}])
+        idx.add_message("conv-a", 2, "après le crash")
+        reloaded = SearchIndex(path, lambda c, s, e: [{"content": ""}])
+        found = {t: [r["position"] for r in reloaded.search(t)] for t in ("avant", "apres", "dech")}
+        assert found == {"avant": [0], "apres": [2], "dech": []}, f"[FAIL] {found}"
+    print("[OK] Ligne partielle retirée, ajout suivant lisible.")
+
+    # 7. Temps de recherche sur un gros volume synthétique (hors disque)
+    print("\n[TEST] Temps de recherche sur 100 000 messages")
+    rnd = random.Random(0)
+    vocab = [f"mot{i}" for i in range(20000)]
+    convs = ((f"2025-01-01_00-00-{c:05d}", ({"content": " ".join(rnd.choices(vocab, k=20))} for _ in range(200)))
+             for c in range(500))
+    with tempfile.TemporaryDirectory() as tmp:
+        big = SearchIndex(os.path.join(tmp, "search_index.jsonl"), lambda c, s, e: [{"content": ""}])
+        big.rebuild(convs)
+        for query in ("mot1", "mot1 mot2", "mot19999 mot5"):
+            t0 = time.perf_counter()
+            big.search(query, limit=20)
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"   '{query}' : {elapsed:.1f} ms")
+            assert elapsed < 50, "[FAIL] Recherche trop lente"
+
+        # Démarrage à froid : journal rejoué par la tâche de fond, pas par la 1re recherche
+        cold = SearchIndex(big.path, lambda c, s, e: [{"content": ""}])
+        t0 = time.perf_counter()
+        loader = threading.Thread(target=cold.load, daemon=True)
+        loader.start()
+        loader.join()
+        print(f"   rechargement à froid (thread de fond) : {time.perf_counter() - t0:.2f} s")
+        t0 = time.perf_counter()
+        cold.search("mot1 mot2", limit=20)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"   1re recherche après préchargement : {elapsed:.1f} ms")
+        assert elapsed < 50, "[FAIL] Première recherche payant le rechargement"
+    print("[OK] Recherche sous 50 ms, y compris la première après démarrage à froid.")
+
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
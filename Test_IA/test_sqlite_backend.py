@@ -0,0 +1,54 @@
+import os
+import time
+from IA_V2.conversations import storage_fs as fs
+from IA_V2.conversations import storage_sqlite as db
+
+
+def run_tests():
+    print("=== TEST BACKEND SQLITE ===")
+
+    # 1. CRUD direct sur le backend SQLite
+    print("\n[TEST] Création / append / lecture")
+    conv = db.create_conv("Titre SQLite")
+    cid = conv["id"]
+    db.append_message(cid, "user", "Bonjour !")
+    db.append_message(cid, "assistant", "Ligne 1\nLigne 2")
+    meta = db.read_meta(cid)
+    assert meta["message_count"] == 2, "[FAIL] message_count incorrect"
+    txt = db.read_conv_text(cid)
+    assert "USER: Bonjour !" in txt and "Ligne 2" in txt, "[FAIL] Rendu texte incorrect"
+    print("[OK] Append transactionnel et rendu texte fonctionnels.")
+
+    # 2. Renommages + résolution par nom de fichier virtuel
+    print("\n[TEST] Renommages")
+    db.rename_title(cid, "Nouveau titre")
+    db.rename_file(cid, "Renomme.txt")
+    assert db.resolve_conv_id("Renomme.txt") == cid, "[FAIL] Résolution par fichier"
+    assert db.read_meta(cid)["title"] == "Renomme", "[FAIL] Titre après renommage fichier"
+    print("[OK] Renommages fonctionnels.")
+
+    # 3. Suppression (messages supprimés en cascade)
+    db.delete_conv(cid)
+    assert db.get_index_item(cid) is None, "[FAIL] Conversation toujours présente"
+    print("[OK] Suppression fonctionnelle.")
+
+    # 4. Migration depuis storage_fs (relançable sans doublon)
+    print("\n[TEST] Migration fs -> SQLite")
+    time.sleep(1)
+    src = fs.create_conv("À migrer")
+    fs.append_message(src["id"], "user", "Question ?")
+    fs.append_message(src["id"], "assistant", "Réponse\nmulti-lignes")
+    stats = db.migrate_from_fs()
+    assert db.get_index_item(src["id"]) is not None, "[FAIL] Conversation non migrée"
+    assert db.read_conv_text(src["id"]) == fs.read_conv_text(src["id"]), "[FAIL] Contenu migré différent"
+    stats2 = db.migrate_from_fs()
+    assert stats2["migrated"] == 0 and stats2["skipped"] >= stats["migrated"], "[FAIL] Migration non idempotente"
+    print("[OK] Migration fidèle et idempotente.")
+
+    db.delete_conv(src["id"])
+    fs.delete_conv(src["id"])
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from IA_V2.conversations import conversation_manager as cm
+from IA_V2.conversations.storage_writer import StorageWriter
+
+
+def run_tests():
+    print("=== TEST THREAD D'ÉCRITURE ===")
+
+    # 1. Ordre FIFO et barrière flush()
+    print("\n[TEST] Ordre des écritures + flush()")
+    w = StorageWriter(maxsize=4, name="test-writer")
+    seen = []
+    for i in range(20):
+        w.submit(seen.append, i, key="conv")
+    assert w.flush(timeout=5), "[FAIL] flush() n'a pas rendu la main"
+    assert seen == list(range(20)), "[FAIL] Ordre des écritures non respecté"
+    assert w.pending_count() == 0, "[FAIL] Écritures encore en attente après flush()"
+    print("[OK] Ordre FIFO respecté, barrière fonctionnelle.")
+
+    # 2. Les erreurs remontent par le Future
+    print("\n[TEST] Propagation des erreurs")
+    fut = w.submit(lambda: 1 / 0)
+    try:
+        fut.result(timeout=5)
+        raise AssertionError("[FAIL] Exception perdue")
+    except ZeroDivisionError:
+        pass
+    assert w.call(lambda: 42) == 42, "[FAIL] call() ne renvoie pas le résultat"
+    print("[OK] Exception transmise au Future, le thread continue.")
+
+    # 3. File bornée : l'appelant n'attend que si la file est pleine
+    print("\n[TEST] Contre-pression de la file bornée")
+    gate = threading.Event()
+    w.submit(gate.wait)
+    for _ in range(4):
+        w.submit(lambda: None)          # remplit la file (maxsize=4)
+    blocked = threading.Thread(target=lambda: w.submit(lambda: None))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive(), "[FAIL] submit() n'a pas attendu sur file pleine"
+    gate.set()
+    blocked.join(5)
+    assert not blocked.is_alive(), "[FAIL] submit() toujours bloqué après vidage"
+    w.close(timeout=5)
+    print("[OK] Contre-pression effective, reprise après vidage.")
+
+    # 4. Façade : append non bloquant + lecture cohérente
+    print("\n[TEST] Façade : append asynchrone, read-your-writes")
+    conv = cm.create_conversation("Test writer")
+    cid = conv["id"]
+    t0 = time.perf_counter()
+    futures = [cm.append_message_by_id(cid, "user", f"message {i}") for i in range(50)]
+    print(f"   Soumission de 50 appends : {(time.perf_counter() - t0) * 1000:.1f} ms")
+    msgs = cm.read_messages(cid)
+    assert [m["content"] for m in msgs] == [f"message {i}" for i in range(50)], "[FAIL] Lecture incohérente"
+    assert all(f.done() for f in futures), "[FAIL] Lecture avant la fin des écritures"
+    print("[OK] Les lectures voient toutes les écritures soumises.")
+
+    # 5. Façade : opérations de l'UI sans attendre le thread d'écriture
+    print("\n[TEST] Façade : création, renommage, docs, suppression non bloquants")
+    time.sleep(1.1)  # conv_id horodaté à la seconde
+    old_file = cm.store.get_index_item(cid)["file"]
+    gate = threading.Event()
+    cm._writer.submit(gate.wait)  # thread d'écriture occupé
+    t0 = time.perf_counter()
+    created = cm.create_new_conversation_async()
+    renamed = cm.rename_conversation_file_async(old_file, "Renommée writer.txt")
+    cm.add_reference_doc_by_id(cid, "doc_writer.txt")
+    docs = cm.get_reference_docs_by_id(cid)
+    deleted = cm.delete_conversation_file_async(old_file)
+    listed = [it["id"] for it in cm.list_conversations_page(limit=1000)["items"]]
+    elapsed = time.perf_counter() - t0
+    gate.set()
+    assert elapsed < 0.1 and not created.done(), f"[FAIL] Attente du thread d'écriture ({elapsed:.2f} s)"
+    assert docs == [os.path.abspath("doc_writer.txt")], f"[FAIL] Doc en file non visible : {docs}"
+    assert cid not in listed, "[FAIL] Suppression en file encore listée"
+    assert renamed.result(timeout=5) == (True, "") and deleted.result(timeout=5) == (True, ""), "[FAIL] Résultats"
+    path = created.result(timeout=5)
+    assert cm.conversation_exists(path), "[FAIL] Conversation non créée"
+    print(f"[OK] Soumission en {elapsed * 1000:.1f} ms, résultats livrés par les Futures.")
+
+    cm.delete_conversation(cm.resolve_conv_id(os.path.basename(path))).result()
+    print("\n=== FIN TESTS ===")
+
+
+if __name__ == "__main__":
+    run_tests()
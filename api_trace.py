@@ -0,0 +1,204 @@
+"""
+api_trace.py
+Trace des échanges avec l'API Ollama (DEBUG_API) :
+- écriture par un thread de fond, lignes mises en file puis écrites par lots
+  dans un fichier gardé ouvert (plus d'ouverture/fermeture par ligne)
+- rotation par taille (API_TRACE_MAX_BYTES, API_TRACE_BACKUPS fichiers gardés)
+- payloads sur une ligne, textes longs tronqués + empreinte sha1
+  (API_TRACE_MAX_FIELD_CHARS) : un doc joint n'est pas recopié à chaque tour
+- échantillonnage par requête (API_TRACE_SAMPLE_RATE) ; erreurs toujours tracées
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+from config import (
+    DEBUG_API, API_TRACE_FILE, API_TRACE_MAX_BYTES, API_TRACE_BACKUPS,
+    API_TRACE_SAMPLE_RATE, API_TRACE_MAX_FIELD_CHARS, API_TRACE_TOKENS,
+)
+
+# lignes en attente au-delà desquelles on abandonne (compteur "dropped")
+QUEUE_MAX = 10_000
+# lignes écrites au plus par lot / attente max avant écriture d'un lot (s)
+BATCH_MAX = 512
+FLUSH_INTERVAL = 0.2
+
+def _ts():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _shorten(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    digest = hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()[:12]
+    return f"{text[:max_chars]}…[+{len(text) - max_chars} car. sha1:{digest}]"
+
+def summarize(obj, max_chars=API_TRACE_MAX_FIELD_CHARS):
+    """Copie de obj (dict/list/str) aux chaînes longues tronquées, pour la trace."""
+    if isinstance(obj, str):
+        return _shorten(obj, max_chars)
+    if isinstance(obj, dict):
+        return {k: summarize(v, max_chars) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [summarize(v, max_chars) for v in obj]
+    return obj
+
+class TraceLogger:
+    """Écrit les lignes reçues (write) depuis un thread de fond, par lots, avec rotation."""
+
+    def __init__(self, path=API_TRACE_FILE, max_bytes=API_TRACE_MAX_BYTES, backups=API_TRACE_BACKUPS,
+                 truncate=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=QUEUE_MAX)
+        self._file = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if truncate:
+            try:
+                with open(path, "w", encoding="utf-8"):
+                    pass
+            except Exception:
+                pass
+
+    def write(self, line):
+        """Met une ligne en file (jamais bloquant) ; ignorée si la file est pleine."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(f"{_ts()} {line}\n")
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Attend que les lignes déjà en file soient écrites."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join(timeout=5)
+                self._thread = None
+
+    # --- thread d'écriture ---
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="api-trace", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, events, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if stop or events or len(batch) >= BATCH_MAX:
+                    break
+                try:
+                    item = self._queue.get(timeout=FLUSH_INTERVAL if batch else 0)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch("".join(batch))
+            for ev in events:
+                ev.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write_batch(self, text):
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            size = self._file.tell()
+            if self.max_bytes and size and size + len(text) > self.max_bytes:
+                self._rotate()
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(text)
+            self._file.flush()
+        except Exception:
+            self._file = None
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+class RequestTrace:
+    """Trace d'une requête : tout ou rien selon l'échantillonnage, erreurs toujours écrites."""
+
+    __slots__ = ("logger", "sampled")
+
+    def __init__(self, logger, sampled):
+        self.logger = logger
+        self.sampled = sampled
+
+    def line(self, text):
+        if self.sampled:
+            self.logger.write(text)
+
+    def json(self, label, obj):
+        if self.sampled:
+            try:
+                self.logger.write(f"{label} {json.dumps(summarize(obj), ensure_ascii=False)}")
+            except Exception as e:
+                self.logger.write(f"[TRACE_JSON_ERROR] {e}")
+
+    def text(self, label, text):
+        if self.sampled:
+            self.logger.write(f"{label} {_shorten(text, API_TRACE_MAX_FIELD_CHARS)}")
+
+    def token(self, token):
+        if self.sampled and API_TRACE_TOKENS:
+            self.logger.write(f"[TOKEN] {token}")
+
+    def error(self, text):
+        if self.logger is not None:
+            self.logger.write(text)
+
+_NO_TRACE = RequestTrace(None, False)
+
+# Trace du process (fichier vidé à chaque lancement)
+_logger = TraceLogger(truncate=True) if DEBUG_API else None
+if _logger is not None:
+    atexit.register(_logger.close)
+
+def get_logger():
+    return _logger
+
+def start_request(sample_rate=API_TRACE_SAMPLE_RATE):
+    """RequestTrace pour une nouvelle requête (échantillonnée avec la probabilité sample_rate)."""
+    if _logger is None:
+        return _NO_TRACE
+    return RequestTrace(_logger, sample_rate >= 1.0 or random.random() < sample_rate)
@@ -2,12 +2,38 @@
 OLLAMA_URL = "http://localhost:11434/api/chat"
 OLLAMA_MODEL = "mistral"
 
+# Connexions HTTP vers Ollama (session keep-alive partagée)
+OLLAMA_POOL_SIZE = 4              # connexions gardées ouvertes
+OLLAMA_CONNECT_TIMEOUT = 3.0      # s, établissement de la connexion
+OLLAMA_READ_TIMEOUT = 300.0       # s, attente max entre deux morceaux reçus
+OLLAMA_MAX_RETRIES = 2            # nouvelles tentatives si la connexion échoue ou sur 502/503/504
+
+# Cache disque des réponses (requêtes non streamées, ex. évals / raccourcis de dev) :
+#   "off"    : désactivé
+#   "on"     : réponses lues puis enregistrées dans le cache
+#   "replay" : lecture seule, aucune requête vers Ollama (absente = erreur)
+# Seules les requêtes avec options {"temperature": 0} passent par le cache,
+# sauf OLLAMA_CACHE_FORCE = True (toutes, même échantillonnées)
+OLLAMA_CACHE_MODE = "off"
+OLLAMA_CACHE_DIR = "cache_ollama"
+OLLAMA_CACHE_MAX_BYTES = 50_000_000   # ~50MB, éviction des moins récemment lues
+OLLAMA_CACHE_FORCE = False
+# Options des requêtes rejouables (évals, test mémoire, raccourcis de dev) :
+# réponses reproductibles, donc servies par le cache quand il est activé
+OLLAMA_DETERMINISTIC_OPTIONS = {"temperature": 0, "seed": 42}
+
 # =========================
 # 🔎 Debug / Journalisation (Doc §2, §12)
 # =========================
 # Active l'écriture des échanges API dans un fichier dédié
 DEBUG_API = True
 API_TRACE_FILE = "api_trace.log"  # Fichier dédié aux messages envoyés/réponses API
+# Trace écrite par un thread de fond (lots), sans bloquer les requêtes
+API_TRACE_MAX_BYTES = 5_000_000   # rotation au-delà (api_trace.log.1, .2, ...)
+API_TRACE_BACKUPS = 3             # fichiers de rotation conservés
+API_TRACE_SAMPLE_RATE = 1.0       # part des requêtes tracées (0.0 à 1.0 ; erreurs toujours tracées)
+API_TRACE_MAX_FIELD_CHARS = 500   # textes plus longs tronqués + empreinte sha1
+API_TRACE_TOKENS = False          # une ligne par token streamé (très verbeux)
 
 # Configuration fenêtre
 WINDOW_WIDTH = 960
@@ -56,6 +82,7 @@ SIDEBAR_ROW_HEIGHT = 42           # hauteur d'une ligne (px)
 SIDEBAR_ICON_SIZE = (20, 20)      # taille icône menu "..."
 SIDEBAR_ICON_PADDING = (6, 6)     # padding autour de l'icône
 SIDEBAR_PREVIEW_MAXLEN = 80       # longueur max du preview (avec ellipsis)
+SIDEBAR_PAGE_SIZE = 50            # conversations chargées par page (bouton "Plus…")
 
 # libellés menu contextuel
 MENU_ACTIONS = ("Renommer", "Supprimer")
@@ -81,3 +108,60 @@ REFERENCE_DOCS_FOOTER = "[/DOCS_PARTAGES_DE_LA_CONVERSATION]"
 
 # Taille maximale lue par doc (sécurité simple)
 REFERENCE_DOC_MAX_BYTES = 2_000_000  # ~2MB
+
+# Cache mémoire partagé des contenus de docs (LRU, budget total en octets)
+REFERENCE_DOC_CACHE_MAX_BYTES = 32_000_000  # ~32MB
+# Docs au-delà de cette taille lus via mmap
+REFERENCE_DOC_MMAP_THRESHOLD = 1_000_000    # ~1MB
+
+# Sélection des passages envoyés au modèle (au lieu des docs entiers) :
+# docs découpés en morceaux, meilleurs morceaux (BM25) pour chaque message
+REFERENCE_CHUNK_CHARS = 1200      # taille visée d'un morceau (caractères)
+REFERENCE_CHUNK_OVERLAP = 150     # recouvrement entre morceaux consécutifs
+REFERENCE_TOP_K = 6               # morceaux max par message
+REFERENCE_TOKEN_BUDGET = 1500     # budget de tokens des passages par message
+REFERENCE_CHARS_PER_TOKEN = 4     # estimation caractères / token
+
+# Recherche sémantique (optionnelle, nécessite numpy) : morceaux vectorisés
+# par Ollama, vecteurs gardés sur disque par version de doc ; repli BM25
+REFERENCE_EMBEDDINGS_ENABLED = False
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embed"
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+EMBEDDINGS_BATCH_SIZE = 32
+EMBEDDINGS_DIR = "conversations/sav_conversations/embeddings"
+
+# =========================
+# 💾 Stockage des conversations
+# =========================
+# Durabilité des écritures (latence vs pertes possibles en cas de crash) :
+#   "none"   : aucun fsync (le plus rapide ; le système écrit quand il veut)
+#   "batch"  : fsync groupé toutes les DURABILITY_BATCH_INTERVAL secondes
+#   "strict" : fsync à chaque écriture + dossier (le plus sûr, le plus lent)
+DURABILITY_MODE = "batch"
+DURABILITY_BATCH_INTERVAL = 1.0
+
+# Thread d'écriture du stockage : taille max de la file (contre-pression au-delà)
+STORAGE_WRITER_QUEUE_SIZE = 1024
+
+# Écriture différée de index.json : mutations regroupées sur ce délai (s)
+CONVERSATIONS_INDEX_FLUSH_DELAY = 0.5
+
+# Backend de stockage : "fs" (.txt/.json/index.json) ou "sqlite" (base unique WAL)
+CONVERSATIONS_BACKEND = "fs"
+CONVERSATIONS_SQLITE_PATH = "conversations/sav_conversations/conversations.sqlite3"
+
+# Disposition des fichiers : "sharded" (sous-dossiers AAAA-MM) ou "flat" (un seul dossier)
+# Les conversations existantes à plat restent lisibles ; migration :
+#   python -m IA_V2.Test_IA.migrate_conversations_shards
+CONVERSATIONS_LAYOUT = "sharded"
+
+# Archivage : conversations inactives depuis N jours compressées en .txt.gz
+# (lecture transparente ; 0 = jamais)
+CONVERSATIONS_ARCHIVE_AFTER_DAYS = 30
+
+# Format des nouvelles conversations : "jsonl" (1 message JSON par ligne) ou "text"
+CONVERSATION_RECORD_FORMAT = "jsonl"
+
+# Fenêtres de lecture (0 = toute la conversation)
+CHAT_CONTEXT_MAX_MESSAGES = 100   # historique envoyé au modèle
+CHAT_LOAD_MAX_MESSAGES = 200      # messages affichés à l'ouverture d'une conversation
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+backend.py
+Interface commune des backends de stockage des conversations + sélection.
+
+Un backend est un module exposant les fonctions de `ConversationBackend`
+(storage_fs, storage_sqlite). La façade conversation_manager ne dépend que
+de cette interface ; le backend actif est choisi par CONVERSATIONS_BACKEND
+dans config.py ("fs" par défaut).
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (façade / interface / implémentations)
+- §12 Constantes & Config (choix du backend centralisé)
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+try:
+    from config import CONVERSATIONS_BACKEND as _CONF_BACKEND
+except Exception:
+    _CONF_BACKEND = "fs"
+
+# nom de config -> module du package conversations
+BACKENDS = {
+    "fs": "storage_fs",
+    "sqlite": "storage_sqlite",
+}
+
+
+class ConversationBackend(Protocol):
+    """Fonctions attendues d'un module backend (typage structurel)."""
+
+    def ensure_dir(self) -> None: ...
+    def now_iso(self) -> str: ...
+    def ts_for_id(self) -> str: ...
+    def conv_id_from_filename(self, filename: str) -> Optional[str]: ...
+    def resolve_conv_id(self, filename: str) -> Optional[str]: ...
+    def file_path(self, conv_id: str) -> str: ...
+    def get_index_item(self, conv_id: str) -> Optional[Dict[str, Any]]: ...
+    def list_index_items_sorted(self) -> List[Dict[str, Any]]: ...
+    def list_page(
+        self, cursor: Optional[str] = None, limit: int = 50, tag: Optional[str] = None
+    ) -> Dict[str, Any]: ...
+    def list_conversation_files(self) -> List[str]: ...
+    def create_conv(self, title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]: ...
+    def append_message(
+        self,
+        conv_id: str,
+        role: str,
+        message: str,
+        model: Optional[str] = None,
+        tokens: Optional[Dict[str, int]] = None,
+        partial: bool = False,
+    ) -> None: ...
+    def read_conv_text(self, conv_id: str) -> str: ...
+    def iter_messages(self, conv_id: str) -> Iterator[Dict[str, Any]]: ...
+    def tail_messages(self, conv_id: str, n: int) -> List[Dict[str, Any]]: ...
+    def read_messages(self, conv_id: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]: ...
+    def read_meta(self, conv_id: str) -> Dict[str, Any]: ...
+    def rename_title(self, conv_id: str, new_title: str) -> Dict[str, Any]: ...
+    def rename_file(self, conv_id: str, new_name: str) -> Dict[str, Any]: ...
+    def delete_conv(self, conv_id: str) -> None: ...
+    def retitle_from_first_user_line(self, conv_id: str) -> Optional[str]: ...
+
+
+BACKEND_NAME = str(_CONF_BACKEND or "fs").strip().lower()
+
+
+def load_backend(name: Optional[str] = None) -> ConversationBackend:
+    """Importe et retourne le module backend demandé (défaut : config)."""
+    key = (name or BACKEND_NAME).strip().lower()
+    if key not in BACKENDS:
+        raise ValueError(f"Backend de conversations inconnu : {key!r} (attendu : {', '.join(BACKENDS)})")
+    return importlib.import_module(f".{BACKENDS[key]}", __package__)
@@ -4,6 +4,10 @@ conversations_manager.py
 Façade fine au-dessus de storage_fs :
 - API moderne par conv_id pour l’UI (recommandée)
 - API historique par filepath (compat), pour ne rien casser
+- Backend de stockage choisi dans config.py (storage_fs ou storage_sqlite)
+- Toutes les écritures passent par le thread storage_writer (jamais sur le
+  thread UI) ; les lectures attendent les écritures en attente de leur
+  conversation (read-your-writes)
 
 Conformité "Document d'apprentissage pour chartgpt.txt":
 - §1 Séparation des responsabilités (façade vs stockage)
@@ -15,24 +19,127 @@ from __future__ import annotations
 
 import os
 import json
-from typing import Dict, List, Optional, Any, Tuple
-
-from . import storage_fs as store
+import time
+import hashlib
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+
+from . import storage_fs as fs
+from .backend import load_backend
+from .file_lock import InterProcessLock
+from .search_index import INDEX_FILENAME as _SEARCH_INDEX_FILENAME, SearchIndex
+from .storage_writer import get_writer
+
+store = load_backend()
+_writer = get_writer()
+
+# clé des écritures du registre des docs dans la file d'écriture
+_REGISTRY_KEY = "__registry__"
+
+# Index de recherche plein texte, persisté à côté de index.json
+_search = SearchIndex(
+    os.path.join(os.path.dirname(fs.INDEX_PATH), _SEARCH_INDEX_FILENAME),
+    lambda conv_id, start, stop: store.read_messages(conv_id, start, stop),
+)
 
 
 # ============================================================================
-# Réparation automatique au démarrage
+# Réparation (complète à la demande, incrémentale en tâche de fond)
 # ============================================================================
+# Watermark de la dernière vérification incrémentale (hors candidats orphelins)
+REPAIR_STATE_PATH = os.path.join(fs.CONVERSATION_DIR, ".repair_state.json")
+
+# Âge minimal (s) d'un fichier orphelin avant suppression par la vérification
+# de fond : évite d'effacer une conversation en cours de création.
+ORPHAN_MIN_AGE = 60.0
+
+
+def _fix_meta_fields(conv_id: str, txt_file: str) -> bool:
+    """Corrige les champs 'file' et 'meta' des métadonnées ; True si réécrites."""
+    meta_path = fs.meta_path(conv_id)
+    if not os.path.exists(meta_path):
+        return False
+    meta_data = fs.read_meta(conv_id)
+    meta_changed = False
+
+    expected_meta_file = os.path.basename(txt_file)
+    expected_meta_meta = os.path.basename(meta_path)
+
+    if meta_data.get("file") != expected_meta_file:
+        meta_data["file"] = expected_meta_file
+        meta_changed = True
+
+    if meta_data.get("meta") != expected_meta_meta:
+        meta_data["meta"] = expected_meta_meta
+        meta_changed = True
+
+    if meta_changed:
+        fs.write_meta(conv_id, meta_data)
+    return meta_changed
+
+
+def _is_conv_name(name: str) -> bool:
+    """Fichier de conversation (texte, métadonnées, offsets, temporaire d'écriture)."""
+    return name.endswith(fs.CONV_EXT) or name.startswith((f"{fs.CONV_PREFIX}_", ".tmp_"))
+
+
+def _dir_signature(names) -> str:
+    """
+    Empreinte des seuls noms gérés par la réparation (fichiers de conversation,
+    shards) : index.json, l'état de réparation, l'index de recherche... sont
+    réécrits par renommage et changent le mtime de la racine à chaque session
+    sans rien changer à ce qui doit être vérifié.
+    """
+    relevant = sorted(n for n in names if _is_conv_name(n) or fs.is_shard_name(n))
+    return hashlib.sha1("\n".join(relevant).encode("utf-8")).hexdigest()
+
+
+def _remove_orphans(names_by_dir: Dict[str, Any], items: List[Dict[str, Any]], min_age: float = 0.0) -> Tuple[int, int]:
+    """
+    Supprime les fichiers de conversation non référencés par `items`, parmi
+    les noms listés par dossier ({dossier: noms}, racine et/ou shards).
+    Seuls les fichiers de conversation sont candidats (index.json, registre
+    des docs, base SQLite... vivent aussi dans ce dossier).
+    Retourne (supprimés, reportés car plus récents que min_age).
+    """
+    candidates = {
+        os.path.join(d, f) for d, names in names_by_dir.items() for f in names if _is_conv_name(f)
+    }
+    used_files = set()
+    for it in items:
+        d = fs.item_dir(it)
+        used_files.update(os.path.join(d, it[k]) for k in ("file", "meta") if it.get(k))
+        if it.get("file"):
+            used_files.add(os.path.join(d, it["file"] + fs.ARCHIVE_EXT))
+        if "id" in it:
+            used_files.add(os.path.join(d, f"{fs.CONV_PREFIX}_{it['id']}{fs.OFFSETS_EXT}"))
+    removed = deferred = 0
+    now = time.time()
+    for path in candidates - used_files:
+        try:
+            if min_age and now - os.path.getmtime(path) < min_age:
+                deferred += 1
+                continue
+            os.remove(path)
+            removed += 1
+        except Exception:
+            pass
+    return removed, deferred
+
+
 def repair_conversations():
     """
     Répare l'index et les fichiers de conversation :
     - Supprime les entrées dont le fichier .txt n'existe plus
     - Corrige les champs 'file' et 'meta' dans les métadonnées
     - Supprime les fichiers orphelins
+    (spécifique au backend fichiers ; parcourt TOUT, cf. check_conversations_incremental)
     """
-    store.ensure_dir()
+    fs.ensure_dir()
 
-    idx = store.load_index()
+    idx = fs.load_index()
     items = idx.get("items", [])
     new_items = []
     removed_count = 0
@@ -41,54 +148,168 @@ def repair_conversations():
     for item in items:
         conv_file = item.get("file")
         conv_id = item.get("id")
-        txt_path = os.path.join(store.CONVERSATION_DIR, conv_file) if conv_file else None
+        txt_path = os.path.join(fs.item_dir(item), conv_file) if conv_file else None
 
-        if not conv_file or not os.path.exists(txt_path):
+        if not conv_file or not (os.path.exists(txt_path) or os.path.exists(txt_path + fs.ARCHIVE_EXT)):
             removed_count += 1
             continue
 
-        meta_path = store.meta_path(conv_id)
-        if os.path.exists(meta_path):
-            meta_data = store.read_meta(conv_id)
-            meta_changed = False
+        if _fix_meta_fields(conv_id, txt_path):
+            fixed_meta_count += 1
 
-            expected_meta_file = os.path.basename(txt_path)
-            expected_meta_meta = os.path.basename(meta_path)
+        new_items.append(item)
 
-            if meta_data.get("file") != expected_meta_file:
-                meta_data["file"] = expected_meta_file
-                meta_changed = True
+    idx["items"] = new_items
+    fs.save_index(idx)
 
-            if meta_data.get("meta") != expected_meta_meta:
-                meta_data["meta"] = expected_meta_meta
-                meta_changed = True
+    names_by_dir = {d: os.listdir(d) for d in fs.storage_dirs()}
+    orphan_count, _ = _remove_orphans(names_by_dir, new_items)
 
-            if meta_changed:
-                store.write_meta(conv_id, meta_data)
-                fixed_meta_count += 1
+    print(f"[Repair] {removed_count} entrées supprimées, {fixed_meta_count} métadonnées corrigées, {orphan_count} fichiers orphelins supprimés.")
 
-        new_items.append(item)
 
-    idx["items"] = new_items
-    store.save_index(idx)
+def _load_repair_state() -> Dict[str, Any]:
+    try:
+        with open(REPAIR_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
 
-    all_files = set(os.listdir(store.CONVERSATION_DIR))
-    used_files = {it["file"] for it in new_items if "file" in it} | {it["meta"] for it in new_items if "meta" in it}
-    orphan_files = all_files - used_files
-    for orphan in orphan_files:
-        try:
-            os.remove(os.path.join(store.CONVERSATION_DIR, orphan))
-        except Exception:
-            pass
 
-    print(f"[Repair] {removed_count} entrées supprimées, {fixed_meta_count} métadonnées corrigées, {len(orphan_files)} fichiers orphelins supprimés.")
+def _save_repair_state(state: Dict[str, Any]) -> None:
+    # Réécriture sur place (pas de rename) : ne modifie pas le mtime du dossier.
+    # Un état illisible ne coûte qu'un parcours complet au prochain démarrage.
+    with open(REPAIR_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
 
 
-# Appel automatique de la réparation
-try:
-    repair_conversations()
-except Exception as e:
-    print(f"[Repair] Échec de la réparation automatique : {e}")
+def check_conversations_incremental() -> Dict[str, Any]:
+    """
+    Vérification de cohérence incrémentale depuis le dernier watermark
+    (écritures soumises au thread d'écriture ; ne pas appeler depuis celui-ci) :
+    - entrées modifiées depuis (updated_at > verified_at) : métadonnées vérifiées
+    - dossiers modifiés depuis (racine et shards) : mtime comparé, puis, s'il a
+      changé, empreinte des noms de conversation (cf. _dir_signature) ; seuls
+      les dossiers dont les fichiers de conversation ont changé sont vérifiés
+      (entrées fantômes, fichiers orphelins), avec leurs seules entrées
+    Rien d'autre n'est visité : le coût ne dépend pas du nombre de conversations
+    inchangées. Retourne un rapport.
+    """
+    report = {"visited": 0, "removed": 0, "fixed_meta": 0, "orphans": 0, "dir_scanned": False}
+    if store is not fs:
+        return report
+    fs.ensure_dir()
+
+    started_at = fs.now_iso()
+    state = _load_repair_state()
+    verified_at = state.get("verified_at", "")
+    known = state.get("dirs") or {}
+    root = fs.CONVERSATION_DIR
+
+    def rel(d: str) -> str:
+        return os.path.relpath(d, root)
+
+    seen: Dict[str, Dict[str, Any]] = {}  # dossier -> {"mtime", "sig"} observés
+
+    def observe(d: str) -> Optional[set]:
+        """Noms du dossier s'il a changé depuis le dernier passage, None sinon."""
+        mtime = os.stat(d).st_mtime_ns
+        prev = known.get(rel(d)) or {}
+        if mtime == prev.get("mtime"):
+            seen[d] = prev
+            return None
+        names = set(os.listdir(d))
+        seen[d] = {"mtime": mtime, "sig": _dir_signature(names)}
+        return names if seen[d]["sig"] != prev.get("sig") else None
+
+    scanned: Dict[str, set] = {}
+    root_names = observe(root)
+    if root_names is not None:
+        scanned[root] = root_names
+    # la liste des shards ne change que si les noms de la racine ont changé
+    dirs = fs.storage_dirs() if root_names is not None else [os.path.join(root, r) for r in known if r != "."]
+    for d in dirs:
+        if d == root:
+            continue
+        try:
+            names = observe(d)
+        except FileNotFoundError:
+            continue
+        if names is not None:
+            scanned[d] = names
+    report["dir_scanned"] = bool(scanned)
+
+    # entrées fantômes : seulement celles des dossiers modifiés (ou disparus)
+    if scanned:
+        for item in fs.list_index_items_sorted():
+            d = fs.item_dir(item)
+            if d in scanned:
+                names = scanned[d]
+            elif root in scanned and d not in seen:
+                names = set()  # shard disparu
+            else:
+                continue
+            conv_file = item.get("file")
+            if conv_file not in names and f"{conv_file}{fs.ARCHIVE_EXT}" not in names:
+                _writer.call(fs.index_remove, item.get("id"), key=item.get("id"))
+                report["removed"] += 1
+
+    for item in fs.list_index_items_since(verified_at):
+        conv_file = item.get("file")
+        report["visited"] += 1
+        if conv_file and _writer.call(_fix_meta_fields, item.get("id"),
+                                      os.path.join(fs.item_dir(item), conv_file), key=item.get("id")):
+            report["fixed_meta"] += 1
+
+    deferred = 0
+    if scanned:
+        # index relu sur le thread d'écriture : aucune création en file prise pour un orphelin
+        report["orphans"], deferred = _writer.call(
+            lambda: _remove_orphans(scanned, fs.list_index_items_sorted(), min_age=ORPHAN_MIN_AGE)
+        )
+
+    _writer.call(fs.flush_index)
+    if not os.path.exists(REPAIR_STATE_PATH):
+        _save_repair_state({})
+    # état relevé après nos propres écritures (index, suppressions) : seuls les
+    # dossiers dont le mtime a encore bougé sont relus
+    final: Dict[str, Dict[str, Any]] = {}
+    if not deferred:  # orphelins trop récents : forcer un nouveau parcours la prochaine fois
+        for d in fs.storage_dirs() if root_names is not None else [d for d in seen if os.path.isdir(d)]:
+            mtime = os.stat(d).st_mtime_ns
+            prev = seen.get(d)
+            if prev is not None and prev.get("mtime") == mtime:
+                final[rel(d)] = prev
+            else:
+                final[rel(d)] = {"mtime": mtime, "sig": _dir_signature(os.listdir(d))}
+    _save_repair_state({"verified_at": started_at, "dirs": final})
+    return report
+
+
+def start_background_repair(on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> threading.Thread:
+    """
+    Lance check_conversations_incremental, le calcul des aperçus manquants puis
+    l'archivage des conversations inactives dans un thread daemon (à appeler une fois l'UI affichée). `on_done(report)` est appelé depuis ce thread ;
+    en cas d'échec, report = {"error": "..."}.
+    """
+    def _run():
+        try:
+            report = check_conversations_incremental()
+            print(f"[Repair] {report['removed']} entrées supprimées, {report['fixed_meta']} métadonnées corrigées, "
+                  f"{report['orphans']} fichiers orphelins supprimés ({report['visited']} entrées vérifiées).")
+            report["previews"] = backfill_previews()
+            report["archived"] = archive_idle_conversations()["archived"]
+            ensure_search_index()
+            _search.load()  # journal rejoué ici, pas à la première recherche
+        except Exception as e:
+            print(f"[Repair] Échec de la vérification incrémentale : {e}")
+            report = {"error": str(e)}
+        if on_done:
+            on_done(report)
+
+    t = threading.Thread(target=_run, name="conversations-repair", daemon=True)
+    t.start()
+    return t
 
 
 # ============================================================================
@@ -103,15 +324,51 @@ try:
 except Exception:
     _ATTACHED_DOCS_REGISTRY = _ATTACHED_DOCS_REGISTRY_DEFAULT
 
+# lecture-modification-écriture du registre : exclusif entre process
+_registry_lock = InterProcessLock(_ATTACHED_DOCS_REGISTRY + ".lock", kind="registry")
+
 
 # =============================================================================
 # OUTILS REGISTRE DOCS
 # =============================================================================
+# Registre en cache mémoire (même schéma que l'index de storage_fs) :
+# relu seulement si attached_docs.json a changé (mtime/taille), mutations
+# par conversation, écriture différée avec fusion si un autre process a
+# écrit entre-temps.
+class _RegistryCache:
+    def __init__(self) -> None:
+        self.data: Optional[Dict[str, Any]] = None
+        self.stamp: Optional[tuple] = None
+        self.dirty_ids: set = set()
+        self.removed_ids: set = set()
+        self.full_rewrite = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.full_rewrite or bool(self.dirty_ids) or bool(self.removed_ids)
+
+    def clear_pending(self) -> None:
+        self.dirty_ids.clear()
+        self.removed_ids.clear()
+        self.full_rewrite = False
+
+
+_registry_cache = _RegistryCache()
+_registry_guard = threading.RLock()
+
+
 def _ensure_registry_dir() -> None:
     base = os.path.dirname(_ATTACHED_DOCS_REGISTRY)
     os.makedirs(base, exist_ok=True)
 
-def _load_registry() -> Dict[str, Any]:
+def _registry_stamp() -> Optional[tuple]:
+    try:
+        st = os.stat(_ATTACHED_DOCS_REGISTRY)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_registry_file() -> Dict[str, Any]:
     _ensure_registry_dir()
     if not os.path.exists(_ATTACHED_DOCS_REGISTRY):
         return {}
@@ -121,104 +378,456 @@ def _load_registry() -> Dict[str, Any]:
     except Exception:
         return {}
 
-def _save_registry(reg: Dict[str, Any]) -> None:
-    _ensure_registry_dir()
-    tmp = _ATTACHED_DOCS_REGISTRY + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(reg, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, _ATTACHED_DOCS_REGISTRY)
+def _load_registry() -> Dict[str, Any]:
+    """Registre en cache (objet partagé, ne pas modifier directement : _registry_set/_registry_remove)."""
+    with _registry_guard:
+        cache = _registry_cache
+        if cache.data is None or (not cache.dirty and _registry_stamp() != cache.stamp):
+            with _registry_lock.shared():
+                cache.data = _read_registry_file()
+                cache.stamp = _registry_stamp()
+        return cache.data
+
+def _flush_registry() -> None:
+    with _registry_guard, _registry_lock.exclusive():
+        cache = _registry_cache
+        if cache.data is None or not cache.dirty:
+            return
+        if not cache.full_rewrite and _registry_stamp() != cache.stamp:
+            disk = _read_registry_file()
+            for conv_id in cache.removed_ids:
+                disk.pop(conv_id, None)
+            for conv_id in cache.dirty_ids:
+                if conv_id in cache.data:
+                    disk[conv_id] = cache.data[conv_id]
+            cache.data = disk
+        _ensure_registry_dir()
+        fs.atomic_write_text(_ATTACHED_DOCS_REGISTRY, json.dumps(cache.data, ensure_ascii=False, indent=2))
+        cache.stamp = _registry_stamp()
+        cache.clear_pending()
+
+_registry_flusher = fs.WriteBehind(_flush_registry, fs.INDEX_FLUSH_DELAY)
+
+def flush_registry() -> None:
+    """Force l'écriture immédiate du registre des docs."""
+    _registry_flusher.flush()
+
+def _registry_set(conv_id: str, entry: Dict[str, Any]) -> None:
+    with _registry_guard:
+        _load_registry()[conv_id] = entry
+        _registry_cache.dirty_ids.add(conv_id)
+        _registry_cache.removed_ids.discard(conv_id)
+    _registry_flusher.schedule()
+
+def _registry_remove(conv_id: str) -> None:
+    with _registry_guard:
+        if _load_registry().pop(conv_id, None) is None:
+            return
+        _registry_cache.removed_ids.add(conv_id)
+        _registry_cache.dirty_ids.discard(conv_id)
+    _registry_flusher.schedule()
+
+def _registry_clear() -> None:
+    with _registry_guard:
+        _load_registry()
+        _registry_cache.data = {}
+        _registry_cache.full_rewrite = True
+    _registry_flusher.schedule()
 
 def _registry_add_conv(conv_id: str) -> None:
-    reg = _load_registry()
-    if conv_id not in reg:
-        reg[conv_id] = {"reference_docs": []}
-        _save_registry(reg)
+    with _registry_guard:
+        if conv_id not in _load_registry():
+            _registry_set(conv_id, {"reference_docs": []})
 
 def _conv_id_from_filepath(filepath: str) -> Optional[str]:
     filename = os.path.basename(filepath)
-    return store.conv_id_from_filename(filename)
+    return store.resolve_conv_id(filename)
 
 
 # =============================================================================
 # API RECOMMANDÉE
 # =============================================================================
+def flush_writes(timeout: Optional[float] = None) -> bool:
+    """Barrière : attend que toutes les écritures soumises soient sur disque."""
+    done = _writer.flush(timeout)
+    _registry_flusher.flush()
+    return done
+
+# atexit en ordre inverse : passe avant l'arrêt du thread d'écriture
+atexit.register(flush_writes)
+
+# -----------------------------------------------------------------------------
+# Écritures en file visibles des listes (sans attendre le thread d'écriture)
+# -----------------------------------------------------------------------------
+# conv_id -> changements d'entrée d'index en attente, dans l'ordre de soumission
+# ({"deleted": True} ou champs) ; retirés quand l'écriture est faite
+_pending_index: Dict[str, List[Dict[str, Any]]] = {}
+_pending_guard = threading.Lock()
+
+def _submit_indexed(patch: Dict[str, Any], fn: Callable[..., Any], conv_id: str, *args) -> Future:
+    """Soumet `fn(conv_id, *args)` ; `patch` reste superposé aux listes jusqu'à l'écriture."""
+    with _pending_guard:
+        _pending_index.setdefault(conv_id, []).append(patch)
+    try:
+        fut = _writer.submit(fn, conv_id, *args, key=conv_id)
+    except BaseException:
+        _pending_done(conv_id, patch)
+        raise
+    fut.add_done_callback(lambda _f: _pending_done(conv_id, patch))
+    return fut
+
+def _pending_done(conv_id: str, patch: Dict[str, Any]) -> None:
+    with _pending_guard:
+        patches = _pending_index.get(conv_id, [])
+        for i, p in enumerate(patches):
+            if p is patch:
+                del patches[i]
+                break
+        if not patches:
+            _pending_index.pop(conv_id, None)
+
+def _overlay_pending(items: List[Dict[str, Any]], reorder: bool = True) -> List[Dict[str, Any]]:
+    """
+    Applique aux entrées lues en mémoire les écritures encore en file :
+    suppressions masquées, champs (titre, updated_at) à jour. `reorder` :
+    retrie par (updated_at, id) ; sans effet sur les pages (curseur stable).
+    """
+    with _pending_guard:
+        if not _pending_index:
+            return items
+        pending = {cid: list(patches) for cid, patches in _pending_index.items()}
+    out = []
+    for it in items:
+        patches = pending.get(it.get("id"))
+        if not patches:
+            out.append(it)
+            continue
+        if any(p.get("deleted") for p in patches):
+            continue
+        it = dict(it)
+        for p in patches:
+            for k, v in p.items():
+                # l'écriture peut déjà être dans l'index : ne pas reculer la date
+                if k != "updated_at" or v > it.get("updated_at", ""):
+                    it[k] = v
+        out.append(it)
+    if reorder:
+        out.sort(key=lambda it: (it.get("updated_at", ""), it.get("id", "")), reverse=True)
+    return out
+
 def list_conversations_index() -> List[Dict[str, Any]]:
-    return store.list_index_items_sorted()
+    """Index complet, plus récentes d'abord ; lu en mémoire, écritures en file comprises."""
+    return _overlay_pending(store.list_index_items_sorted())
 
-def create_conversation(title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+def list_conversations_page(cursor: Optional[str] = None, limit: int = 50, tag: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Une page de l'index, plus récentes d'abord : {"items": [...], "next_cursor": str | None}.
+    Passer `next_cursor` pour la page suivante (None = fin de liste).
+    Le curseur est opaque et stable : les créations/mises à jour survenues
+    entre deux pages ne décalent ni ne dupliquent les entrées déjà rendues.
+    Lue en mémoire sans attendre le thread d'écriture : les écritures en file
+    y sont superposées (suppressions masquées, titres à jour).
+    """
+    page = store.list_page(cursor=cursor, limit=limit, tag=tag)
+    page["items"] = _overlay_pending(page["items"], reorder=False)
+    return page
+
+def _create_conv_and_register(title: str, tags: Optional[List[str]]) -> Dict[str, Any]:
     item = store.create_conv(title=title, tags=tags)
     _registry_add_conv(item["id"])
     return item
 
-def append_message_by_id(conv_id: str, role: str, message: str) -> None:
-    return store.append_message(conv_id, role, message)
+def create_conversation_async(title: str, tags: Optional[List[str]] = None) -> Future:
+    """Création en file ; Future -> entrée d'index (l'UI termine dans un callback)."""
+    return _writer.submit(_create_conv_and_register, title, tags)
+
+def create_conversation(title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+    # attend la création (scripts, tests) ; l'UI utilise create_conversation_async
+    return create_conversation_async(title, tags).result()
+
+def append_message_by_id(
+    conv_id: str,
+    role: str,
+    message: str,
+    model: Optional[str] = None,
+    tokens: Optional[Dict[str, int]] = None,
+    partial: bool = False,
+) -> Future:
+    """
+    Ajout asynchrone (ordre garanti par conversation) ; Future pour attendre l'écriture.
+    partial=True : réponse interrompue (Stop) avant la fin de la génération.
+    """
+    return _submit_indexed({"updated_at": fs.now_iso()}, _append_and_index, conv_id, role, message, model, tokens, partial)
+
+def _append_and_index(
+    conv_id: str, role: str, message: str, model: Optional[str], tokens: Optional[Dict[str, int]], partial: bool = False
+) -> None:
+    store.append_message(conv_id, role, message, model=model, tokens=tokens, partial=partial)
+    if not _search.exists():
+        return  # index pas encore construit : ensure_search_index reprendra tout
+    try:
+        item = store.get_index_item(conv_id) or {}
+        _search.add_message(conv_id, int(item.get("message_count", 1)) - 1, message)
+    except Exception as e:
+        print(f"[Search] Indexation échouée pour {conv_id} : {e}")
 
 def read_conversation_text_by_id(conv_id: str) -> str:
+    _writer.wait_for(conv_id)
     return store.read_conv_text(conv_id)
 
+def iter_messages_by_id(conv_id: str) -> Iterator[Dict[str, Any]]:
+    """Messages structurés {"ts", "role", "content"[, "model", "tokens"]} en flux."""
+    _writer.wait_for(conv_id)
+    return store.iter_messages(conv_id)
+
+def tail_messages_by_id(conv_id: str, n: int) -> List[Dict[str, Any]]:
+    _writer.wait_for(conv_id)
+    return store.tail_messages(conv_id, n)
+
+def read_messages(conv_id: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Plage [start, stop) de messages (indices façon slice : -N = N derniers)."""
+    _writer.wait_for(conv_id)
+    return store.read_messages(conv_id, start, stop)
+
+def convert_all_conversations_to_jsonl() -> Dict[str, int]:
+    """Convertit les conversations texte historiques en JSONL (backend fichiers)."""
+    if store is not fs:
+        return {"converted": 0, "skipped": 0, "failed": 0}
+    return _writer.call(fs.convert_all_to_jsonl)
+
+def archive_idle_conversations(days: Optional[float] = None) -> Dict[str, int]:
+    """
+    Compresse les conversations inactives depuis `days` jours (backend fichiers).
+    Une conversation par passage sur le thread d'écriture : les écritures de
+    l'UI s'intercalent.
+    """
+    stats = {"archived": 0, "failed": 0}
+    if store is not fs:
+        return stats
+    for conv_id in fs.idle_conv_ids(days):
+        try:
+            if _writer.call(fs.archive_conv, conv_id, key=conv_id):
+                stats["archived"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"[Archive] Archivage échoué pour {conv_id} : {e}")
+    _writer.call(fs.flush_index)
+    return stats
+
+def backfill_previews() -> int:
+    """
+    Complète aperçu et libellé des entrées d'index antérieures à ces champs
+    (backend fichiers), une conversation par passage sur le thread d'écriture.
+    """
+    if store is not fs:
+        return 0
+    done = 0
+    for conv_id in fs.preview_missing_ids():
+        try:
+            _writer.call(fs.backfill_preview, conv_id, key=conv_id)
+            done += 1
+        except Exception as e:
+            print(f"[Repair] Aperçu non calculé pour {conv_id} : {e}")
+    return done
+
+def migrate_conversations_to_shards() -> Dict[str, int]:
+    """Range les conversations à plat dans les sous-dossiers AAAA-MM (backend fichiers)."""
+    if store is not fs:
+        return {"moved": 0, "skipped": 0, "failed": 0}
+    return _writer.call(fs.migrate_all_to_shards)
+
 def get_metadata(conv_id: str) -> Dict[str, Any]:
+    _writer.wait_for(conv_id)
     return store.read_meta(conv_id)
 
+def rename_conversation_async(conv_id: str, new_title: str) -> Future:
+    """Renommage en file, nouveau titre visible des listes tout de suite ; Future -> métadonnées."""
+    title = (new_title or "").strip()
+    patch = {"title": title, "display_title": title, "updated_at": fs.now_iso()} if title else {}
+    return _submit_indexed(patch, store.rename_title, conv_id, new_title)
+
 def rename_conversation(conv_id: str, new_title: str) -> Dict[str, Any]:
-    return store.rename_title(conv_id, new_title)
+    return rename_conversation_async(conv_id, new_title).result()
 
-def delete_conversation(conv_id: str) -> None:
+def _delete_conv_and_unregister(conv_id: str) -> None:
     store.delete_conv(conv_id)
-    reg = _load_registry()
-    if conv_id in reg:
-        del reg[conv_id]
-        _save_registry(reg)
+    if _search.exists():
+        _search.remove_conversation(conv_id)
+    _registry_remove(conv_id)
 
-def delete_all_conversations() -> None:
-    items = list_conversations_index()
-    for item in items:
+def delete_conversation(conv_id: str) -> Future:
+    """Suppression asynchrone (après les écritures déjà en file pour cette conversation)."""
+    return _submit_indexed({"deleted": True}, _delete_conv_and_unregister, conv_id)
+
+def _delete_all() -> None:
+    for item in store.list_index_items_sorted():
         conv_id = item.get("id")
         if conv_id:
-            delete_conversation(conv_id)
-    idx = {"version": store.INDEX_VERSION, "updated_at": store.now_iso(), "items": []}
-    store.save_index(idx)
-    _save_registry({})
+            _delete_conv_and_unregister(conv_id)
+    if store is fs:
+        idx = {"version": fs.INDEX_VERSION, "updated_at": fs.now_iso(), "items": []}
+        fs.save_index(idx)
+    _registry_clear()
+    _search.clear()
+
+def delete_all_conversations() -> None:
+    _writer.call(_delete_all)
 
 def retitle_from_first_user_line(conv_id: str) -> Optional[str]:
-    return store.retitle_from_first_user_line(conv_id)
+    return _writer.call(store.retitle_from_first_user_line, conv_id, key=conv_id)
+
+
+# -----------------------------------------------------------------------------
+# Recherche plein texte
+# -----------------------------------------------------------------------------
+# une seule construction à la fois (tâche de fond et première recherche)
+_search_build_lock = threading.Lock()
+
+def _search_snapshot() -> Dict[str, int]:
+    """conv_id -> nombre de messages, d'après l'index (lu sur le thread d'écriture)."""
+    return {it["id"]: int(it.get("message_count", 0)) for it in store.list_index_items_sorted() if it.get("id")}
+
+def _snapshot_messages(snapshot: Dict[str, int]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    for conv_id, count in list(snapshot.items()):
+        try:
+            messages = store.read_messages(conv_id, 0, count)
+        except Exception:
+            snapshot[conv_id] = 0  # supprimée entre-temps, ou relue par le delta
+            messages = []
+        yield conv_id, messages
+
+def _apply_search_delta(staging: SearchIndex, snapshot: Dict[str, int]) -> int:
+    """
+    Sur le thread d'écriture : complète l'index construit avec ce qui a changé
+    depuis la photo (ajouts, suppressions), puis le met en service.
+    """
+    current = _search_snapshot()
+    for conv_id in snapshot.keys() - current.keys():
+        staging.remove_conversation(conv_id)
+    added = 0
+    for conv_id, count in current.items():
+        start = snapshot.get(conv_id, 0)
+        if count < start:  # recréée plus courte : reprise complète
+            staging.remove_conversation(conv_id)
+            start = 0
+        for position, rec in enumerate(store.read_messages(conv_id, start, count), start):
+            staging.add_message(conv_id, position, rec.get("content") or "")
+            added += 1
+    _search.adopt(staging)
+    return added
+
+def _build_search_index() -> int:
+    snapshot = _writer.call(_search_snapshot)
+    staging, count = _search.build(_snapshot_messages(snapshot))
+    added = _writer.call(_apply_search_delta, staging, snapshot)
+    print(f"[Search] Index construit : {len(snapshot)} conversations, {count} messages (+{added} pendant la construction).")
+    return count + added
+
+def ensure_search_index(rebuild: bool = False) -> None:
+    """
+    Construit l'index de recherche s'il n'existe pas encore (historique
+    antérieur). La lecture des conversations se fait sur le thread appelant,
+    à partir d'une photo de l'index ; seul le rattrapage des écritures
+    survenues entre-temps passe par le thread d'écriture.
+    """
+    if not rebuild and _search.exists():
+        return
+    with _search_build_lock:
+        if rebuild or not _search.exists():
+            _build_search_index()
+
+def search(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Recherche plein texte (tous les mots, casse/accents ignorés), plus récents
+    d'abord : [{"conv_id", "position", "snippet", "title", "file"}].
+    N'attend pas les écritures en file (messages indexés dès leur écriture).
+    Premier appel du process : construction ou relecture du journal si la
+    tâche de fond ne l'a pas déjà fait ; à appeler hors thread UI.
+    """
+    ensure_search_index()
+    results = _search.search(query, limit)
+    for res in results:
+        item = store.get_index_item(res["conv_id"]) or {}
+        res["title"] = item.get("title", res["conv_id"])
+        res["file"] = item.get("file")
+    return results
 
 
 # -----------------------------------------------------------------------------
 # Docs de référence
 # -----------------------------------------------------------------------------
-def add_reference_doc_by_id(conv_id: str, doc_path: str) -> None:
+def _registry_add_doc(conv_id: str, doc_abs: str) -> None:
+    with _registry_guard:
+        entry = dict(_load_registry().get(conv_id) or {})
+        docs = list(entry.get("reference_docs", []))
+        if doc_abs not in docs:
+            docs.append(doc_abs)
+        entry["reference_docs"] = docs
+        _registry_set(conv_id, entry)
+
+# conv_id -> docs liés encore en file (lus sans attendre le thread d'écriture)
+_pending_docs: Dict[str, List[str]] = {}
+
+def _pending_doc_done(conv_id: str, doc_abs: str) -> None:
+    with _pending_guard:
+        docs = _pending_docs.get(conv_id, [])
+        if doc_abs in docs:
+            docs.remove(doc_abs)
+        if not docs:
+            _pending_docs.pop(conv_id, None)
+
+def add_reference_doc_by_id(conv_id: str, doc_path: str) -> Future:
     if not conv_id:
         raise ValueError("conv_id manquant")
-    reg = _load_registry()
-    if conv_id not in reg:
-        reg[conv_id] = {"reference_docs": []}
-    docs = reg[conv_id].get("reference_docs", [])
     doc_abs = os.path.abspath(doc_path)
-    if doc_abs not in docs:
-        docs.append(doc_abs)
-    reg[conv_id]["reference_docs"] = docs
-    _save_registry(reg)
+    with _pending_guard:
+        _pending_docs.setdefault(conv_id, []).append(doc_abs)
+    try:
+        fut = _writer.submit(_registry_add_doc, conv_id, doc_abs, key=_REGISTRY_KEY)
+    except BaseException:
+        _pending_doc_done(conv_id, doc_abs)
+        raise
+    fut.add_done_callback(lambda _f: _pending_doc_done(conv_id, doc_abs))
+    return fut
 
 def get_reference_docs_by_id(conv_id: str) -> List[str]:
+    """Docs liés, lus en mémoire : ajouts encore en file compris."""
     if not conv_id:
         return []
-    reg = _load_registry()
-    entry = reg.get(conv_id, {})
-    return list(entry.get("reference_docs", []))
+    with _pending_guard:
+        pending = list(_pending_docs.get(conv_id, ()))
+    with _registry_guard:
+        entry = _load_registry().get(conv_id, {})
+        docs = list(entry.get("reference_docs", []))
+    return docs + [d for d in pending if d not in docs]
 
 
 # =============================================================================
 # API HISTORIQUE
 # =============================================================================
-def create_new_conversation() -> str:
-    item = create_conversation(title=f"Nouvelle conversation – {store.ts_for_id()}")
+def _create_new_conv_path() -> str:
+    item = _create_conv_and_register(f"Nouvelle conversation – {store.ts_for_id()}", None)
     return store.file_path(item["id"])
 
-def append_message(filepath: str, role: str, message: str) -> None:
+def create_new_conversation_async() -> Future:
+    """Future -> chemin de la nouvelle conversation (l'UI termine dans un callback)."""
+    return _writer.submit(_create_new_conv_path)
+
+def create_new_conversation() -> str:
+    return create_new_conversation_async().result()
+
+def append_message(
+    filepath: str,
+    role: str,
+    message: str,
+    model: Optional[str] = None,
+    tokens: Optional[Dict[str, int]] = None,
+    partial: bool = False,
+) -> Future:
     conv_id = _conv_id_from_filepath(filepath)
     if not conv_id:
         raise ValueError("Nom de fichier inattendu, impossible d'extraire conv_id.")
-    return append_message_by_id(conv_id, role, message)
+    return append_message_by_id(conv_id, role, message, model=model, tokens=tokens, partial=partial)
 
 def read_conversation(filepath: str) -> str:
     conv_id = _conv_id_from_filepath(filepath)
@@ -226,74 +835,78 @@ def read_conversation(filepath: str) -> str:
         raise ValueError("Nom de fichier inattendu, impossible d'extraire conv_id.")
     return read_conversation_text_by_id(conv_id)
 
-def list_conversations() -> List[str]:
-    store.ensure_dir()
-    files = [f for f in os.listdir(store.CONVERSATION_DIR) if f.endswith(store.CONV_EXT)]
-    return sorted(files)
-
-def rename_conversation_file(old_name: str, new_name: str) -> Tuple[bool, str]:
-    """
-    Historique : renomme physiquement un .txt MAIS garde le .json associé inchangé.
-    Met à jour title et file dans les métadonnées et l'index.
-    """
-    store.ensure_dir()
-    old_path = os.path.join(store.CONVERSATION_DIR, old_name)
-    new_path = os.path.join(store.CONVERSATION_DIR, new_name)
-
-    if not os.path.exists(old_path):
-        return False, f"Le fichier '{old_name}' n'existe pas."
-    if os.path.exists(new_path):
-        return False, f"Un fichier nommé '{new_name}' existe déjà."
-
-    conv_id = store.conv_id_from_filename(old_name)
+def read_conversation_messages(filepath: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+    conv_id = _conv_id_from_filepath(filepath)
     if not conv_id:
-        return False, "Impossible de déterminer conv_id à partir du nom de fichier."
-
-    # Lire meta avant renommage
-    meta_backup = store.read_meta(conv_id)
-    if not meta_backup:
-        return False, "Métadonnées introuvables."
+        raise ValueError("Nom de fichier inattendu, impossible d'extraire conv_id.")
+    return read_messages(conv_id, start, stop)
 
+def list_conversations() -> List[str]:
+    with _pending_guard:
+        deleted = [cid for cid, patches in _pending_index.items() if any(p.get("deleted") for p in patches)]
+    if deleted:
+        hidden = {(store.get_index_item(cid) or {}).get("file") for cid in deleted}
+        return sorted(f for f in store.list_conversation_files() if f not in hidden)
+    return sorted(store.list_conversation_files())
+
+def _outcome(fn: Callable[..., Any], *args, error: str = "") -> Tuple[bool, str]:
+    """(True, "") si fn(*args) réussit, (False, message) sinon."""
     try:
-        # Renommer uniquement le .txt
-        os.rename(old_path, new_path)
-
-        # Mettre à jour le contenu des métadonnées
-        title_from_name = os.path.splitext(new_name)[0]
-        meta_backup["title"] = title_from_name
-        meta_backup["file"] = os.path.basename(new_path)
-        # ⚠️ On ne touche pas à meta_backup["meta"], il garde le .json original
-        store.write_meta(conv_id, meta_backup)
-
-        # Mettre à jour l'index
-        idx = store.load_index()
-        item = store.find_in_index(idx, conv_id)
-        if item:
-            item["title"] = title_from_name
-            item["file"] = os.path.basename(new_path)
-            # item["meta"] reste inchangé
-            store.save_index(idx)
-
+        fn(*args)
         return True, ""
+    except (FileNotFoundError, FileExistsError) as e:
+        return False, str(e)
     except Exception as e:
-        return False, f"Erreur lors du renommage : {e}"
+        return False, f"{error}{e}"
 
-def delete_conversation_file(filename: str) -> Tuple[bool, str]:
-    store.ensure_dir()
-    path = os.path.join(store.CONVERSATION_DIR, filename)
+def _done_future(result: Any) -> Future:
+    fut: Future = Future()
+    fut.set_result(result)
+    return fut
+
+def rename_conversation_file_async(old_name: str, new_name: str) -> Future:
+    """
+    Historique : renomme le fichier de conversation (titre + file mis à jour
+    dans les métadonnées et l'index ; le .json garde son nom d'origine).
+    Future -> (ok, message d'erreur).
+    """
+    conv_id = store.resolve_conv_id(old_name)
+    if not conv_id or store.get_index_item(conv_id) is None:
+        return _done_future((False, f"Le fichier '{old_name}' n'existe pas."))
+    return _writer.submit(_outcome, store.rename_file, conv_id, new_name,
+                          error="Erreur lors du renommage : ", key=conv_id)
+
+def rename_conversation_file(old_name: str, new_name: str) -> Tuple[bool, str]:
+    return rename_conversation_file_async(old_name, new_name).result()
+
+def _delete_outcome(conv_id: str) -> Tuple[bool, str]:
+    return _outcome(_delete_conv_and_unregister, conv_id, error="Erreur lors de la suppression : ")
+
+def delete_conversation_file_async(filename: str) -> Future:
+    """Future -> (ok, message d'erreur) ; la conversation disparaît des listes tout de suite."""
+    conv_id = store.resolve_conv_id(filename)
+    if conv_id and store.get_index_item(conv_id) is not None:
+        return _submit_indexed({"deleted": True}, _delete_outcome, conv_id)
+    if store is not fs:
+        return _done_future((False, f"Le fichier '{filename}' n'existe pas."))
+    # Fichier hors index (ancien format) : suppression physique simple
+    path = os.path.join(fs.CONVERSATION_DIR, filename)
     if not os.path.exists(path):
-        return False, f"Le fichier '{filename}' n'existe pas."
-    try:
-        os.remove(path)
-        return True, ""
-    except Exception as e:
-        return False, f"Erreur lors de la suppression : {e}"
+        return _done_future((False, f"Le fichier '{filename}' n'existe pas."))
+    return _writer.submit(_outcome, os.remove, path, error="Erreur lors de la suppression : ")
+
+def delete_conversation_file(filename: str) -> Tuple[bool, str]:
+    return delete_conversation_file_async(filename).result()
+
+def conversation_exists(filepath: str) -> bool:
+    conv_id = _conv_id_from_filepath(filepath)
+    return bool(conv_id) and store.get_index_item(conv_id) is not None
 
 
 # -----------------------------------------------------------------------------
 # Compat docs liés
 # -----------------------------------------------------------------------------
-def add_reference_doc(conversation_filepath: str, doc_path: str) -> None:
+def add_reference_doc(conversation_filepath: str, doc_path: str) -> Future:
     conv_id = _conv_id_from_filepath(conversation_filepath)
     if not conv_id:
         raise ValueError("Nom de fichier inattendu, impossible d'extraire conv_id.")
@@ -312,6 +925,9 @@ def get_reference_docs(conversation_filepath: str) -> List[str]:
 def conv_id_from_filename(filename: str) -> Optional[str]:
     return store.conv_id_from_filename(filename)
 
+def resolve_conv_id(filename: str) -> Optional[str]:
+    return store.resolve_conv_id(filename)
+
 def file_path(conv_id: str) -> str:
     return store.file_path(conv_id)
 
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+doc_cache.py
+Cache partagé du contenu des documents de référence attachés aux conversations :
+- Clé (chemin absolu, mtime_ns, taille) : un fichier modifié est relu,
+  l'ancienne version est évincée
+- LRU borné en octets (REFERENCE_DOC_CACHE_MAX_BYTES) : passer d'une
+  conversation à l'autre avec les mêmes docs ne relit rien
+- Lecture limitée à REFERENCE_DOC_MAX_BYTES par doc ; au-delà de
+  REFERENCE_DOC_MMAP_THRESHOLD, lecture via mmap (pas de copie intermédiaire
+  dans un buffer de fichier)
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (lecture des docs hors UI)
+- §12 Constantes & Config (budgets centralisés dans config.py)
+- §14 Threading & Opérations Bloquantes (cache thread-safe)
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# =============================================================================
+# Configuration (override via config.py si dispo)
+# =============================================================================
+try:
+    from config import REFERENCE_DOC_MAX_BYTES as _CONF_DOC_MAX_BYTES
+except Exception:
+    _CONF_DOC_MAX_BYTES = 2_000_000
+
+try:
+    from config import REFERENCE_DOC_CACHE_MAX_BYTES as _CONF_CACHE_MAX_BYTES
+except Exception:
+    _CONF_CACHE_MAX_BYTES = 32_000_000
+
+try:
+    from config import REFERENCE_DOC_MMAP_THRESHOLD as _CONF_MMAP_THRESHOLD
+except Exception:
+    _CONF_MMAP_THRESHOLD = 1_000_000
+
+DOC_MAX_BYTES = int(_CONF_DOC_MAX_BYTES)
+CACHE_MAX_BYTES = int(_CONF_CACHE_MAX_BYTES)
+MMAP_THRESHOLD = int(_CONF_MMAP_THRESHOLD)
+
+_Key = Tuple[str, int, int]
+
+
+def _read_bytes(path: str, size: int, limit: int, mmap_threshold: int) -> bytes:
+    with open(path, "rb") as f:
+        if size >= mmap_threshold and size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:limit]
+        return f.read(limit)
+
+
+class DocCache:
+    """LRU (chemin, mtime, taille) -> texte ; toutes les méthodes sont thread-safe."""
+
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        doc_max_bytes: int = DOC_MAX_BYTES,
+        mmap_threshold: int = MMAP_THRESHOLD,
+    ):
+        self.max_bytes = max(0, int(max_bytes))
+        self.doc_max_bytes = max(0, int(doc_max_bytes))
+        self.mmap_threshold = max(1, int(mmap_threshold))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[_Key, Tuple[str, int]]" = OrderedDict()
+        self._key_by_path: Dict[str, _Key] = {}
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "mmap_reads": 0}
+
+    def read(self, path: str) -> str:
+        """Texte du document (tronqué à doc_max_bytes) ; OSError si illisible."""
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        key = (abs_path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+
+        limit = min(st.st_size, self.doc_max_bytes)
+        data = _read_bytes(abs_path, st.st_size, limit, self.mmap_threshold)
+        text = data.decode("utf-8", errors="ignore")
+
+        with self._lock:
+            if st.st_size >= self.mmap_threshold:
+                self._stats["mmap_reads"] += 1
+            self._discard(self._key_by_path.get(abs_path))  # version précédente du fichier
+            if len(data) <= self.max_bytes:
+                self._entries[key] = (text, len(data))
+                self._key_by_path[abs_path] = key
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+                    self._stats["evictions"] += 1
+        return text
+
+    def get_text(self, path: str) -> Optional[str]:
+        """Comme read(), mais None si le fichier n'existe plus ou est illisible."""
+        try:
+            return self.read(path)
+        except OSError:
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._key_by_path.clear()
+            self._bytes = 0
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """{hits, misses, evictions, mmap_reads, entries, bytes, max_bytes}."""
+        with self._lock:
+            snapshot = dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+            if reset:
+                for k in self._stats:
+                    self._stats[k] = 0
+        return snapshot
+
+    def _discard(self, key: Optional[_Key]) -> None:
+        entry = self._entries.pop(key, None) if key is not None else None
+        if entry is not None:
+            self._bytes -= entry[1]
+            if self._key_by_path.get(key[0]) == key:
+                del self._key_by_path[key[0]]
+
+
+# =============================================================================
+# Instance partagée par tout le process
+# =============================================================================
+_shared = DocCache()
+
+
+def get_doc_cache() -> DocCache:
+    return _shared
+
+
+def read_reference_doc(path: str) -> Optional[str]:
+    """Contenu d'un doc de référence via le cache partagé ; None si introuvable."""
+    return _shared.get_text(path)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+doc_embeddings.py
+Recherche sémantique optionnelle dans les docs de référence :
+- Morceaux (doc_retrieval.doc_chunks) vectorisés par l'API d'embeddings
+  locale d'Ollama (POST /api/embed), par lots, sur la session partagée
+  d'ollama_api (connexions réutilisées)
+- Vecteurs normalisés persistés en .npy par version de doc
+  (chemin, mtime, taille, modèle, découpage) et relus en memmap : calculés
+  une seule fois, partagés par toutes les conversations qui attachent le doc
+- Au prompt : similarité cosinus (produit scalaire) requête / morceaux,
+  sélection dans le budget de tokens de doc_retrieval
+
+Activée par REFERENCE_EMBEDDINGS_ENABLED (config.py) et seulement si numpy
+(optionnel) est installé. En cas d'échec d'Ollama, repli transparent sur BM25.
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (vectorisation / persistance / sélection)
+- §2 Journalisation & Stabilité (écriture atomique, repli BM25 journalisé)
+- §12 Constantes & Config (modèle, URL, lots centralisés dans config.py)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # dépendance optionnelle
+    np = None
+
+try:
+    from ollama_api import get_client as _ollama_client  # session HTTP partagée (pool keep-alive)
+except ImportError:
+    _ollama_client = None
+
+from . import storage_fs as fs
+from .doc_retrieval import CHUNK_CHARS, CHUNK_OVERLAP, DocRetriever
+
+# =============================================================================
+# Configuration (override via config.py si dispo)
+# =============================================================================
+try:
+    from config import REFERENCE_EMBEDDINGS_ENABLED as _CONF_ENABLED
+except Exception:
+    _CONF_ENABLED = False
+
+try:
+    from config import OLLAMA_EMBED_URL as _CONF_EMBED_URL
+except Exception:
+    _CONF_EMBED_URL = "http://localhost:11434/api/embed"
+
+try:
+    from config import OLLAMA_EMBED_MODEL as _CONF_EMBED_MODEL
+except Exception:
+    _CONF_EMBED_MODEL = "nomic-embed-text"
+
+try:
+    from config import EMBEDDINGS_BATCH_SIZE as _CONF_BATCH_SIZE
+except Exception:
+    _CONF_BATCH_SIZE = 32
+
+try:
+    from config import EMBEDDINGS_DIR as _CONF_EMBEDDINGS_DIR
+except Exception:
+    _CONF_EMBEDDINGS_DIR = os.path.join(fs.CONVERSATION_DIR, "embeddings")
+
+ENABLED = bool(_CONF_ENABLED)
+EMBED_URL = _CONF_EMBED_URL
+EMBED_MODEL = _CONF_EMBED_MODEL
+BATCH_SIZE = max(1, int(_CONF_BATCH_SIZE))
+EMBEDDINGS_DIR = os.path.normpath(_CONF_EMBEDDINGS_DIR)
+EMBED_TIMEOUT = 60.0
+# délai avant de retenter Ollama après un échec (s)
+RETRY_AFTER = 30.0
+VECTORS_EXT = ".npy"
+
+
+def enabled() -> bool:
+    return ENABLED and np is not None and _ollama_client is not None
+
+
+def _log(msg: str) -> None:
+    if fs.DEBUG:
+        print(f"[doc_embeddings] {msg}")
+
+
+# =============================================================================
+# Client d'embeddings
+# =============================================================================
+class OllamaEmbedder:
+    """Vectorise des textes par lots via POST {url} {"model", "input": [...]}."""
+
+    def __init__(self, url: str = EMBED_URL, model: str = EMBED_MODEL, batch_size: int = BATCH_SIZE):
+        self.url = url
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = _ollama_client().embed(texts, self.model, self.url, EMBED_TIMEOUT)
+        if len(vectors) != len(texts):
+            raise ValueError(f"{len(vectors)} embeddings reçus pour {len(texts)} textes")
+        return vectors
+
+
+_default_embedder = OllamaEmbedder()
+
+
+def _normalized(rows: Any) -> Any:
+    arr = np.asarray(rows, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    return arr / np.where(norms == 0, 1, norms)
+
+
+# =============================================================================
+# Vecteurs persistés par version de doc
+# =============================================================================
+class VectorStore:
+    """
+    Fichiers `<hash(chemin)>_<hash(version)>.npy` (float32, lignes normalisées).
+    Une nouvelle version d'un doc remplace les fichiers de l'ancienne.
+    """
+
+    def __init__(self, directory: str = EMBEDDINGS_DIR, embedder: Optional[OllamaEmbedder] = None):
+        self.directory = directory
+        self.embedder = embedder or _default_embedder
+        self._lock = threading.Lock()
+
+    def path_for(self, doc_key: tuple) -> str:
+        abs_path, mtime_ns, size = doc_key
+        path_hash = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+        version = f"{mtime_ns}|{size}|{self.embedder.model}|{CHUNK_CHARS}|{CHUNK_OVERLAP}"
+        version_hash = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{path_hash}_{version_hash}{VECTORS_EXT}")
+
+    def vectors(self, doc_key: tuple, chunks: Sequence[str]) -> Any:
+        """Matrice (nb morceaux, dim) en memmap ; calculée puis écrite au premier appel."""
+        target = self.path_for(doc_key)
+        with self._lock:
+            if os.path.exists(target):
+                return np.load(target, mmap_mode="r")
+            if not chunks:
+                return np.zeros((0, 0), dtype=np.float32)
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = target + ".tmp"
+            out = None
+            try:
+                for start in range(0, len(chunks), self.embedder.batch_size):
+                    batch = _normalized(self.embedder.embed_batch(list(chunks[start:start + self.embedder.batch_size])))
+                    if out is None:
+                        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32,
+                                                        shape=(len(chunks), batch.shape[1]))
+                    out[start:start + len(batch)] = batch
+                out.flush()
+                del out
+                os.replace(tmp, target)
+            except BaseException:
+                out = None
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._drop_old_versions(target)
+            _log(f"{len(chunks)} morceaux vectorisés : {doc_key[0]}")
+            return np.load(target, mmap_mode="r")
+
+    def _drop_old_versions(self, current: str) -> None:
+        prefix = os.path.basename(current).split("_", 1)[0] + "_"
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(prefix) and name.endswith(VECTORS_EXT) and path != current:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_default_store = VectorStore()
+
+
+def prepare_doc(path: str, store: Optional[VectorStore] = None) -> None:
+    """Vectorise un doc dès son rattachement (à appeler hors thread UI)."""
+    if not enabled():
+        return
+    retriever = SemanticRetriever([path], store=store)
+    retriever.ensure_vectors()
+
+
+# =============================================================================
+# Sélection par similarité cosinus
+# =============================================================================
+class SemanticRetriever(DocRetriever):
+    """DocRetriever classé par similarité d'embeddings ; BM25 si Ollama indisponible."""
+
+    def __init__(self, paths: Sequence[str], store: Optional[VectorStore] = None):
+        super().__init__(paths)
+        self.store = store or _default_store
+        # (1er n° de morceau, matrice memmap du doc) : pas de copie en mémoire
+        self._parts: Optional[List[Tuple[int, Any]]] = None
+        self._failed_at = 0.0
+        self._vec_lock = threading.Lock()
+
+    def ensure_vectors(self) -> bool:
+        """Charge (ou calcule) les vecteurs de tous les docs ; False si indisponibles."""
+        with self._vec_lock:
+            if self._parts is not None:
+                return True
+            if self._failed_at and time.monotonic() - self._failed_at < RETRY_AFTER:
+                return False
+            try:
+                parts = []
+                for path, key, first, count in self.docs:
+                    if key is None or not count:
+                        continue
+                    texts = [c["text"] for c in self.chunks[first:first + count]]
+                    matrix = self.store.vectors(key, texts)
+                    if len(matrix) != count:
+                        raise ValueError(f"{len(matrix)} vecteurs pour {count} morceaux : {path}")
+                    parts.append((first, matrix))
+                self._parts = parts
+                return True
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                print(f"[doc_embeddings] Embeddings indisponibles, repli BM25 : {e}")
+                return False
+
+    def ranked(self, query: str) -> List[int]:
+        if not self.chunks or not self.ensure_vectors():
+            return super().ranked(query)
+        try:
+            q = _normalized(self.store.embedder.embed_batch([query or ""]))[0]
+        except Exception as e:
+            print(f"[doc_embeddings] Embedding de la requête impossible, repli BM25 : {e}")
+            return super().ranked(query)
+        sims = np.zeros(len(self.chunks), dtype=np.float32)
+        for first, matrix in self._parts:
+            sims[first:first + len(matrix)] = matrix @ q
+        return [int(i) for i in np.argsort(-sims, kind="stable")]
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+doc_retrieval.py
+Sélection des passages pertinents des docs de référence, au lieu d'envoyer
+les docs entiers à chaque message :
+- Découpage en morceaux (REFERENCE_CHUNK_CHARS, recouvrement
+  REFERENCE_CHUNK_OVERLAP) coupés de préférence aux paragraphes / lignes /
+  espaces ; mis en cache par (chemin, mtime, taille) dès le rattachement
+- Index BM25 en mémoire par conversation (ensemble de docs), réutilisé
+  quand on revient sur une conversation
+- Par message : meilleurs morceaux (au plus REFERENCE_TOP_K) dans un budget
+  de REFERENCE_TOKEN_BUDGET tokens (estimation : REFERENCE_CHARS_PER_TOKEN
+  caractères par token), rendus dans l'ordre des documents
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (sélection hors UI, lecture via doc_cache)
+- §12 Constantes & Config (budgets centralisés dans config.py)
+- §14 Threading & Opérations Bloquantes (caches thread-safe)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .doc_cache import read_reference_doc
+from .search_index import tokens
+
+# =============================================================================
+# Configuration (override via config.py si dispo)
+# =============================================================================
+try:
+    from config import REFERENCE_CHUNK_CHARS as _CONF_CHUNK_CHARS
+except Exception:
+    _CONF_CHUNK_CHARS = 1200
+
+try:
+    from config import REFERENCE_CHUNK_OVERLAP as _CONF_CHUNK_OVERLAP
+except Exception:
+    _CONF_CHUNK_OVERLAP = 150
+
+try:
+    from config import REFERENCE_TOP_K as _CONF_TOP_K
+except Exception:
+    _CONF_TOP_K = 6
+
+try:
+    from config import REFERENCE_TOKEN_BUDGET as _CONF_TOKEN_BUDGET
+except Exception:
+    _CONF_TOKEN_BUDGET = 1500
+
+try:
+    from config import REFERENCE_CHARS_PER_TOKEN as _CONF_CHARS_PER_TOKEN
+except Exception:
+    _CONF_CHARS_PER_TOKEN = 4
+
+CHUNK_CHARS = max(100, int(_CONF_CHUNK_CHARS))
+CHUNK_OVERLAP = max(0, min(int(_CONF_CHUNK_OVERLAP), CHUNK_CHARS // 2))
+TOP_K = max(1, int(_CONF_TOP_K))
+TOKEN_BUDGET = max(1, int(_CONF_TOKEN_BUDGET))
+CHARS_PER_TOKEN = max(1.0, float(_CONF_CHARS_PER_TOKEN))
+
+# BM25 (valeurs usuelles)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# docs découpés / index de conversation gardés en mémoire
+CHUNK_CACHE_MAX_DOCS = 64
+RETRIEVER_CACHE_MAX = 16
+
+_DocKey = Tuple[str, int, int]
+
+
+def estimate_tokens(text: str) -> int:
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+# =============================================================================
+# Découpage
+# =============================================================================
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Morceaux d'environ `size` caractères, `overlap` caractères repris du précédent."""
+    n = len(text)
+    chunks: List[str] = []
+    start = 0
+    while start < n:
+        end = min(n, start + size)
+        if end < n:
+            # coupure naturelle dans la seconde moitié de la fenêtre
+            for sep in ("\n\n", "\n", " "):
+                cut = text.rfind(sep, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(sep)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        next_start = max(end - overlap, start + 1)
+        if overlap:
+            space = text.find(" ", next_start, end)  # ne pas reprendre au milieu d'un mot
+            if space != -1:
+                next_start = space + 1
+        start = next_start
+    return chunks
+
+
+def _doc_key(path: str) -> Optional[_DocKey]:
+    abs_path = os.path.abspath(path)
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return None
+    return (abs_path, st.st_mtime_ns, st.st_size)
+
+
+_chunk_cache: "OrderedDict[_DocKey, List[str]]" = OrderedDict()
+_chunk_lock = threading.Lock()
+
+
+def doc_chunks(path: str) -> List[str]:
+    """Morceaux d'un doc (cache par version du fichier) ; [] si illisible."""
+    key = _doc_key(path)
+    if key is None:
+        return []
+    with _chunk_lock:
+        cached = _chunk_cache.get(key)
+        if cached is not None:
+            _chunk_cache.move_to_end(key)
+            return cached
+    text = read_reference_doc(key[0])
+    chunks = chunk_text(text) if text else []
+    with _chunk_lock:
+        _chunk_cache[key] = chunks
+        while len(_chunk_cache) > CHUNK_CACHE_MAX_DOCS:
+            _chunk_cache.popitem(last=False)
+    return chunks
+
+
+# =============================================================================
+# Index BM25 d'un ensemble de docs
+# =============================================================================
+class DocRetriever:
+    """Index BM25 des morceaux des docs `paths` (figé à la construction)."""
+
+    def __init__(self, paths: Sequence[str]):
+        self.chunks: List[Dict[str, Any]] = []
+        # (chemin, version, 1er n° de morceau, nb de morceaux) par doc
+        self.docs: List[Tuple[str, Optional[_DocKey], int, int]] = []
+        self._tf: List[Counter] = []
+        self._postings: Dict[str, List[int]] = {}
+        for path in paths:
+            key = _doc_key(path)
+            texts = doc_chunks(path)
+            self.docs.append((path, key, len(self.chunks), len(texts)))
+            for i, text in enumerate(texts):
+                tf = Counter(tokens(text))
+                for t in tf:
+                    self._postings.setdefault(t, []).append(len(self.chunks))
+                self.chunks.append({"doc": path, "index": i, "text": text, "tokens": estimate_tokens(text)})
+                self._tf.append(tf)
+        self._lengths = [sum(tf.values()) for tf in self._tf]
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Score BM25 des morceaux contenant au moins un terme de `query` (n° -> score)."""
+        n = len(self.chunks)
+        out: Dict[int, float] = {}
+        for t in set(tokens(query or "")):
+            hits = self._postings.get(t)
+            if not hits:
+                continue
+            idf = math.log(1 + (n - len(hits) + 0.5) / (len(hits) + 0.5))
+            for i in hits:
+                f = self._tf[i][t]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[i] / (self._avg_len or 1))
+                out[i] = out.get(i, 0.0) + idf * f * (BM25_K1 + 1) / (f + norm)
+        return out
+
+    def ranked(self, query: str) -> List[int]:
+        """N° des morceaux, du plus pertinent au moins pertinent (BM25)."""
+        scores = self.scores(query)
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+        return ranked or list(range(len(self.chunks)))
+
+    def select(self, query: str, budget_tokens: int = TOKEN_BUDGET, top_k: int = TOP_K) -> List[Dict[str, Any]]:
+        """
+        Meilleurs morceaux pour `query` tenant dans `budget_tokens`, dans
+        l'ordre des documents. Sans aucun terme commun, début des documents.
+        """
+        chosen, used = [], 0
+        for i in self.ranked(query):
+            cost = self.chunks[i]["tokens"]
+            if used + cost <= budget_tokens:
+                chosen.append(i)
+                used += cost
+                if len(chosen) >= top_k:
+                    break
+        return [self.chunks[i] for i in sorted(chosen)]
+
+    def render(self, query: str, budget_tokens: int = TOKEN_BUDGET, top_k: int = TOP_K) -> str:
+        """Passages sélectionnés, chacun précédé de sa source."""
+        parts = []
+        for ch in self.select(query, budget_tokens, top_k):
+            parts.append(f"[{os.path.basename(ch['doc'])} – passage {ch['index'] + 1}]\n{ch['text']}")
+        return "\n\n".join(parts)
+
+
+_retrievers: "OrderedDict[Tuple[Any, ...], DocRetriever]" = OrderedDict()
+_retriever_lock = threading.Lock()
+
+
+def get_retriever(paths: Sequence[str]) -> DocRetriever:
+    """
+    Index des docs `paths`, réutilisé tant qu'aucun n'a changé sur disque.
+    Recherche sémantique (doc_embeddings) si activée et disponible, BM25 sinon.
+    """
+    from .doc_embeddings import SemanticRetriever, enabled as _semantic_enabled
+
+    cls = SemanticRetriever if _semantic_enabled() else DocRetriever
+    key = (cls.__name__,) + tuple(_doc_key(p) for p in paths)
+    with _retriever_lock:
+        retriever = _retrievers.get(key)
+        if retriever is not None:
+            _retrievers.move_to_end(key)
+            return retriever
+    retriever = cls(paths)
+    with _retriever_lock:
+        _retrievers[key] = retriever
+        while len(_retrievers) > RETRIEVER_CACHE_MAX:
+            _retrievers.popitem(last=False)
+    return retriever
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+file_lock.py
+Verrous consultatifs inter-process (lecteurs/écrivain) pour le stockage :
+- Linux/macOS : fcntl.flock (LOCK_SH / LOCK_EX) sur un fichier .lock dédié
+- Windows : msvcrt.locking (exclusif uniquement : les lectures partagées
+  deviennent exclusives)
+- Sinon : aucun verrou (comportement historique)
+
+Chaque thread ouvre son propre descripteur : flock s'applique par
+descripteur, donc deux threads du même process s'excluent aussi.
+Les verrous sont réentrants par thread. Les temps d'attente sont mesurés
+(lock_stats()).
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §2 Journalisation & Stabilité (pas de mise à jour perdue entre process)
+- §14 Threading & Opérations Bloquantes (attente mesurée, jamais silencieuse)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:
+    msvcrt = None
+
+# =============================================================================
+# Mesures (toutes instances confondues, par catégorie)
+# =============================================================================
+_stats: Dict[str, Dict[str, Any]] = {}
+_stats_guard = threading.Lock()
+
+
+def _record_wait(kind: str, waited: float, contended: bool) -> None:
+    with _stats_guard:
+        st = _stats.setdefault(kind, {"acquired": 0, "contended": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0})
+        st["acquired"] += 1
+        if contended:
+            st["contended"] += 1
+            st["wait_seconds"] += waited
+            st["max_wait_seconds"] = max(st["max_wait_seconds"], waited)
+
+
+def lock_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """{catégorie: {acquired, contended, wait_seconds, max_wait_seconds}}."""
+    with _stats_guard:
+        snapshot = {k: dict(v) for k, v in _stats.items()}
+        if reset:
+            _stats.clear()
+    return snapshot
+
+
+# =============================================================================
+# Primitives OS
+# =============================================================================
+def _try_lock(fd: int, exclusive: bool) -> bool:
+    """Tentative non bloquante ; True si acquis."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+            return True
+        except (BlockingIOError, PermissionError):
+            return False
+    if msvcrt is not None:
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    return True
+
+
+def _lock_blocking(fd: int, exclusive: bool) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    while not _try_lock(fd, exclusive):  # msvcrt : pas d'attente illimitée native
+        time.sleep(0.01)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+# =============================================================================
+# Verrou
+# =============================================================================
+class InterProcessLock:
+    """
+    Verrou lecteurs/écrivain sur `path` (créé au besoin).
+    Usage : `with lock.exclusive(): ...` / `with lock.shared(): ...`
+    """
+
+    def __init__(self, path: str, kind: str = "default"):
+        self.path = path
+        self.kind = kind
+        self._local = threading.local()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._hold(True):
+            yield
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._hold(False):
+            yield
+
+    @contextmanager
+    def _hold(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            exclusive = True  # msvcrt / sans verrou : pas de mode partagé
+        held = getattr(self._local, "held", None)  # [fd, exclusive, profondeur]
+        if held is not None:
+            upgraded = exclusive and not held[1]
+            if upgraded:
+                self._acquire(held[0], True)
+                held[1] = True
+            held[2] += 1
+            try:
+                yield
+            finally:
+                held[2] -= 1
+                if upgraded:
+                    self._acquire(held[0], False)  # retour au mode partagé
+                    held[1] = False
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            self._acquire(fd, exclusive)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._local.held = [fd, exclusive, 1]
+        try:
+            yield
+        finally:
+            self._local.held = None
+            try:
+                _unlock(fd)
+            finally:
+                os.close(fd)
+
+    def _acquire(self, fd: int, exclusive: bool) -> None:
+        if _try_lock(fd, exclusive):
+            _record_wait(self.kind, 0.0, False)
+            return
+        t0 = time.perf_counter()
+        _lock_blocking(fd, exclusive)
+        _record_wait(self.kind, time.perf_counter() - t0, True)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+search_index.py
+Index inversé plein texte de toutes les conversations :
+- Alimenté message par message depuis la façade (append) : jamais de
+  relecture des conversations à la recherche
+- Persisté à côté de index.json sous forme de journal append-only
+  (search_index.jsonl : une ligne par message, ou un retrait de conversation),
+  rejoué au chargement et compacté quand les retraits s'accumulent
+- En mémoire : jeton -> ensemble d'entiers (n° de conversation << 32 | position)
+- Recherche : ET des jetons de la requête (insensible casse/accents),
+  résultats les plus récents d'abord, extrait lu via l'index d'offsets
+- Reconstruction dans un index séparé (build), installé d'un coup (adopt) :
+  le verrou de l'index en service n'est pris que pour l'échange
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (indexation hors façade et stockage)
+- §2 Journalisation & Stabilité (journal append-only, réécriture atomique)
+- §14 Threading & Opérations Bloquantes (verrou unique, chargement paresseux)
+"""
+
+from __future__ import annotations
+
+import heapq
+import io
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from . import storage_fs as fs
+
+INDEX_FILENAME = "search_index.jsonl"
+# index reconstruit à part (build) avant d'être installé (adopt)
+BUILD_SUFFIX = ".building"
+SNIPPET_RADIUS = 60
+MIN_TOKEN_LEN = 2
+# compaction du journal quand les retraits dépassent cette part des lignes
+COMPACT_RATIO = 0.25
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_POS_BITS = 32
+_POS_MASK = (1 << _POS_BITS) - 1
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents (é -> e) : la recherche ignore casse et accents."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokens(text: str) -> List[str]:
+    """Jetons normalisés dans l'ordre, répétitions comprises (fréquences BM25)."""
+    return [t for t in _TOKEN_RE.findall(normalize(text)) if len(t) >= MIN_TOKEN_LEN]
+
+
+def tokenize(text: str) -> Set[str]:
+    return {t for t in _TOKEN_RE.findall(normalize(text)) if len(t) >= MIN_TOKEN_LEN}
+
+
+def make_snippet(content: str, terms: Iterable[str], radius: int = SNIPPET_RADIUS) -> str:
+    """Extrait autour de la première occurrence d'un des termes (sur le texte normalisé)."""
+    norm = normalize(content)
+    if len(norm) != len(content):
+        norm = content.lower()  # ligatures... : positions non alignées, recherche sans accents ignorée
+    hits = [i for i in (norm.find(t) for t in terms) if i >= 0]
+    start = min(hits) if hits else 0
+    lo = max(0, start - radius)
+    hi = min(len(content), start + radius)
+    snippet = " ".join(content[lo:hi].split())
+    return ("…" if lo > 0 else "") + snippet + ("…" if hi < len(content) else "")
+
+
+class SearchIndex:
+    """Index inversé persistant ; toutes les méthodes sont thread-safe."""
+
+    def __init__(self, path: str, message_reader: Callable[[str, int, int], List[Dict[str, Any]]]):
+        self.path = path
+        self._read_messages = message_reader
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._postings: Dict[str, Set[int]] = {}
+        self._conv_nums: Dict[str, int] = {}
+        self._conv_ids: List[str] = []
+        self._lines = 0
+        self._removals = 0
+        self._tail_checked = False
+
+    # ------------------------------------------------------------------
+    # Alimentation
+    # ------------------------------------------------------------------
+    def add_message(self, conv_id: str, position: int, content: str) -> None:
+        tokens = tokenize(content or "")
+        if not tokens:
+            return
+        entry = {"c": conv_id, "p": position, "t": sorted(tokens)}
+        with self._lock:
+            self._append(entry)
+            if self._loaded:
+                self._index_entry(conv_id, position, tokens)
+
+    def remove_conversation(self, conv_id: str) -> None:
+        with self._lock:
+            self._append({"del": conv_id})
+            if self._loaded:
+                self._drop(conv_id)
+                self._removals += 1
+                if self._removals > COMPACT_RATIO * max(self._lines, 1):
+                    self.compact()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._loaded = True
+            self._tail_checked = True
+            fs.atomic_write_text(self.path, "")
+
+    def rebuild(self, conversations: Iterable[Tuple[str, Iterable[Dict[str, Any]]]]) -> int:
+        """Reconstruit tout l'index depuis (conv_id, messages) ; retourne le nb de messages."""
+        staging, count = self.build(conversations)
+        self.adopt(staging)
+        return count
+
+    def build(self, conversations: Iterable[Tuple[str, Iterable[Dict[str, Any]]]]) -> Tuple["SearchIndex", int]:
+        """
+        Construit un index neuf à côté de celui-ci (fichier BUILD_SUFFIX), sans
+        prendre son verrou : recherches et ajouts continuent pendant la
+        construction. Retourne (index construit, nb de messages) ; le compléter
+        si besoin puis l'installer avec adopt().
+        """
+        staging = SearchIndex(self.path + BUILD_SUFFIX, self._read_messages)
+        count = 0
+        lines = []
+        for conv_id, messages in conversations:
+            for position, rec in enumerate(messages):
+                tokens = sorted(tokenize(rec.get("content") or ""))
+                if tokens:
+                    staging._index_entry(conv_id, position, tokens)
+                    lines.append(json.dumps({"c": conv_id, "p": position, "t": tokens}, ensure_ascii=False) + "\n")
+                count += 1
+        fs.atomic_write_text(staging.path, "".join(lines))
+        staging._lines = len(lines)
+        staging._loaded = True
+        staging._tail_checked = True
+        return staging, count
+
+    def adopt(self, staging: "SearchIndex") -> None:
+        """Remplace le contenu (mémoire et journal) par celui d'un index construit par build()."""
+        with staging._lock, self._lock:
+            os.replace(staging.path, self.path)
+            self._postings = staging._postings
+            self._conv_nums = staging._conv_nums
+            self._conv_ids = staging._conv_ids
+            self._lines = staging._lines
+            self._removals = staging._removals
+            self._loaded = True
+            self._tail_checked = True
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Messages contenant TOUS les mots de la requête, plus récents d'abord :
+        [{"conv_id", "position", "snippet"}].
+        """
+        terms = tokenize(query or "")
+        if not terms or limit <= 0:
+            return []
+        with self._lock:
+            self.load()
+            sets = sorted((self._postings.get(t, set()) for t in terms), key=len)
+            if not sets[0]:
+                return []
+            rest = sets[1:]
+            matches = (k for k in sets[0] if all(k in s for s in rest))
+            # ids de conversation horodatés : tri chronologique = tri des ids
+            best = heapq.nlargest(limit, matches, key=lambda k: (self._conv_ids[k >> _POS_BITS], k & _POS_MASK))
+            hits = [(self._conv_ids[k >> _POS_BITS], k & _POS_MASK) for k in best]
+
+        results = []
+        for conv_id, position in hits:
+            try:
+                recs = self._read_messages(conv_id, position, position + 1)
+            except Exception:
+                recs = []
+            content = recs[0].get("content", "") if recs else ""
+            results.append({
+                "conv_id": conv_id,
+                "position": position,
+                "snippet": make_snippet(content, terms),
+            })
+        return results
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> None:
+        """Rejoue le journal (une seule fois par process)."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._reset()
+            self._repair_tail()
+            if os.path.exists(self.path):
+                with io.open(self.path, "rb") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # ligne illisible : ignorée
+                        self._lines += 1
+                        if "del" in entry:
+                            self._drop(entry["del"])
+                            self._removals += 1
+                        else:
+                            self._index_entry(entry["c"], int(entry["p"]), entry["t"])
+            self._loaded = True
+
+    def compact(self) -> None:
+        """Réécrit le journal à partir de l'état en mémoire (sans les retraits)."""
+        with self._lock:
+            self.load()
+            by_message: Dict[int, List[str]] = {}
+            for token, keys in self._postings.items():
+                for k in keys:
+                    by_message.setdefault(k, []).append(token)
+            lines = []
+            for k in sorted(by_message):
+                lines.append(json.dumps(
+                    {"c": self._conv_ids[k >> _POS_BITS], "p": k & _POS_MASK, "t": sorted(by_message[k])},
+                    ensure_ascii=False,
+                ))
+            fs.atomic_write_text(self.path, "".join(line + "\n" for line in lines))
+            self._lines = len(lines)
+            self._removals = 0
+
+    # ------------------------------------------------------------------
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if not self._tail_checked:
+            self._repair_tail()
+        fs.append_record(self.path, (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._lines += 1
+
+    def _repair_tail(self, chunk: int = 4096) -> None:
+        """
+        Tronque une dernière ligne déchirée (crash pendant l'ajout) : sinon le
+        prochain ajout la prolongerait et les deux entrées seraient perdues.
+        """
+        self._tail_checked = True
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if not size:
+            return
+        with io.open(self.path, "r+b") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = size
+            while pos > 0:
+                step = min(chunk, pos)
+                pos -= step
+                f.seek(pos)
+                i = f.read(step).rfind(b"\n")
+                if i >= 0:
+                    f.truncate(pos + i + 1)
+                    return
+            f.truncate(0)
+
+    def _reset(self) -> None:
+        self._postings = {}
+        self._conv_nums = {}
+        self._conv_ids = []
+        self._lines = 0
+        self._removals = 0
+
+    def _conv_num(self, conv_id: str) -> int:
+        num = self._conv_nums.get(conv_id)
+        if num is None:
+            num = len(self._conv_ids)
+            self._conv_ids.append(conv_id)
+            self._conv_nums[conv_id] = num
+        return num
+
+    def _index_entry(self, conv_id: str, position: int, tokens: Iterable[str]) -> None:
+        key = (self._conv_num(conv_id) << _POS_BITS) | position
+        for t in tokens:
+            self._postings.setdefault(t, set()).add(key)
+
+    def _drop(self, conv_id: str) -> None:
+        num = self._conv_nums.get(conv_id)
+        if num is None:
+            return
+        for token in list(self._postings):
+            keys = self._postings[token]
+            stale = {k for k in keys if k >> _POS_BITS == num}
+            if stale:
+                keys -= stale
+                if not keys:
+                    del self._postings[token]
+        # le numéro reste réservé : une conversation recréée repart à vide
+        del self._conv_nums[conv_id]
@@ -2,10 +2,14 @@
 """
 storage_fs.py
 Couche de stockage des conversations sur disque :
-- Fichiers .txt (contenu)
+- Fichiers .txt (contenu : JSONL structuré, ou texte "[ts] ROLE:" historique)
 - Fichiers .json (métadonnées)
+- Fichiers .idx (index d'offsets : n° de message -> position en octets)
+- Archives .txt.gz des conversations inactives (lecture en flux transparente)
 - index.json (liste + méta synthétiques)
-- Écritures atomiques, verrous intra-process
+- Écritures atomiques (méta/index), append-only pour le contenu
+- Index en cache process (validé par mtime) + écriture différée groupée
+- Verrous intra-process + inter-process (fichiers .lock, lecteurs/écrivain)
 
 Conformité "Document d'apprentissage pour chartgpt.txt":
 - §1 Gouvernance du Refactor (séparation claire des responsabilités)
@@ -19,11 +23,22 @@ from __future__ import annotations
 
 import os
 import io
+import re
+import atexit
+import base64
+import bisect
+import gzip
 import json
+import shutil
+import struct
 import tempfile
 import threading
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+
+from .file_lock import InterProcessLock, lock_stats as _lock_stats
 
 # =============================================================================
 # Configuration (override via config.py si dispo)
@@ -54,23 +69,131 @@ INDEX_PATH = os.path.join(CONVERSATION_DIR, _CONF_INDEX_NAME)
 CONV_PREFIX = _CONF_FILE_PREFIX
 CONV_EXT = _CONF_FILE_EXT
 META_EXT = _CONF_META_EXT
+OFFSETS_EXT = ".idx"
 DEBUG = bool(_CONF_DEBUG)
 
+# Politique de durabilité (latence vs pertes possibles en cas de crash) — §12
+#   "none"   : jamais de fsync (le système écrit quand il veut)
+#   "batch"  : fsync groupé des fichiers/dossiers modifiés toutes les N secondes
+#   "strict" : fsync à chaque écriture + fsync du dossier (création/renommage)
+DURABILITY_NONE = "none"
+DURABILITY_BATCH = "batch"
+DURABILITY_STRICT = "strict"
+_DURABILITY_MODES = (DURABILITY_NONE, DURABILITY_BATCH, DURABILITY_STRICT)
+
+try:
+    from config import CONVERSATION_APPEND_FSYNC as _CONF_APPEND_FSYNC  # ancien réglage
+except Exception:
+    _CONF_APPEND_FSYNC = False
+
+try:
+    from config import DURABILITY_MODE as _CONF_DURABILITY_MODE
+except Exception:
+    _CONF_DURABILITY_MODE = DURABILITY_STRICT if _CONF_APPEND_FSYNC else DURABILITY_NONE
+
+try:
+    from config import DURABILITY_BATCH_INTERVAL as _CONF_DURABILITY_BATCH_INTERVAL
+except Exception:
+    _CONF_DURABILITY_BATCH_INTERVAL = 1.0
+
+DURABILITY_MODE = str(_CONF_DURABILITY_MODE).strip().lower()
+if DURABILITY_MODE not in _DURABILITY_MODES:
+    DURABILITY_MODE = DURABILITY_NONE
+DURABILITY_BATCH_INTERVAL = float(_CONF_DURABILITY_BATCH_INTERVAL)
+
+# Délai d'écriture différée de index.json (s) : les mutations sont regroupées
+try:
+    from config import CONVERSATIONS_INDEX_FLUSH_DELAY as _CONF_INDEX_FLUSH_DELAY
+except Exception:
+    _CONF_INDEX_FLUSH_DELAY = 0.5
+
+INDEX_FLUSH_DELAY = float(_CONF_INDEX_FLUSH_DELAY)
+
+# Format des nouvelles conversations : "jsonl" (structuré) ou "text" (historique)
+try:
+    from config import CONVERSATION_RECORD_FORMAT as _CONF_RECORD_FORMAT
+except Exception:
+    _CONF_RECORD_FORMAT = "jsonl"
+
+FORMAT_JSONL = "jsonl"
+FORMAT_TEXT = "text"
+RECORD_FORMAT = FORMAT_TEXT if str(_CONF_RECORD_FORMAT).lower() == FORMAT_TEXT else FORMAT_JSONL
+
+# Réponse interrompue (Stop) : champ "partial" en JSONL, marqueur en fin de
+# message pour le format texte historique
+PARTIAL_MARKER = "[Réponse interrompue]"
+
+# Disposition des nouvelles conversations : "sharded" (sous-dossier AAAA-MM
+# d'après le conv_id) ou "flat" (tout dans CONVERSATION_DIR, historique)
+try:
+    from config import CONVERSATIONS_LAYOUT as _CONF_LAYOUT
+except Exception:
+    _CONF_LAYOUT = "flat"
+
+# Archivage : conversations non modifiées depuis N jours compressées en .gz
+# (lecture transparente, réhydratées au prochain ajout) ; 0 = désactivé
+try:
+    from config import CONVERSATIONS_ARCHIVE_AFTER_DAYS as _CONF_ARCHIVE_AFTER_DAYS
+except Exception:
+    _CONF_ARCHIVE_AFTER_DAYS = 0
+
+ARCHIVE_AFTER_DAYS = float(_CONF_ARCHIVE_AFTER_DAYS or 0)
+ARCHIVE_EXT = ".gz"
+
+LAYOUT_FLAT = "flat"
+LAYOUT_SHARDED = "sharded"
+LAYOUT = LAYOUT_SHARDED if str(_CONF_LAYOUT).lower() == LAYOUT_SHARDED else LAYOUT_FLAT
+
+# Aperçu dénormalisé dans l'index (champ "preview") : la sidebar n'ouvre
+# plus aucun fichier de conversation
+try:
+    from config import SIDEBAR_PREVIEW_MAXLEN as _CONF_PREVIEW_MAXLEN
+except Exception:
+    _CONF_PREVIEW_MAXLEN = 80
+
+PREVIEW_MAXLEN = int(_CONF_PREVIEW_MAXLEN)
+
 # =============================================================================
 # Verrous
 # =============================================================================
-_index_lock = threading.Lock()
-_conv_locks: Dict[str, threading.Lock] = {}
+# Intra-process : RLock (index) et RLock par conversation.
+# Inter-process : verrous consultatifs (fcntl/msvcrt) sur des fichiers .lock
+# dans LOCKS_DIR, pris APRÈS le verrou de thread correspondant.
+LOCKS_DIR = os.path.join(CONVERSATION_DIR, ".locks")
+
+_index_lock = threading.RLock()
+_index_file_lock = InterProcessLock(os.path.join(LOCKS_DIR, "index.lock"), kind="index")
+_conv_locks: Dict[str, threading.RLock] = {}
+_conv_file_locks: Dict[str, InterProcessLock] = {}
 _conv_locks_guard = threading.Lock()
 
 
-def _get_conv_lock(conv_id: str) -> threading.Lock:
+def _conv_lock_path(conv_id: str) -> str:
+    return os.path.join(LOCKS_DIR, f"{conv_id}.lock")
+
+
+def _get_conv_lock(conv_id: str) -> threading.RLock:
     with _conv_locks_guard:
         if conv_id not in _conv_locks:
-            _conv_locks[conv_id] = threading.Lock()
+            _conv_locks[conv_id] = threading.RLock()
+            _conv_file_locks[conv_id] = InterProcessLock(_conv_lock_path(conv_id), kind="conversation")
         return _conv_locks[conv_id]
 
 
+@contextmanager
+def _conv_lock(conv_id: str, shared: bool = False) -> Iterator[None]:
+    """Verrou d'une conversation : thread (toujours exclusif) + process (lecteurs/écrivain)."""
+    with _get_conv_lock(conv_id):
+        file_lock = _conv_file_locks[conv_id]
+        with (file_lock.shared() if shared else file_lock.exclusive()):
+            yield
+
+
+def lock_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Temps d'attente des verrous inter-process (index / conversation)."""
+    return _lock_stats(reset)
+
+
 # =============================================================================
 # Utilitaires
 # =============================================================================
@@ -95,11 +218,15 @@ def atomic_write_text(path: str, content: str, encoding: str = "utf-8") -> None:
     """Écriture atomique : tmp + replace (limite les corruptions) — §2."""
     ensure_dir()
     # Les fichiers temporaires sont créés DANS le dossier cible pour fiabilité des replace
-    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=CONVERSATION_DIR)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path) or CONVERSATION_DIR)
     try:
         with io.open(fd, "w", encoding=encoding, newline="\n") as f:
             f.write(content)
+            if DURABILITY_MODE == DURABILITY_STRICT:
+                f.flush()
+                _fsync(f.fileno())
         os.replace(tmp_path, path)
+        _durable_dir_change(path)
     except Exception:
         try:
             os.unlink(tmp_path)
@@ -108,6 +235,27 @@ def atomic_write_text(path: str, content: str, encoding: str = "utf-8") -> None:
         raise
 
 
+def append_record(path: str, data: bytes) -> int:
+    """
+    Ajoute un enregistrement en fin de fichier (O_APPEND, un seul write logique).
+    Retourne la taille du fichier après écriture = nouvelle borne validée.
+    """
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    fd = os.open(path, flags)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if DURABILITY_MODE == DURABILITY_STRICT:
+            _fsync(fd)
+        elif DURABILITY_MODE == DURABILITY_BATCH:
+            _mark_dirty(path)
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+
 def read_text(path: str, encoding: str = "utf-8") -> str:
     with io.open(path, "r", encoding=encoding) as f:
         return f.read()
@@ -120,31 +268,189 @@ def conv_id_from_filename(filename: str) -> Optional[str]:
     return None
 
 
+# =============================================================================
+# Format texte "[ts] ROLE: message" (partagé avec les autres backends)
+# =============================================================================
+_TEXT_HEADER_RE = re.compile(r"\n\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] ([A-Z]+): ")
+_TEXT_HEADER_RE_BYTES = re.compile(_TEXT_HEADER_RE.pattern.encode("ascii"))
+
+
+def normalize_role(role: str) -> str:
+    role_norm = (role or "").strip().lower()
+    if role_norm not in ("user", "assistant", "ai"):
+        role_norm = "user"
+    return role_norm
+
+
+def format_text_record(ts: str, role: str, message: str) -> str:
+    """Enregistrement encadré tel qu'écrit dans le .txt."""
+    return f"\n[{ts}] {role.upper()}: {message}\n"
+
+
+def iter_text_records(text: str) -> Iterator[Dict[str, str]]:
+    """
+    Découpe un contenu .txt en messages {"ts", "role", "content"} (multi-lignes
+    inclus). Le rôle historique "ai" est ramené à "assistant".
+    """
+    matches = list(_TEXT_HEADER_RE.finditer(text))
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        content = text[m.end():end]
+        if content.endswith("\n"):
+            content = content[:-1]
+        role = m.group(2).lower()
+        yield {
+            "ts": m.group(1),
+            "role": "assistant" if role == "ai" else role,
+            "content": content,
+        }
+
+
+# =============================================================================
+# Enregistrements structurés (JSONL) : un message = une ligne JSON
+# =============================================================================
+def make_record(
+    role: str,
+    content: str,
+    ts: Optional[str] = None,
+    model: Optional[str] = None,
+    tokens: Optional[Dict[str, int]] = None,
+    partial: bool = False,
+) -> Dict[str, Any]:
+    """Message structuré ; model/tokens omis s'ils sont inconnus, partial s'il est faux."""
+    rec: Dict[str, Any] = {"ts": ts or now_iso(), "role": normalize_role(role), "content": content}
+    if rec["role"] == "ai":
+        rec["role"] = "assistant"
+    if model:
+        rec["model"] = model
+    if tokens:
+        rec["tokens"] = dict(tokens)
+    if partial:
+        rec["partial"] = True
+    return rec
+
+
+def encode_record(rec: Dict[str, Any]) -> bytes:
+    return (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode_record(line: bytes) -> Optional[Dict[str, Any]]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except Exception as e:
+        _log(f"Enregistrement JSONL illisible ignoré : {e}")
+        return None
+
+
+def render_text(records) -> str:
+    """Rendu au format texte historique (compat read_conv_text / UI)."""
+    return "".join(format_text_record(r.get("ts", ""), r.get("role", ""), r.get("content", "")) for r in records)
+
+
+# Chemins résolus conv_id -> .txt ; invalidés par toute modification de
+# l'entrée d'index (renommage, suppression, rechargement de l'index)
+_path_cache: Dict[str, str] = {}
+
+
 def file_path(conv_id: str) -> str:
     """
     Retourne le chemin complet du fichier .txt pour une conversation donnée.
     Corrigé : lit le nom réel dans l'index ou les métadonnées si dispo,
-    pour supporter les renommages physiques.
+    pour supporter les renommages physiques. Résultat mis en cache.
     """
+    cached = _path_cache.get(conv_id)
+    if cached is not None:
+        return cached
+
     ensure_dir()
+    with _index_lock:
+        # 1. Essayer depuis l'index
+        idx = load_index()
+        item = find_in_index(idx, conv_id)
+        if item and "file" in item:
+            path = os.path.join(item_dir(item), item["file"])
+        else:
+            # 2. Sinon, essayer depuis les métadonnées
+            meta = read_meta(conv_id)
+            if meta and "file" in meta:
+                path = os.path.join(conv_dir(conv_id), meta["file"])
+            else:
+                # 3. Fallback : reconstruire à partir du conv_id (cas ancien)
+                path = os.path.join(conv_dir(conv_id), f"{CONV_PREFIX}_{conv_id}{CONV_EXT}")
+        _path_cache[conv_id] = path
+    return path
+
+
+def _existing_path(conv_id: str) -> str:
+    """
+    file_path() vérifié sur disque. Fichier absent (ni .txt ni archive) : le
+    chemin en cache peut être périmé (renommage ou migration par un autre
+    process) ; il est invalidé puis résolu de nouveau depuis l'index, relu
+    s'il a changé sur disque.
+    """
+    p = file_path(conv_id)
+    if os.path.exists(p) or _is_archived(p):
+        return p
+    with _index_lock:
+        _path_cache.pop(conv_id, None)
+        load_index()
+        return file_path(conv_id)
 
-    # 1. Essayer depuis l'index
-    idx = load_index()
-    item = find_in_index(idx, conv_id)
-    if item and "file" in item:
-        return os.path.join(CONVERSATION_DIR, item["file"])
 
-    # 2. Sinon, essayer depuis les métadonnées
-    meta = read_meta(conv_id)
-    if meta and "file" in meta:
-        return os.path.join(CONVERSATION_DIR, meta["file"])
+# =============================================================================
+# Disposition en sous-dossiers (shards AAAA-MM)
+# =============================================================================
+_SHARD_RE = re.compile(r"^\d{4}-\d{2}$")
+
+
+def shard_for(conv_id: str) -> str:
+    """Shard d'un conv_id 'AAAA-MM-JJ_...' -> 'AAAA-MM' ; 'misc' sinon."""
+    return conv_id[:7] if _SHARD_RE.match(conv_id[:7]) else "misc"
+
+
+def item_dir(item: Dict[str, Any]) -> str:
+    """Dossier des fichiers d'une entrée d'index ('shard' absent/vide = à plat)."""
+    shard = item.get("shard")
+    return os.path.join(CONVERSATION_DIR, shard) if shard else CONVERSATION_DIR
+
+
+def conv_dir(conv_id: str) -> str:
+    """
+    Résolution transparente du dossier d'une conversation : shard de l'entrée
+    d'index si elle existe, sinon celui de la disposition courante (création).
+    """
+    item = get_index_item(conv_id)
+    if item is not None:
+        return item_dir(item)
+    if LAYOUT == LAYOUT_SHARDED:
+        return os.path.join(CONVERSATION_DIR, shard_for(conv_id))
+    return CONVERSATION_DIR
+
 
-    # 3. Fallback : reconstruire à partir du conv_id (cas ancien)
-    return os.path.join(CONVERSATION_DIR, f"{CONV_PREFIX}_{conv_id}{CONV_EXT}")
+def is_shard_name(name: str) -> bool:
+    """Nom de sous-dossier de shard ('AAAA-MM' ou 'misc')."""
+    return name == "misc" or bool(_SHARD_RE.match(name))
+
+
+def storage_dirs() -> List[str]:
+    """CONVERSATION_DIR puis ses shards existants (pour réparation / scans)."""
+    ensure_dir()
+    dirs = [CONVERSATION_DIR]
+    for entry in os.scandir(CONVERSATION_DIR):
+        if is_shard_name(entry.name) and entry.is_dir():
+            dirs.append(entry.path)
+    return dirs
 
 
 def meta_path(conv_id: str) -> str:
-    return os.path.join(CONVERSATION_DIR, f"{CONV_PREFIX}_{conv_id}{META_EXT}")
+    return os.path.join(conv_dir(conv_id), f"{CONV_PREFIX}_{conv_id}{META_EXT}")
+
+
+def offsets_path(conv_id: str) -> str:
+    return os.path.join(conv_dir(conv_id), f"{CONV_PREFIX}_{conv_id}{OFFSETS_EXT}")
 
 
 # =============================================================================
@@ -153,11 +459,164 @@ def meta_path(conv_id: str) -> str:
 INDEX_VERSION = 1
 
 
-def load_index() -> Dict[str, Any]:
+class WriteBehind:
+    """
+    Écriture différée : regroupe toutes les demandes reçues pendant `delay`
+    secondes en un seul appel à `flush_fn` (thread Timer daemon).
+    `flush()` force l'écriture immédiate (barrière / sortie du process).
+    """
+
+    def __init__(self, flush_fn, delay: float):
+        self._flush_fn = flush_fn
+        self._delay = max(0.0, float(delay))
+        self._timer: Optional[threading.Timer] = None
+        self._guard = threading.Lock()
+
+    def schedule(self) -> None:
+        if self._delay <= 0:
+            self._run()
+            return
+        with self._guard:
+            if self._timer is not None:
+                return  # déjà planifié : la mutation sera incluse dans ce flush
+            self._timer = threading.Timer(self._delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._guard:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._run()
+
+    def _run(self) -> None:
+        with self._guard:
+            self._timer = None
+        try:
+            self._flush_fn()
+        except Exception as e:
+            _log(f"Écriture différée en échec : {e}")
+
+
+# =============================================================================
+# Durabilité : fsync immédiat (strict) ou groupé (batch) + mesures
+# =============================================================================
+_durability_stats = {"fsync": 0, "dir_fsync": 0, "fsync_seconds": 0.0, "batches": 0}
+_dirty_paths: set = set()
+_dirty_dirs: set = set()
+_dirty_guard = threading.Lock()
+
+
+def _fsync(fd: int) -> None:
+    t0 = time.perf_counter()
+    os.fsync(fd)
+    with _dirty_guard:
+        _durability_stats["fsync"] += 1
+        _durability_stats["fsync_seconds"] += time.perf_counter() - t0
+
+
+def _fsync_dir(dirpath: str) -> None:
+    """fsync d'un dossier (rend durables créations/renommages) ; sans objet sous Windows."""
+    if os.name == "nt":
+        return
+    t0 = time.perf_counter()
+    fd = os.open(dirpath, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    with _dirty_guard:
+        _durability_stats["dir_fsync"] += 1
+        _durability_stats["fsync_seconds"] += time.perf_counter() - t0
+
+
+def _mark_dirty(path: Optional[str] = None, dirpath: Optional[str] = None) -> None:
+    with _dirty_guard:
+        if path:
+            _dirty_paths.add(path)
+        if dirpath:
+            _dirty_dirs.add(dirpath)
+    _durability_committer.schedule()
+
+
+def _durable_dir_change(path: str) -> None:
+    """À appeler après création/renommage/suppression de `path`."""
+    dirpath = os.path.dirname(os.path.abspath(path))
+    if DURABILITY_MODE == DURABILITY_STRICT:
+        _fsync_dir(dirpath)
+    elif DURABILITY_MODE == DURABILITY_BATCH:
+        _mark_dirty(path if os.path.exists(path) else None, dirpath)
+
+
+def _group_commit() -> None:
+    """fsync groupé de tout ce qui a été modifié depuis le dernier passage."""
+    with _dirty_guard:
+        paths, dirs = list(_dirty_paths), list(_dirty_dirs)
+        _dirty_paths.clear()
+        _dirty_dirs.clear()
+    if not paths and not dirs:
+        return
+    for p in paths:
+        # écriture requise : sous Windows, os.fsync (FlushFileBuffers) refuse un fd en lecture seule
+        try:
+            fd = os.open(p, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        except OSError:
+            continue  # supprimé entre-temps
+        try:
+            _fsync(fd)
+        except OSError as e:
+            _log(f"fsync impossible pour {p} : {e}")  # les autres chemins du lot restent traités
+        finally:
+            os.close(fd)
+    for d in dirs:
+        try:
+            _fsync_dir(d)
+        except OSError:
+            pass
+    with _dirty_guard:
+        _durability_stats["batches"] += 1
+
+
+_durability_committer = WriteBehind(_group_commit, DURABILITY_BATCH_INTERVAL)
+atexit.register(_durability_committer.flush)
+
+
+def sync_now() -> None:
+    """Force le fsync groupé en attente (mode batch)."""
+    _durability_committer.flush()
+
+
+def durability_stats(reset: bool = False) -> Dict[str, Any]:
+    """Compteurs fsync (nombre, durée cumulée, lots) pour mesurer le coût de la politique."""
+    with _dirty_guard:
+        stats = dict(_durability_stats, mode=DURABILITY_MODE)
+        if reset:
+            _durability_stats.update(fsync=0, dir_fsync=0, fsync_seconds=0.0, batches=0)
+    return stats
+
+
+def _empty_index() -> Dict[str, Any]:
+    return {"version": INDEX_VERSION, "updated_at": now_iso(), "items": []}
+
+
+def _index_stamp() -> Optional[tuple]:
+    """(mtime_ns, taille) de index.json, ou None s'il n'existe pas."""
+    try:
+        st = os.stat(INDEX_PATH)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _write_index_file(index: Dict[str, Any]) -> None:
+    atomic_write_text(INDEX_PATH, json.dumps(index, ensure_ascii=False))
+
+
+def _read_index_file() -> Dict[str, Any]:
     ensure_dir()
     if not os.path.exists(INDEX_PATH):
-        idx = {"version": INDEX_VERSION, "updated_at": now_iso(), "items": []}
-        atomic_write_text(INDEX_PATH, json.dumps(idx, ensure_ascii=False, indent=2))
+        idx = _empty_index()
+        _write_index_file(idx)
         return idx
     try:
         data = json.loads(read_text(INDEX_PATH))
@@ -168,27 +627,329 @@ def load_index() -> Dict[str, Any]:
         return data
     except Exception as e:
         _log(f"index.json illisible → recréé (err: {e})")
-        idx = {"version": INDEX_VERSION, "updated_at": now_iso(), "items": []}
-        atomic_write_text(INDEX_PATH, json.dumps(idx, ensure_ascii=False, indent=2))
+        idx = _empty_index()
+        _write_index_file(idx)
         return idx
 
 
+def _order_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    return (item.get("updated_at") or "", item.get("id") or "")
+
+
+class _IndexCache:
+    """
+    Index partagé par tout le process (protégé par _index_lock) :
+    - `data` : dict index.json (liste ordonnée "items")
+    - `by_id` : conv_id -> entrée (mêmes objets que dans "items")
+    - `by_file` : nom du fichier .txt -> entrée (résolution des renommages)
+    - `order` : clés (updated_at, conv_id) triées, maintenues par bisect
+      (listes et pages sans tri complet)
+    - `stamp` : signature disque au dernier chargement/écriture (validation mtime)
+    - `dirty_ids` / `removed_ids` / `full_rewrite` : mutations en attente d'écriture
+    """
+
+    def __init__(self) -> None:
+        self.data: Optional[Dict[str, Any]] = None
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_file: Dict[str, Dict[str, Any]] = {}
+        self.order: List[Tuple[str, str]] = []
+        self.stamp: Optional[tuple] = None
+        self.dirty_ids: set = set()
+        self.removed_ids: set = set()
+        self.full_rewrite = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.full_rewrite or bool(self.dirty_ids) or bool(self.removed_ids)
+
+    def reset(self, data: Dict[str, Any]) -> None:
+        _path_cache.clear()
+        self.data = data
+        self.by_id = {it.get("id"): it for it in data.get("items", [])}
+        self.by_file = {it["file"]: it for it in data.get("items", []) if it.get("file")}
+        self.order = sorted(_order_key(it) for it in data.get("items", []))
+
+    def order_add(self, item: Dict[str, Any]) -> None:
+        bisect.insort(self.order, _order_key(item))
+
+    def order_remove(self, item: Dict[str, Any]) -> None:
+        key = _order_key(item)
+        i = bisect.bisect_left(self.order, key)
+        if i < len(self.order) and self.order[i] == key:
+            del self.order[i]
+
+    def clear_pending(self) -> None:
+        self.dirty_ids.clear()
+        self.removed_ids.clear()
+        self.full_rewrite = False
+
+
+_index_cache = _IndexCache()
+
+
+def _flush_index() -> None:
+    """
+    Écrit l'index si des mutations sont en attente. Si index.json a été modifié
+    par un autre process depuis notre lecture, on repart du disque et on
+    rejoue uniquement nos entrées modifiées/supprimées (pas de mise à jour perdue).
+    """
+    with _index_lock, _index_file_lock.exclusive():
+        cache = _index_cache
+        if cache.data is None or not cache.dirty:
+            return
+        if not cache.full_rewrite and _index_stamp() != cache.stamp:
+            disk = _read_index_file()
+            merged = {it.get("id"): it for it in disk.get("items", [])}
+            for conv_id in cache.removed_ids:
+                merged.pop(conv_id, None)
+            for conv_id in cache.dirty_ids:
+                if conv_id in cache.by_id:
+                    merged[conv_id] = cache.by_id[conv_id]
+            disk["items"] = list(merged.values())
+            cache.reset(disk)
+        cache.data["version"] = INDEX_VERSION
+        cache.data["updated_at"] = now_iso()
+        _write_index_file(cache.data)
+        cache.stamp = _index_stamp()
+        cache.clear_pending()
+
+
+_index_flusher = WriteBehind(_flush_index, INDEX_FLUSH_DELAY)
+atexit.register(_index_flusher.flush)
+
+
+def flush_index() -> None:
+    """Force l'écriture immédiate des mutations d'index en attente."""
+    _index_flusher.flush()
+
+
+def load_index() -> Dict[str, Any]:
+    """
+    Retourne l'index en cache (objet partagé). Relu depuis le disque seulement
+    si index.json a changé (mtime/taille) et qu'aucune écriture n'est en attente.
+    """
+    with _index_lock:
+        cache = _index_cache
+        if cache.data is None or (not cache.dirty and _index_stamp() != cache.stamp):
+            with _index_file_lock.shared():
+                cache.reset(_read_index_file())
+                cache.stamp = _index_stamp()
+        return cache.data
+
+
 def save_index(index: Dict[str, Any]) -> None:
-    index["version"] = INDEX_VERSION
-    index["updated_at"] = now_iso()
-    atomic_write_text(INDEX_PATH, json.dumps(index, ensure_ascii=False, indent=2))
+    """Remplace tout l'index (réparation, purge) ; écriture différée."""
+    with _index_lock:
+        index["version"] = INDEX_VERSION
+        index["updated_at"] = now_iso()
+        _index_cache.reset(index)
+        _index_cache.full_rewrite = True
+    _index_flusher.schedule()
+
+
+def index_put(item: Dict[str, Any]) -> None:
+    """Ajoute (ou remplace) une entrée d'index ; écriture différée."""
+    with _index_lock:
+        idx = load_index()
+        conv_id = item.get("id")
+        old = _index_cache.by_id.get(conv_id)
+        if old is not None:
+            idx["items"][idx["items"].index(old)] = item
+            _index_cache.by_file.pop(old.get("file"), None)
+            _index_cache.order_remove(old)
+        else:
+            idx["items"].append(item)
+        _index_cache.order_add(item)
+        _index_cache.by_id[conv_id] = item
+        _path_cache.pop(conv_id, None)
+        if item.get("file"):
+            _index_cache.by_file[item["file"]] = item
+        _index_cache.dirty_ids.add(conv_id)
+        _index_cache.removed_ids.discard(conv_id)
+    _index_flusher.schedule()
+
+
+def index_update(conv_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    """Met à jour les champs d'une entrée ; None si absente. Écriture différée."""
+    with _index_lock:
+        load_index()
+        it = _index_cache.by_id.get(conv_id)
+        if it is None:
+            return None
+        if "shard" in fields:
+            _path_cache.pop(conv_id, None)
+        if "file" in fields and fields["file"] != it.get("file"):
+            _path_cache.pop(conv_id, None)
+            _index_cache.by_file.pop(it.get("file"), None)
+            if fields["file"]:
+                _index_cache.by_file[fields["file"]] = it
+        reorder = "updated_at" in fields and fields["updated_at"] != it.get("updated_at")
+        if reorder:
+            _index_cache.order_remove(it)
+        it.update(fields)
+        if reorder:
+            _index_cache.order_add(it)
+        _index_cache.dirty_ids.add(conv_id)
+    _index_flusher.schedule()
+    return it
+
+
+def index_remove(conv_id: str) -> None:
+    """Retire une entrée d'index ; écriture différée."""
+    with _index_lock:
+        idx = load_index()
+        it = _index_cache.by_id.pop(conv_id, None)
+        if it is None:
+            return
+        idx["items"].remove(it)
+        _index_cache.order_remove(it)
+        _path_cache.pop(conv_id, None)
+        _index_cache.by_file.pop(it.get("file"), None)
+        _index_cache.dirty_ids.discard(conv_id)
+        _index_cache.removed_ids.add(conv_id)
+    _index_flusher.schedule()
 
 
 def find_in_index(index: Dict[str, Any], conv_id: str) -> Optional[Dict[str, Any]]:
+    """O(1) sur l'index en cache ; parcours linéaire pour un dict index arbitraire."""
+    with _index_lock:
+        if index is _index_cache.data:
+            return _index_cache.by_id.get(conv_id)
     for it in index.get("items", []):
         if it.get("id") == conv_id:
             return it
     return None
 
 
+def get_index_item(conv_id: str) -> Optional[Dict[str, Any]]:
+    """Copie de l'entrée d'index d'une conversation (O(1)), ou None."""
+    with _index_lock:
+        load_index()
+        it = _index_cache.by_id.get(conv_id)
+        return dict(it) if it is not None else None
+
+
+def get_index_item_by_file(file_name: str) -> Optional[Dict[str, Any]]:
+    """Copie de l'entrée d'index par nom de fichier .txt (O(1)), ou None."""
+    with _index_lock:
+        load_index()
+        it = _index_cache.by_file.get(os.path.basename(file_name))
+        return dict(it) if it is not None else None
+
+
+def resolve_conv_id(filename: str) -> Optional[str]:
+    """
+    conv_id d'un fichier de conversation : d'abord via l'index (supporte les
+    fichiers renommés), sinon déduit du nom "conversation_<id>.txt".
+    """
+    it = get_index_item_by_file(filename)
+    if it is not None:
+        return it.get("id")
+    return conv_id_from_filename(filename)
+
+
+# =============================================================================
+# Journal append-only : bornes validées + récupération après crash
+# =============================================================================
+# Chaque message est un enregistrement encadré "\n[ts] ROLE: message\n" ajouté
+# en O_APPEND. La méta garde "committed_bytes" : fin du dernier enregistrement
+# complet. Tout octet au-delà est un enregistrement déchiré (crash pendant
+# l'append) et est tronqué à la première ouverture dans le process.
+_recovered: set = set()
+
+
+def _recover_torn_tail(conv_id: str, path: str, meta: Dict[str, Any]) -> bool:
+    """
+    Aligne le fichier sur la borne validée de la méta (appelé sous verrou conv).
+    Retourne True si la méta a été modifiée (à réécrire par l'appelant).
+    """
+    size = os.path.getsize(path)
+    committed = meta.get("committed_bytes")
+    if committed is None:
+        # Conversation antérieure au journal : on adopte la taille actuelle
+        meta["committed_bytes"] = size
+        return True
+    committed = int(committed)
+    if size > committed:
+        _log(f"Enregistrement déchiré ({size - committed} octets) tronqué : {conv_id}")
+        with io.open(path, "r+b") as f:
+            f.truncate(committed)
+        return False
+    if size < committed:
+        _log(f"Fichier plus court que la borne validée, borne réalignée : {conv_id}")
+        meta["committed_bytes"] = size
+        return True
+    return False
+
+
+def _ensure_recovered(conv_id: str, path: str) -> Dict[str, Any]:
+    """Récupération unique par process ; retourne la méta à jour (sous verrou conv)."""
+    meta = read_meta(conv_id)
+    if conv_id in _recovered or not meta:
+        return meta
+    if _is_archived(path):
+        _recovered.add(conv_id)  # archive écrite d'un bloc : rien à récupérer
+        return meta
+    changed = _recover_torn_tail(conv_id, path, meta)
+    if _offsets_count(conv_id) != int(meta.get("message_count", 0)):
+        meta["message_count"] = _rebuild_offsets(conv_id, path, _conv_format(conv_id, meta))
+        changed = True
+    if changed:
+        write_meta(conv_id, meta)
+    _recovered.add(conv_id)
+    return meta
+
+
 # =============================================================================
-# Métadonnées
+# Index d'offsets (.idx) : un entier 64 bits par message = début de l'enregistrement
 # =============================================================================
+_OFFSET = struct.Struct("<Q")
+
+
+def _offsets_count(conv_id: str) -> int:
+    try:
+        return os.path.getsize(offsets_path(conv_id)) // _OFFSET.size
+    except OSError:
+        return 0
+
+
+def _scan_offsets(path: str, fmt: str) -> List[int]:
+    """Recalcule les débuts d'enregistrements en parcourant le contenu."""
+    if fmt == FORMAT_JSONL:
+        offsets = []
+        pos = 0
+        with io.open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    offsets.append(pos)
+                pos += len(line)
+        return offsets
+    with io.open(path, "rb") as f:
+        data = f.read()
+    return [m.start() for m in _TEXT_HEADER_RE_BYTES.finditer(data)]
+
+
+def _rebuild_offsets(conv_id: str, path: str, fmt: str) -> int:
+    offsets = _scan_offsets(path, fmt)
+    tmp = offsets_path(conv_id) + ".tmp"
+    with io.open(tmp, "wb") as f:
+        f.write(b"".join(_OFFSET.pack(o) for o in offsets))
+    os.replace(tmp, offsets_path(conv_id))
+    _durable_dir_change(offsets_path(conv_id))
+    _log(f"Index d'offsets reconstruit : {conv_id} ({len(offsets)} messages)")
+    return len(offsets)
+
+
+def _read_offsets(conv_id: str, start: int, stop: int) -> List[int]:
+    """Offsets des messages [start, stop) : un seek + une lecture."""
+    if stop <= start:
+        return []
+    with io.open(offsets_path(conv_id), "rb") as f:
+        f.seek(start * _OFFSET.size)
+        data = f.read((stop - start) * _OFFSET.size)
+    return [v for (v,) in _OFFSET.iter_unpack(data)]
+
+
 def write_meta(conv_id: str, meta: Dict[str, Any]) -> None:
     atomic_write_text(meta_path(conv_id), json.dumps(meta, ensure_ascii=False, indent=2))
 
@@ -204,17 +965,164 @@ def read_meta(conv_id: str) -> Dict[str, Any]:
         return {}
 
 
+# =============================================================================
+# Archivage (tier froid) : .txt -> .txt.gz, lecture transparente
+# =============================================================================
+# Les offsets (.idx), message_count et committed_bytes restent exprimés sur le
+# contenu décompressé : la lecture par plage fonctionne aussi sur l'archive.
+def _is_archived(path: str) -> bool:
+    return not os.path.exists(path) and os.path.exists(path + ARCHIVE_EXT)
+
+
+def open_content(path: str):
+    """Flux binaire du contenu (décompression en flux si la conversation est archivée)."""
+    if _is_archived(path):
+        return gzip.open(path + ARCHIVE_EXT, "rb")
+    return io.open(path, "rb")
+
+
+def _read_content_text(path: str) -> str:
+    with open_content(path) as f:
+        return io.TextIOWrapper(f, encoding="utf-8").read()
+
+
+def _copy_stream_atomic(src, dest: str, compress: bool) -> None:
+    """Copie en flux (blocs de 1 Mo) vers `dest` via tmp + replace."""
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(dest))
+    try:
+        with io.open(fd, "wb") as raw:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else raw
+            shutil.copyfileobj(src, out, 1 << 20)
+            if compress:
+                out.close()
+            if DURABILITY_MODE == DURABILITY_STRICT:
+                raw.flush()
+                _fsync(raw.fileno())
+        os.replace(tmp, dest)
+        _durable_dir_change(dest)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except Exception:
+            pass
+        raise
+
+
+def archive_conv(conv_id: str) -> bool:
+    """Compresse une conversation ; False si déjà archivée ou introuvable."""
+    with _conv_lock(conv_id):
+        p = file_path(conv_id)
+        if not os.path.exists(p):
+            return False
+        _ensure_recovered(conv_id, p)  # jamais d'enregistrement déchiré dans l'archive
+        with io.open(p, "rb") as src:
+            _copy_stream_atomic(src, p + ARCHIVE_EXT, compress=True)
+        os.remove(p)
+        _durable_dir_change(p)
+        index_update(conv_id, archived=True)
+    _log(f"Conversation archivée : {conv_id}")
+    return True
+
+
+def rehydrate_conv(conv_id: str) -> bool:
+    """Décompresse une conversation archivée (avant un ajout) ; False si non archivée."""
+    with _conv_lock(conv_id):
+        p = file_path(conv_id)
+        if not _is_archived(p):
+            return False
+        with gzip.open(p + ARCHIVE_EXT, "rb") as src:
+            _copy_stream_atomic(src, p, compress=False)
+        os.remove(p + ARCHIVE_EXT)
+        _durable_dir_change(p + ARCHIVE_EXT)
+        index_update(conv_id, archived=False)
+    _log(f"Conversation réhydratée : {conv_id}")
+    return True
+
+
+def idle_conv_ids(days: Optional[float] = None) -> List[str]:
+    """Conversations non archivées, non modifiées depuis `days` jours (défaut : config)."""
+    days = ARCHIVE_AFTER_DAYS if days is None else float(days)
+    if days <= 0:
+        return []
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    return [it["id"] for it in list_index_items_sorted()
+            if it.get("id") and not it.get("archived") and it.get("updated_at", "") < cutoff]
+
+
+def archive_idle_conversations(days: Optional[float] = None) -> Dict[str, int]:
+    """Archive les conversations non modifiées depuis `days` jours (défaut : config)."""
+    stats = {"archived": 0, "failed": 0}
+    for conv_id in idle_conv_ids(days):
+        try:
+            if archive_conv(conv_id):
+                stats["archived"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            _log(f"Archivage échoué pour {conv_id}: {e}")
+    flush_index()
+    return stats
+
+
 # =============================================================================
 # Opérations haut-niveau (utilisées par la façade)
 # =============================================================================
 def list_index_items_sorted() -> List[Dict[str, Any]]:
-    idx = load_index()
-    items = idx.get("items", [])
+    with _index_lock:
+        load_index()
+        by_id = _index_cache.by_id
+        return [dict(by_id[cid]) for _, cid in reversed(_index_cache.order) if cid in by_id]
+
+
+def list_index_items_since(updated_at: str) -> List[Dict[str, Any]]:
+    """Entrées modifiées depuis `updated_at` (inclus), sans parcourir les autres."""
+    with _index_lock:
+        load_index()
+        by_id = _index_cache.by_id
+        start = bisect.bisect_left(_index_cache.order, (updated_at, ""))
+        return [dict(by_id[cid]) for _, cid in _index_cache.order[start:] if cid in by_id]
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
     try:
-        items.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
+        updated_at, conv_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (str(updated_at), str(conv_id))
     except Exception:
-        pass
-    return items
+        raise ValueError(f"Curseur de pagination invalide : {cursor!r}")
+
+
+def list_page(cursor: Optional[str] = None, limit: int = 50, tag: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Page de conversations, plus récentes d'abord (updated_at puis conv_id).
+    Le curseur désigne la dernière entrée rendue : la page suivante reprend
+    strictement après, même si des conversations ont été ajoutées entre-temps.
+    Retourne {"items": [...], "next_cursor": str | None}.
+    """
+    limit = max(1, int(limit))
+    with _index_lock:
+        load_index()
+        order, by_id = _index_cache.order, _index_cache.by_id
+        i = (bisect.bisect_left(order, decode_cursor(cursor)) if cursor else len(order)) - 1
+        items: List[Dict[str, Any]] = []
+        last_key = None
+
+        def matches(j: int) -> bool:
+            it = by_id.get(order[j][1])
+            return it is not None and (tag is None or tag in (it.get("tags") or []))
+
+        while i >= 0 and len(items) < limit:
+            if matches(i):
+                items.append(dict(by_id[order[i][1]]))
+                last_key = order[i]
+            i -= 1
+        # page suivante seulement s'il reste au moins une entrée retenue
+        while i >= 0 and not matches(i):
+            i -= 1
+        has_more = i >= 0
+    return {"items": items, "next_cursor": encode_cursor(last_key) if has_more and last_key else None}
 
 
 def create_conv(title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
@@ -232,57 +1140,185 @@ def create_conv(title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
         "updated_at": ts,
         "message_count": 0,
         "tags": list(tags or []),
+        "format": RECORD_FORMAT,
+        "preview": "",
     }
+    if LAYOUT == LAYOUT_SHARDED:
+        item["shard"] = shard_for(conv_id)
+        os.makedirs(item_dir(item), exist_ok=True)
 
     atomic_write_text(file_path(conv_id), "")
-    write_meta(conv_id, {**item})
+    atomic_write_text(offsets_path(conv_id), "")
+    write_meta(conv_id, {**item, "committed_bytes": 0})
+    _recovered.add(conv_id)
 
-    with _index_lock:
-        idx = load_index()
-        idx["items"].append(item)
-        save_index(idx)
+    index_put(dict(item))
 
     _log(f"Conversation créée: {conv_id} '{item['title']}'")
     return item
 
 
-def append_message(conv_id: str, role: str, message: str) -> None:
-    role_norm = (role or "").strip().lower()
-    if role_norm not in ("user", "assistant", "ai"):
-        role_norm = "user"
-
-    lock = _get_conv_lock(conv_id)
-    with lock:
-        p = file_path(conv_id)
+def preview_fields(content: str) -> Dict[str, str]:
+    """
+    Champs dénormalisés tirés du premier message utilisateur :
+    - "preview" : texte sur une ligne, tronqué à PREVIEW_MAXLEN
+    - "display_title" : première ligne (libellé de la sidebar tant que la
+      conversation n'a pas été renommée)
+    """
+    text = (content or "").strip()
+    if not text:
+        return {}
+    preview = " ".join(text.split())
+    if len(preview) > PREVIEW_MAXLEN:
+        preview = preview[:PREVIEW_MAXLEN - 1].rstrip() + "…"
+    return {"preview": preview, "display_title": text.splitlines()[0].strip().capitalize()}
+
+
+def _conv_format(conv_id: str, meta: Optional[Dict[str, Any]] = None) -> str:
+    """Format du contenu ; absent = conversation historique au format texte."""
+    src = meta if meta is not None else (get_index_item(conv_id) or read_meta(conv_id))
+    return src.get("format") or FORMAT_TEXT
+
+
+def append_message(
+    conv_id: str,
+    role: str,
+    message: str,
+    model: Optional[str] = None,
+    tokens: Optional[Dict[str, int]] = None,
+    partial: bool = False,
+) -> None:
+    role_norm = normalize_role(role)
+
+    with _conv_lock(conv_id):
+        p = _existing_path(conv_id)
+        if _is_archived(p):
+            rehydrate_conv(conv_id)
         if not os.path.exists(p):
             raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
 
+        meta = _ensure_recovered(conv_id, p)
+
         ts = now_iso()
-        existing = read_text(p) if os.path.getsize(p) > 0 else ""
-        block = f"\n[{ts}] {role_norm.upper()}: {message}\n"
-        atomic_write_text(p, existing + block)
+        if _conv_format(conv_id, meta) == FORMAT_JSONL:
+            block = encode_record(make_record(role_norm, message, ts=ts, model=model, tokens=tokens, partial=partial))
+        else:
+            text = f"{message}\n{PARTIAL_MARKER}" if partial else message
+            block = format_text_record(ts, role_norm, text).encode("utf-8")
+        committed = append_record(p, block)
+        append_record(offsets_path(conv_id), _OFFSET.pack(committed - len(block)))
 
-        meta = read_meta(conv_id)
         meta["updated_at"] = ts
         meta["message_count"] = int(meta.get("message_count", 0)) + 1
+        meta["committed_bytes"] = committed
+        extra: Dict[str, Any] = {}
+        # "" = aucun message utilisateur encore ; clé absente = entrée ancienne (backfill_previews)
+        if role_norm == "user" and meta.get("preview") == "":
+            extra = preview_fields(message)
+            if meta.get("display_title"):  # renommée avant le premier message : le titre choisi prime
+                extra.pop("display_title", None)
+            meta.update(extra)
         write_meta(conv_id, meta)
 
-        with _index_lock:
-            idx = load_index()
-            it = find_in_index(idx, conv_id)
-            if it:
-                it["updated_at"] = ts
-                it["message_count"] = int(it.get("message_count", 0)) + 1
-                save_index(idx)
+        index_update(conv_id, updated_at=ts, message_count=meta["message_count"], **extra)
 
     _log(f"Append [{role_norm}] {conv_id} ({len(message)} chars)")
 
 
-def read_conv_text(conv_id: str) -> str:
-    p = file_path(conv_id)
-    if not os.path.exists(p):
+def _open_for_read(conv_id: str) -> str:
+    p = _existing_path(conv_id)
+    if not os.path.exists(p) and not _is_archived(p):
         raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
-    return read_text(p)
+    if conv_id not in _recovered:
+        with _conv_lock(conv_id):
+            _ensure_recovered(conv_id, p)
+    return p
+
+
+def read_conv_text(conv_id: str) -> str:
+    p = _open_for_read(conv_id)
+    if _conv_format(conv_id) == FORMAT_JSONL:
+        return render_text(iter_messages(conv_id))
+    return _read_content_text(p)
+
+
+def iter_messages(conv_id: str) -> Iterator[Dict[str, Any]]:
+    """Lecture en flux des messages structurés (une ligne JSONL à la fois)."""
+    p = _open_for_read(conv_id)
+    if _conv_format(conv_id) != FORMAT_JSONL:
+        yield from iter_text_records(_read_content_text(p))
+        return
+    with open_content(p) as f:
+        for line in f:
+            rec = decode_record(line)
+            if rec is not None:
+                yield rec
+
+
+def read_messages(conv_id: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Messages [start, stop) (indices façon slice, négatifs acceptés) lus par
+    seek via l'index d'offsets : coût proportionnel à la plage, pas au fichier.
+    """
+    p = _open_for_read(conv_id)
+    with _conv_lock(conv_id, shared=True):
+        count = _offsets_count(conv_id)
+        start, stop, _ = slice(start, stop).indices(count)
+        if stop <= start:
+            return []
+        offsets = _read_offsets(conv_id, start, min(stop + 1, count))
+        with open_content(p) as f:
+            f.seek(offsets[0])  # archive : seek = décompression en flux jusqu'à l'offset
+            data = f.read(offsets[-1] - offsets[0]) if stop < count else f.read()
+    if _conv_format(conv_id) == FORMAT_JSONL:
+        recs = (decode_record(line) for line in data.split(b"\n"))
+        return [r for r in recs if r is not None]
+    return list(iter_text_records(data.decode("utf-8", errors="replace")))
+
+
+def tail_messages(conv_id: str, n: int) -> List[Dict[str, Any]]:
+    """Les n derniers messages."""
+    return read_messages(conv_id, -n) if n > 0 else []
+
+
+def convert_conv_to_jsonl(conv_id: str) -> bool:
+    """
+    Convertit une conversation texte historique en JSONL (réécriture atomique,
+    le seul cas de réécriture complète du contenu). False si déjà en JSONL.
+    """
+    with _conv_lock(conv_id):
+        p = _open_for_read(conv_id)
+        meta = read_meta(conv_id)
+        if _conv_format(conv_id, meta) == FORMAT_JSONL:
+            return False
+        if _is_archived(p):
+            rehydrate_conv(conv_id)
+        records = [make_record(r["role"], r["content"], ts=r["ts"]) for r in iter_text_records(read_text(p))]
+        data = b"".join(encode_record(r) for r in records).decode("utf-8")
+        atomic_write_text(p, data)
+
+        meta["format"] = FORMAT_JSONL
+        meta["message_count"] = _rebuild_offsets(conv_id, p, FORMAT_JSONL)
+        meta["committed_bytes"] = os.path.getsize(p)
+        write_meta(conv_id, meta)
+        index_update(conv_id, format=FORMAT_JSONL, message_count=len(records))
+
+    _log(f"Conversation convertie en JSONL : {conv_id} ({len(records)} messages)")
+    return True
+
+
+def convert_all_to_jsonl() -> Dict[str, int]:
+    stats = {"converted": 0, "skipped": 0, "failed": 0}
+    for item in list_index_items_sorted():
+        try:
+            if convert_conv_to_jsonl(item["id"]):
+                stats["converted"] += 1
+            else:
+                stats["skipped"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            _log(f"Conversion JSONL échouée pour {item.get('id')}: {e}")
+    return stats
 
 
 def rename_title(conv_id: str, new_title: str) -> Dict[str, Any]:
@@ -290,63 +1326,180 @@ def rename_title(conv_id: str, new_title: str) -> Dict[str, Any]:
     if not new_title:
         raise ValueError("Le nouveau titre est vide.")
 
-    lock = _get_conv_lock(conv_id)
-    with lock:
+    with _conv_lock(conv_id):
         ts = now_iso()
         meta = read_meta(conv_id)
         if not meta:
             raise FileNotFoundError("Métadonnées introuvables.")
 
         meta["title"] = new_title
+        meta["display_title"] = new_title
         meta["updated_at"] = ts
         write_meta(conv_id, meta)
 
-        with _index_lock:
-            idx = load_index()
-            it = find_in_index(idx, conv_id)
-            if not it:
-                raise FileNotFoundError("Conversation absente de l'index.")
-            it["title"] = new_title
-            it["updated_at"] = ts
-            save_index(idx)
+        if index_update(conv_id, title=new_title, display_title=new_title, updated_at=ts) is None:
+            raise FileNotFoundError("Conversation absente de l'index.")
 
     _log(f"Titre changé → {conv_id} -> '{new_title}'")
     return meta
 
 
-def delete_conv(conv_id: str) -> None:
-    lock = _get_conv_lock(conv_id)
-    with lock:
+def rename_file(conv_id: str, new_name: str) -> Dict[str, Any]:
+    """
+    Historique : renomme physiquement le .txt MAIS garde le .json associé inchangé.
+    Met à jour title et file dans les métadonnées et l'index.
+    """
+    ensure_dir()
+    old_path = file_path(conv_id)
+    if _is_archived(old_path):
+        rehydrate_conv(conv_id)
+    new_path = os.path.join(os.path.dirname(old_path), new_name)
+    if not os.path.exists(old_path):
+        raise FileNotFoundError(f"Le fichier '{os.path.basename(old_path)}' n'existe pas.")
+    if os.path.exists(new_path):
+        raise FileExistsError(f"Un fichier nommé '{new_name}' existe déjà.")
+
+    with _conv_lock(conv_id):
+        # Lire meta avant renommage
+        meta = read_meta(conv_id)
+        if not meta:
+            raise FileNotFoundError("Métadonnées introuvables.")
+
+        # Renommer uniquement le .txt
+        os.rename(old_path, new_path)
+        _durable_dir_change(new_path)
+
+        # ⚠️ On ne touche pas à meta["meta"], il garde le .json original
+        title_from_name = os.path.splitext(new_name)[0]
+        meta["title"] = title_from_name
+        meta["display_title"] = title_from_name
+        meta["file"] = os.path.basename(new_path)
+        write_meta(conv_id, meta)
+        index_update(conv_id, title=title_from_name, display_title=title_from_name, file=meta["file"])
+
+    _log(f"Fichier renommé → {conv_id} -> '{new_name}'")
+    return meta
+
+
+def list_conversation_files() -> List[str]:
+    """Noms des fichiers de conversation, d'après l'index (aucun parcours de dossier)."""
+    with _index_lock:
+        return [it["file"] for it in load_index().get("items", []) if it.get("file")]
+
+
+def migrate_conv_to_shard(conv_id: str) -> bool:
+    """Déplace une conversation à plat dans son shard ; False si déjà rangée."""
+    with _conv_lock(conv_id):
+        item = get_index_item(conv_id)
+        if item is None:
+            raise FileNotFoundError(f"Conversation absente de l'index: {conv_id}")
+        if item.get("shard"):
+            return False
+        shard = shard_for(conv_id)
+        dest_dir = os.path.join(CONVERSATION_DIR, shard)
+        os.makedirs(dest_dir, exist_ok=True)
+        # .idx/.json d'abord, contenu (.txt ou archive .txt.gz) en dernier : tant
+        # que l'index n'est pas à jour, une relance reprend là où on s'est arrêté
         txt = file_path(conv_id)
+        for src in (offsets_path(conv_id), meta_path(conv_id), txt + ARCHIVE_EXT, txt):
+            if os.path.exists(src):
+                os.replace(src, os.path.join(dest_dir, os.path.basename(src)))
+        index_update(conv_id, shard=shard)
+        meta = read_meta(conv_id)
+        if meta:
+            meta["shard"] = shard
+            write_meta(conv_id, meta)
+        _durable_dir_change(os.path.join(dest_dir, item.get("file", "")))
+        _durable_dir_change(os.path.join(CONVERSATION_DIR, item.get("file", "")))
+    _log(f"Conversation déplacée dans le shard {shard} : {conv_id}")
+    return True
+
+
+def migrate_all_to_shards() -> Dict[str, int]:
+    """Range toutes les conversations à plat dans leurs shards (relançable)."""
+    stats = {"moved": 0, "skipped": 0, "failed": 0}
+    for item in list_index_items_sorted():
+        try:
+            if migrate_conv_to_shard(item["id"]):
+                stats["moved"] += 1
+            else:
+                stats["skipped"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            _log(f"Migration vers shard échouée pour {item.get('id')}: {e}")
+    flush_index()
+    return stats
+
+
+def delete_conv(conv_id: str) -> None:
+    with _conv_lock(conv_id):
+        txt = _existing_path(conv_id)
         meta = meta_path(conv_id)
-        for p in (txt, meta):
+        for p in (txt, txt + ARCHIVE_EXT, meta, offsets_path(conv_id)):
             try:
                 if os.path.exists(p):
                     os.remove(p)
             except Exception as e:
                 _log(f"Erreur suppression '{p}': {e}")
                 raise
+        _durable_dir_change(txt)
+        _recovered.discard(conv_id)
 
-        with _index_lock:
-            idx = load_index()
-            idx["items"] = [it for it in idx.get("items", []) if it.get("id") != conv_id]
-            save_index(idx)
+        index_remove(conv_id)
+        # fichier .lock retiré sous le verrou (Windows : encore ouvert, ignoré)
+        try:
+            os.remove(_conv_lock_path(conv_id))
+        except OSError:
+            pass
 
     _log(f"Conversation supprimée: {conv_id}")
 
 
+def _first_user_message(conv_id: str) -> Optional[str]:
+    for rec in iter_messages(conv_id):
+        content = (rec.get("content") or "").strip()
+        if rec.get("role") == "user" and content:
+            return content
+    return None
+
+
+def preview_missing_ids() -> List[str]:
+    """Entrées d'index antérieures aux champs "preview"/"display_title"."""
+    with _index_lock:
+        return [it["id"] for it in load_index().get("items", []) if "preview" not in it and it.get("id")]
+
+
+def backfill_preview(conv_id: str) -> None:
+    """
+    Renseigne "preview"/"display_title" d'une entrée (lecture du seul premier
+    message utilisateur). Sans message utilisateur : aperçu vide, plus relue.
+    """
+    with _conv_lock(conv_id):
+        fields = {"preview": ""}
+        fields.update(preview_fields(_first_user_message(conv_id) or ""))
+        meta = read_meta(conv_id)
+        if meta.get("display_title"):
+            fields.pop("display_title", None)
+        if meta:
+            meta.update(fields)
+            write_meta(conv_id, meta)
+        index_update(conv_id, **fields)
+
+
+def backfill_previews() -> int:
+    """Complète les entrées sans aperçu (backfill_preview) ; retourne le nombre d'entrées complétées."""
+    done = 0
+    for conv_id in preview_missing_ids():
+        try:
+            backfill_preview(conv_id)
+            done += 1
+        except Exception as e:
+            _log(f"Aperçu non calculé pour {conv_id}: {e}")
+    return done
+
+
 def retitle_from_first_user_line(conv_id: str) -> Optional[str]:
-    raw = read_conv_text(conv_id)
-    take_next_non_empty = False
-    first: Optional[str] = None
-    for line in raw.splitlines():
-        s = line.strip()
-        if s.upper().startswith("USER:") or (s.startswith("[") and "USER:" in s.upper()):
-            take_next_non_empty = True
-            continue
-        if take_next_non_empty and s:
-            first = s
-            break
-    title = first or conv_id
+    content = _first_user_message(conv_id)
+    title = content.splitlines()[0] if content else conv_id
     rename_title(conv_id, title)
     return title
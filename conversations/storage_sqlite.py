@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+"""
+storage_sqlite.py
+Backend SQLite des conversations (alternative à storage_fs) :
+- Une base unique en mode WAL (lecteurs non bloqués par l'écrivain)
+- Table `conversations` (équivalent index.json + métadonnées)
+- Table `messages` (un enregistrement par message, ordonné par `seq`)
+- Appends transactionnels, listing ordonné via index sur updated_at
+- Migration one-shot depuis l'arborescence .txt/.json/index.json (texte ou JSONL)
+
+Même API module que storage_fs (voir backend.ConversationBackend).
+Les "fichiers" de l'API historique sont des noms virtuels
+("conversation_<id>.txt") conservés dans la colonne `file`.
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §1 Séparation des responsabilités (backend interchangeable derrière la façade)
+- §2 Journalisation & Stabilité (transactions, try/except aux points critiques)
+- §12 Constantes & Config (lecture config.py si présent)
+- §14 Threading & Opérations Bloquantes (connexion partagée sous verrou)
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Any
+
+from . import storage_fs as fs
+from .storage_fs import (  # noqa: F401  (ré-export : API commune des backends)
+    conv_id_from_filename,
+    now_iso,
+    ts_for_id,
+)
+
+# =============================================================================
+# Configuration (override via config.py si dispo)
+# =============================================================================
+try:
+    from config import CONVERSATIONS_SQLITE_PATH as _CONF_DB_PATH
+except Exception:
+    _CONF_DB_PATH = os.path.join(fs.CONVERSATION_DIR, "conversations.sqlite3")
+
+DB_PATH = os.path.normpath(_CONF_DB_PATH)
+DB_DIR = os.path.dirname(DB_PATH) or "."
+DEBUG = fs.DEBUG
+
+# Politique de durabilité partagée avec storage_fs (DURABILITY_MODE) :
+# en WAL, NORMAL ne fsync qu'aux checkpoints (≈ fsync groupé)
+_SYNCHRONOUS = {
+    fs.DURABILITY_NONE: "OFF",
+    fs.DURABILITY_BATCH: "NORMAL",
+    fs.DURABILITY_STRICT: "FULL",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id            TEXT PRIMARY KEY,
+    title         TEXT NOT NULL,
+    file          TEXT NOT NULL UNIQUE,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    tags          TEXT NOT NULL DEFAULT '[]',
+    preview       TEXT NOT NULL DEFAULT '',
+    display_title TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated_at
+    ON conversations(updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_page
+    ON conversations(updated_at, id);
+CREATE TABLE IF NOT EXISTS messages (
+    conv_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    seq     INTEGER NOT NULL,
+    ts      TEXT NOT NULL,
+    role    TEXT NOT NULL,
+    content TEXT NOT NULL,
+    model   TEXT,
+    tokens  TEXT,
+    partial INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (conv_id, seq)
+) WITHOUT ROWID;
+"""
+
+_COLUMNS = ("id", "title", "file", "created_at", "updated_at", "message_count", "tags", "preview", "display_title")
+
+# Colonnes ajoutées après la création initiale du schéma (bases existantes)
+_MESSAGE_COLUMNS_ADDED = {"model": "TEXT", "tokens": "TEXT", "partial": "INTEGER NOT NULL DEFAULT 0"}
+_CONVERSATION_COLUMNS_ADDED = {"preview": "TEXT NOT NULL DEFAULT ''", "display_title": "TEXT"}
+
+# =============================================================================
+# Connexion (une seule, partagée sous verrou)
+# =============================================================================
+_db_lock = threading.RLock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def _log(msg: str) -> None:
+    if DEBUG:
+        print(f"[storage_sqlite] {msg}")
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    with _db_lock:
+        if _conn is None:
+            os.makedirs(DB_DIR, exist_ok=True)
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS[fs.DURABILITY_MODE]}")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            _upgrade_schema(conn)
+            _conn = conn
+        return _conn
+
+
+def _upgrade_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        for table, added in (("messages", _MESSAGE_COLUMNS_ADDED), ("conversations", _CONVERSATION_COLUMNS_ADDED)):
+            existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            for name, decl in added.items():
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def close() -> None:
+    global _conn
+    with _db_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def _row_to_item(row: sqlite3.Row) -> Dict[str, Any]:
+    item = {k: row[k] for k in _COLUMNS}
+    try:
+        item["tags"] = json.loads(item["tags"] or "[]")
+    except Exception:
+        item["tags"] = []
+    return item
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+    tokens = None
+    if row["tokens"]:
+        try:
+            tokens = json.loads(row["tokens"])
+        except Exception:
+            tokens = None
+    return fs.make_record(
+        row["role"], row["content"], ts=row["ts"], model=row["model"], tokens=tokens, partial=bool(row["partial"])
+    )
+
+
+def _get_item(conn: sqlite3.Connection, conv_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        "SELECT * FROM conversations WHERE id = ?", (conv_id,)
+    ).fetchone()
+    return _row_to_item(row) if row else None
+
+
+# =============================================================================
+# API commune des backends
+# =============================================================================
+def ensure_dir() -> None:
+    _connect()
+
+
+def file_path(conv_id: str) -> str:
+    """Chemin virtuel (non présent sur disque) utilisé par l'API historique."""
+    it = get_index_item(conv_id)
+    name = it["file"] if it else f"{fs.CONV_PREFIX}_{conv_id}{fs.CONV_EXT}"
+    return os.path.join(DB_DIR, name)
+
+
+def get_index_item(conv_id: str) -> Optional[Dict[str, Any]]:
+    with _db_lock:
+        return _get_item(_connect(), conv_id)
+
+
+def resolve_conv_id(filename: str) -> Optional[str]:
+    with _db_lock:
+        row = _connect().execute(
+            "SELECT id FROM conversations WHERE file = ?", (os.path.basename(filename),)
+        ).fetchone()
+    if row:
+        return row["id"]
+    return conv_id_from_filename(filename)
+
+
+def read_meta(conv_id: str) -> Dict[str, Any]:
+    return get_index_item(conv_id) or {}
+
+
+def list_index_items_sorted() -> List[Dict[str, Any]]:
+    with _db_lock:
+        rows = _connect().execute(
+            "SELECT * FROM conversations ORDER BY updated_at DESC"
+        ).fetchall()
+    return [_row_to_item(r) for r in rows]
+
+
+def list_page(cursor: Optional[str] = None, limit: int = 50, tag: Optional[str] = None) -> Dict[str, Any]:
+    """Pagination par clé (updated_at, id) : même contrat que storage_fs.list_page."""
+    limit = max(1, int(limit))
+    where, params = [], []
+    if cursor:
+        where.append("(updated_at, id) < (?, ?)")
+        params.extend(fs.decode_cursor(cursor))
+    if tag is not None:
+        where.append("EXISTS (SELECT 1 FROM json_each(conversations.tags) WHERE value = ?)")
+        params.append(tag)
+    sql = "SELECT * FROM conversations"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+    with _db_lock:
+        rows = _connect().execute(sql, (*params, limit + 1)).fetchall()
+    items = [_row_to_item(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = fs.encode_cursor((items[-1]["updated_at"], items[-1]["id"]))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def list_conversation_files() -> List[str]:
+    with _db_lock:
+        rows = _connect().execute("SELECT file FROM conversations").fetchall()
+    return [r["file"] for r in rows]
+
+
+def create_conv(title: str, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+    conv_id = ts_for_id()
+    ts = now_iso()
+    item = {
+        "id": conv_id,
+        "title": (title or conv_id).strip(),
+        "file": f"{fs.CONV_PREFIX}_{conv_id}{fs.CONV_EXT}",
+        "created_at": ts,
+        "updated_at": ts,
+        "message_count": 0,
+        "tags": list(tags or []),
+        "preview": "",
+        "display_title": None,
+    }
+    with _db_lock:
+        conn = _connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO conversations (id, title, file, created_at, updated_at, message_count, tags)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conv_id, item["title"], item["file"], ts, ts, 0, json.dumps(item["tags"])),
+            )
+    _log(f"Conversation créée: {conv_id} '{item['title']}'")
+    return item
+
+
+def append_message(
+    conv_id: str,
+    role: str,
+    message: str,
+    model: Optional[str] = None,
+    tokens: Optional[Dict[str, int]] = None,
+    partial: bool = False,
+) -> None:
+    role_norm = fs.normalize_role(role)
+    ts = now_iso()
+    with _db_lock:
+        conn = _connect()
+        with conn:
+            row = conn.execute(
+                "SELECT message_count, preview, display_title FROM conversations WHERE id = ?", (conv_id,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
+            seq = int(row["message_count"]) + 1
+            conn.execute(
+                "INSERT INTO messages (conv_id, seq, ts, role, content, model, tokens, partial)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (conv_id, seq, ts, role_norm, message, model, json.dumps(tokens) if tokens else None, int(partial)),
+            )
+            conn.execute(
+                "UPDATE conversations SET updated_at = ?, message_count = ? WHERE id = ?",
+                (ts, seq, conv_id),
+            )
+            if role_norm == "user" and not row["preview"]:
+                fields = fs.preview_fields(message)
+                if fields:
+                    conn.execute(
+                        "UPDATE conversations SET preview = ?, display_title = COALESCE(display_title, ?) WHERE id = ?",
+                        (fields["preview"], fields["display_title"], conv_id),
+                    )
+    _log(f"Append [{role_norm}] {conv_id} ({len(message)} chars)")
+
+
+def read_conv_text(conv_id: str) -> str:
+    """Rendu au format texte historique "[ts] ROLE: message" (compat UI)."""
+    return fs.render_text(iter_messages(conv_id))
+
+
+def iter_messages(conv_id: str) -> Iterator[Dict[str, Any]]:
+    with _db_lock:
+        conn = _connect()
+        if _get_item(conn, conv_id) is None:
+            raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
+        rows = conn.execute(
+            "SELECT * FROM messages WHERE conv_id = ? ORDER BY seq", (conv_id,)
+        ).fetchall()
+    for r in rows:
+        yield _row_to_record(r)
+
+
+def read_messages(conv_id: str, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Plage [start, stop) façon slice ; seq = index + 1 (clé primaire)."""
+    with _db_lock:
+        conn = _connect()
+        item = _get_item(conn, conv_id)
+        if item is None:
+            raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
+        start, stop, _ = slice(start, stop).indices(int(item["message_count"]))
+        if stop <= start:
+            return []
+        rows = conn.execute(
+            "SELECT * FROM messages WHERE conv_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+            (conv_id, start, stop),
+        ).fetchall()
+    return [_row_to_record(r) for r in rows]
+
+
+def tail_messages(conv_id: str, n: int) -> List[Dict[str, Any]]:
+    return read_messages(conv_id, -n) if n > 0 else []
+
+
+def rename_title(conv_id: str, new_title: str) -> Dict[str, Any]:
+    new_title = (new_title or "").strip()
+    if not new_title:
+        raise ValueError("Le nouveau titre est vide.")
+    with _db_lock:
+        conn = _connect()
+        with conn:
+            cur = conn.execute(
+                "UPDATE conversations SET title = ?, display_title = ?, updated_at = ? WHERE id = ?",
+                (new_title, new_title, now_iso(), conv_id),
+            )
+            if cur.rowcount == 0:
+                raise FileNotFoundError("Conversation absente de l'index.")
+        meta = _get_item(conn, conv_id)
+    _log(f"Titre changé → {conv_id} -> '{new_title}'")
+    return meta
+
+
+def rename_file(conv_id: str, new_name: str) -> Dict[str, Any]:
+    """Historique : change le nom virtuel du fichier et le titre."""
+    title_from_name = os.path.splitext(new_name)[0]
+    with _db_lock:
+        conn = _connect()
+        if _get_item(conn, conv_id) is None:
+            raise FileNotFoundError(f"Conversation introuvable: {conv_id}")
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE conversations SET title = ?, display_title = ?, file = ? WHERE id = ?",
+                    (title_from_name, title_from_name, new_name, conv_id),
+                )
+        except sqlite3.IntegrityError:
+            raise FileExistsError(f"Un fichier nommé '{new_name}' existe déjà.")
+        return _get_item(conn, conv_id)
+
+
+def delete_conv(conv_id: str) -> None:
+    with _db_lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
+    _log(f"Conversation supprimée: {conv_id}")
+
+
+def retitle_from_first_user_line(conv_id: str) -> Optional[str]:
+    with _db_lock:
+        row = _connect().execute(
+            "SELECT content FROM messages WHERE conv_id = ? AND role = 'user'"
+            " ORDER BY seq LIMIT 1",
+            (conv_id,),
+        ).fetchone()
+    first = row["content"].strip().splitlines()[0] if row and row["content"].strip() else None
+    title = first or conv_id
+    rename_title(conv_id, title)
+    return title
+
+
+# =============================================================================
+# Migration one-shot depuis storage_fs
+# =============================================================================
+def migrate_from_fs() -> Dict[str, int]:
+    """
+    Importe toutes les conversations de l'index storage_fs (contenu .txt +
+    métadonnées .json). Les conv_id déjà présents en base sont ignorés, la
+    migration peut donc être relancée sans doublon. Une transaction par
+    conversation : un échec n'en laisse aucune à moitié importée.
+    """
+    stats = {"migrated": 0, "skipped": 0, "failed": 0, "messages": 0}
+    for item in fs.list_index_items_sorted():
+        conv_id = item.get("id")
+        if not conv_id:
+            continue
+        try:
+            with _db_lock:
+                conn = _connect()
+                if _get_item(conn, conv_id) is not None:
+                    stats["skipped"] += 1
+                    continue
+                meta = fs.read_meta(conv_id)
+                records = list(fs.iter_messages(conv_id))
+                first_user = next((r.get("content") or "" for r in records
+                                   if r.get("role") == "user" and (r.get("content") or "").strip()), "")
+                derived = fs.preview_fields(first_user)
+                with conn:
+                    conn.execute(
+                        "INSERT INTO conversations (id, title, file, created_at, updated_at, message_count, tags,"
+                        " preview, display_title) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            conv_id,
+                            meta.get("title") or item.get("title") or conv_id,
+                            item.get("file") or f"{fs.CONV_PREFIX}_{conv_id}{fs.CONV_EXT}",
+                            meta.get("created_at") or item.get("created_at") or now_iso(),
+                            meta.get("updated_at") or item.get("updated_at") or now_iso(),
+                            len(records),
+                            json.dumps(list(meta.get("tags") or item.get("tags") or [])),
+                            derived.get("preview", ""),
+                            meta.get("display_title") or derived.get("display_title"),
+                        ),
+                    )
+                    conn.executemany(
+                        "INSERT INTO messages (conv_id, seq, ts, role, content, model, tokens, partial)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                conv_id, seq, r.get("ts", ""), r.get("role", "user"), r.get("content", ""),
+                                r.get("model"), json.dumps(r["tokens"]) if r.get("tokens") else None,
+                                int(bool(r.get("partial"))),
+                            )
+                            for seq, r in enumerate(records, 1)
+                        ],
+                    )
+            stats["migrated"] += 1
+            stats["messages"] += len(records)
+        except Exception as e:
+            stats["failed"] += 1
+            _log(f"Migration échouée pour {conv_id}: {e}")
+    print(
+        f"[Migration SQLite] {stats['migrated']} conversations importées "
+        f"({stats['messages']} messages), {stats['skipped']} déjà présentes, "
+        f"{stats['failed']} en échec."
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    migrate_from_fs()
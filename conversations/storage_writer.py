@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+storage_writer.py
+Thread d'écriture dédié au stockage des conversations :
+- File bornée (contre-pression si le disque ne suit pas)
+- Un seul thread consommateur : ordre FIFO global, donc ordre garanti
+  par conversation (append, méta, index, registre)
+- Chaque soumission renvoie un concurrent.futures.Future (résultat/erreur)
+- `flush()` : barrière, rend la main quand tout ce qui précède est écrit
+- `wait_for(key)` : lecture cohérente avec ses propres écritures (par clé)
+
+Conformité "Document d'apprentissage pour chartgpt.txt":
+- §2 Journalisation & Stabilité (erreurs journalisées, jamais perdues en silence)
+- §12 Constantes & Config (taille de file dans config.py)
+- §14 Threading & Opérations Bloquantes (aucune écriture disque sur le thread UI)
+"""
+
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from config import STORAGE_WRITER_QUEUE_SIZE as _CONF_QUEUE_SIZE
+except Exception:
+    _CONF_QUEUE_SIZE = 1024
+
+try:
+    from config import DEBUG as _CONF_DEBUG
+except Exception:
+    _CONF_DEBUG = True
+
+
+def _log(msg: str) -> None:
+    if _CONF_DEBUG:
+        print(f"[storage_writer] {msg}")
+
+
+_STOP = object()
+
+
+class StorageWriter:
+    """
+    File d'écritures exécutées dans l'ordre par un thread daemon unique.
+    `key` (id de conversation, "registry"...) sert au suivi des écritures
+    en attente ; il n'influe pas sur l'ordre (FIFO global).
+    """
+
+    def __init__(self, maxsize: int = _CONF_QUEUE_SIZE, name: str = "storage-writer"):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(0, int(maxsize)))
+        self._name = name
+        self._pending: Dict[Optional[str], List[Future]] = {}
+        self._guard = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args, key: Optional[str] = None, **kwargs) -> Future:
+        """
+        Met `fn(*args, **kwargs)` en file. Bloque seulement si la file est
+        pleine (contre-pression). Depuis le thread d'écriture lui-même,
+        exécute immédiatement (pas d'interblocage).
+        """
+        fut: Future = Future()
+        if threading.current_thread() is self._thread:
+            self._execute(fn, args, kwargs, fut)
+            return fut
+        with self._guard:
+            if self._closed:
+                raise RuntimeError("StorageWriter fermé")
+            self._ensure_thread()
+            self._pending.setdefault(key, []).append(fut)
+        fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+        self._queue.put((fn, args, kwargs, fut))
+        return fut
+
+    def call(self, fn: Callable[..., Any], *args, key: Optional[str] = None, **kwargs) -> Any:
+        """Soumet et attend le résultat (relance l'exception éventuelle)."""
+        return self.submit(fn, *args, key=key, **kwargs).result()
+
+    def wait_for(self, key: Optional[str], timeout: Optional[float] = None) -> None:
+        """Attend les écritures en attente pour `key` (read-your-writes)."""
+        if threading.current_thread() is self._thread:
+            return
+        with self._guard:
+            futures = list(self._pending.get(key, ()))
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Barrière : True quand toutes les écritures soumises avant sont faites."""
+        if threading.current_thread() is self._thread:
+            return True
+        with self._guard:
+            if self._thread is None or not self._thread.is_alive():
+                return True
+        fut = self.submit(lambda: None)
+        wait([fut], timeout=timeout)
+        return fut.done()
+
+    def pending_count(self) -> int:
+        with self._guard:
+            return sum(len(v) for v in self._pending.values())
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Vide la file puis arrête le thread (sortie du process)."""
+        with self._guard:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    def _forget(self, key: Optional[str], fut: Future) -> None:
+        with self._guard:
+            lst = self._pending.get(key)
+            if lst is not None:
+                try:
+                    lst.remove(fut)
+                except ValueError:
+                    pass
+                if not lst:
+                    del self._pending[key]
+
+    def _execute(self, fn, args, kwargs, fut: Future) -> None:
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            _log(f"Écriture en échec ({getattr(fn, '__name__', fn)}) : {e}")
+            fut.set_exception(e)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                fn, args, kwargs, fut = job
+                self._execute(fn, args, kwargs, fut)
+            finally:
+                self._queue.task_done()
+
+
+# =============================================================================
+# Instance partagée (utilisée par conversation_manager)
+# =============================================================================
+_writer: Optional[StorageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> StorageWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = StorageWriter()
+        return _writer
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Barrière sur l'instance partagée."""
+    with _writer_lock:
+        w = _writer
+    return True if w is None else w.flush(timeout)
+
+
+def _shutdown() -> None:
+    with _writer_lock:
+        w = _writer
+    if w is not None:
+        w.close(timeout=10.0)
+
+
+atexit.register(_shutdown)
@@ -6,7 +6,7 @@ from kivy.uix.label import Label
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 
-from config import DEV_MODE, DEV_SHORTCUTS
+from config import DEV_MODE, DEV_SHORTCUTS, OLLAMA_DETERMINISTIC_OPTIONS
 from conversations import conversation_manager as conv_mgr
 
 
@@ -27,10 +27,12 @@ class ChatEventsMixin:
                 if shortcut_key.lower() == "f5":
                     self._confirm_delete_all_conversations()
                     return True
-                # Cas normal : injection d'un message prédéfini
+                # Cas normal : injection d'un message prédéfini, réponse
+                # reproductible servie par le cache si activé
                 if message:
                     self.input.text = message
-                    Clock.schedule_once(lambda dt: self.lancer_generation(message))
+                    Clock.schedule_once(lambda dt: self.lancer_generation(
+                        message, options=OLLAMA_DETERMINISTIC_OPTIONS))
                 return True
         return False
 
@@ -39,6 +41,9 @@ class ChatEventsMixin:
 
     def stop_action(self, instance):
         self.stop_stream = True
+        # Coupe la génération en cours (connexion fermée, réponse partielle enregistrée)
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
         self.on_stream_end()
 
     # ===============================
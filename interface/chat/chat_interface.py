@@ -10,6 +10,9 @@ from kivy.core.window import Window
 from kivy.clock import Clock
 
 import os
+import threading
+from concurrent.futures import Future
+from functools import partial
 
 from config import (
     BACKGROUND_COLOR, TEXTINPUT_BACKGROUND_COLOR, TEXT_COLOR, HINT_TEXT_COLOR,
@@ -20,18 +23,20 @@ from config import (
     # >>> bouton plus et contexte docs
     ICON_PLUS_PATH,
     REFERENCE_DOCS_HEADER, REFERENCE_DOCS_FOOTER,
+    CHAT_LOAD_MAX_MESSAGES,
 )
 
 from ..custom_widgets import HoverButton, ImageHoverButton, Bubble, SidebarConversations
-from ..core.events import EventManager
 from .chat_events import ChatEventsMixin
 from .chat_stream import ChatStreamMixin
 from .chat_utils import ChatUtilsMixin
 
 from conversations.conversation_manager import (
-    create_new_conversation, append_message, read_conversation,
+    create_new_conversation_async, append_message, read_conversation_messages,
     add_reference_doc, get_reference_docs
 )
+from conversations.doc_retrieval import get_retriever
+from conversations.doc_embeddings import prepare_doc
 
 Window.clearcolor = BACKGROUND_COLOR
 
@@ -42,7 +47,7 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
 
         self.conversation_filepath = None
         self._reference_docs_paths = []
-        self._reference_docs_text = ""  # concat des contenus courants
+        self._reference_retriever = None  # (Future de l')index BM25 des docs de la conv courante
 
         background = Image(
             source="Assets/Qui je suis .png",
@@ -173,17 +178,33 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
         self.chat_layout.bind(height=self.mettre_a_jour_fleche)
 
         self.last_prompt = ""
-        self.event_manager = EventManager(self)
         self.stop_stream = False
+        self.cancel_token = None
         self.stop_button = None
 
         self.setup_event_bindings()
 
-    # ---------- Gestion du bouton plus : ouverture du sélecteur natif Windows ----------
-    def on_plus_button_click(self, instance):
-        # S'assure qu'une conversation existe pour lier le doc
+    # ---------- Conversation courante créée à la demande ----------
+    def _ensure_conversation(self, then):
+        """
+        Appelle then() une fois qu'une conversation courante existe ; sinon la
+        crée sur le thread d'écriture et continue dans un callback (thread UI).
+        """
+        if self.conversation_filepath is not None:
+            then()
+            return
+        future = create_new_conversation_async()
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda dt: self._on_conversation_created(f, then)))
+
+    def _on_conversation_created(self, future, then):
+        try:
+            path = future.result()
+        except Exception:
+            import traceback; traceback.print_exc()
+            return
         if self.conversation_filepath is None:
-            self.conversation_filepath = create_new_conversation()
+            self.conversation_filepath = path
+            # Rafraîchir la sidebar et sélectionner la nouvelle conversation
             if hasattr(self, "sidebar"):
                 try:
                     self.sidebar.build_list()
@@ -192,7 +213,14 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
                         self.sidebar._apply_selection(filename)
                 except Exception:
                     import traceback; traceback.print_exc()
+        then()
 
+    # ---------- Gestion du bouton plus : ouverture du sélecteur natif Windows ----------
+    def on_plus_button_click(self, instance):
+        # S'assure qu'une conversation existe pour lier le doc
+        self._ensure_conversation(self._choose_reference_doc)
+
+    def _choose_reference_doc(self):
         # Fenêtre de dialogue native Windows via Tkinter
         try:
             import tkinter as tk
@@ -216,7 +244,9 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
             if file_path:
                 try:
                     add_reference_doc(self.conversation_filepath, file_path)
-                    # Recharge la liste + contenu en mémoire
+                    # vecteurs calculés en tâche de fond (si recherche sémantique activée)
+                    threading.Thread(target=prepare_doc, args=(file_path,), daemon=True).start()
+                    # Recharge la liste et l'index (découpage mis en cache) hors thread UI
                     self._load_reference_docs_for_current_conversation()
                     # Feedback visuel minimal (bulle système)
                     self.display_message(f"Document lié : {os.path.basename(file_path)}", is_user=False)
@@ -232,36 +262,45 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
 
     # ---------- Utilitaires docs : (re)charge pour la conv courante ----------
     def _load_reference_docs_for_current_conversation(self):
+        """
+        Lecture, découpage et index BM25 des docs liés dans un thread :
+        _reference_retriever est le Future de l'index, attendu hors thread UI
+        par _build_prompt_with_docs ; la liste des docs est appliquée au retour.
+        """
         self._reference_docs_paths = []
-        self._reference_docs_text = ""
-        if not self.conversation_filepath:
-            return
-        try:
-            paths = get_reference_docs(self.conversation_filepath)
-            self._reference_docs_paths = paths or []
-            chunks = []
-            for p in self._reference_docs_paths:
-                try:
-                    # relit le fichier (comportement voulu à chaque ouverture)
-                    with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                        data = f.read()
-                        chunks.append(data)
-                except Exception:
-                    # si le fichier n'existe plus, on ignore silencieusement
-                    pass
-            if chunks:
-                self._reference_docs_text = "\n\n".join(chunks)
-            else:
-                self._reference_docs_text = ""
-        except Exception:
-            import traceback; traceback.print_exc()
+        self._reference_retriever = future = Future()
+        filepath = self.conversation_filepath
+
+        def _work():
+            paths, retriever = [], None
+            try:
+                paths = (get_reference_docs(filepath) if filepath else None) or []
+                if paths:
+                    # index réutilisé tant que les docs n'ont pas changé ;
+                    # les fichiers disparus sont ignorés silencieusement
+                    retriever = get_retriever(paths)
+            except Exception:
+                import traceback; traceback.print_exc()
+            future.set_result(retriever)
+            Clock.schedule_once(lambda dt: self._apply_reference_docs(future, paths))
+
+        threading.Thread(target=_work, name="reference-docs", daemon=True).start()
+
+    def _apply_reference_docs(self, future, paths):
+        if future is self._reference_retriever:  # sinon : conversation changée entre-temps
+            self._reference_docs_paths = paths
 
     # ---------- Construit le prompt utilisateur enrichi des docs attachés ----------
-    def _build_prompt_with_docs(self, user_input: str) -> str:
-        if self._reference_docs_text.strip():
+    def _build_prompt_with_docs(self, user_input: str, retriever=None) -> str:
+        # seuls les passages pertinents pour ce message (budget de tokens) ;
+        # appelé hors thread UI (embedding de la requête = appel HTTP)
+        if isinstance(retriever, Future):
+            retriever = retriever.result()  # index encore en préparation
+        passages = retriever.render(user_input) if retriever else ""
+        if passages.strip():
             return (
                 f"{REFERENCE_DOCS_HEADER}\n"
-                f"{self._reference_docs_text}\n"
+                f"{passages}\n"
                 f"{REFERENCE_DOCS_FOOTER}\n\n"
                 f"{user_input}"
             )
@@ -286,7 +325,9 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
 
     def load_conversation(self, filename):
         chemin = f"conversations/{filename}"
-        contenu = read_conversation(chemin)
+        # Seuls les derniers messages sont lus (seek via l'index d'offsets)
+        start = -CHAT_LOAD_MAX_MESSAGES if CHAT_LOAD_MAX_MESSAGES else 0
+        messages = read_conversation_messages(chemin, start)
 
         self.clear_chat()
         self.conversation_filepath = chemin
@@ -294,53 +335,23 @@ class ChatInterface(FloatLayout, ChatEventsMixin, ChatStreamMixin, ChatUtilsMixi
         # recharge les docs de référence liés à cette conversation
         self._load_reference_docs_for_current_conversation()
 
-        current_role = None
-        current_lines = []
-
-        for ligne in contenu.splitlines():
-            if ligne.startswith("[") and "]" in ligne:
-                if current_role and current_lines:
-                    is_user = current_role.lower() == "user"
-                    self.display_message("\n".join(current_lines).strip(), is_user)
-                    current_lines.clear()
-                try:
-                    _, reste = ligne.split("]", 1)
-                    role, message = reste.strip().split(":", 1)
-                    current_role = role.strip()
-                    current_lines.append(message.strip())
-                except ValueError:
-                    if current_role:
-                        current_lines.append(ligne.strip())
-            else:
-                if current_role:
-                    current_lines.append(ligne)
-
-        if current_role and current_lines:
-            is_user = current_role.lower() == "user"
-            self.display_message("\n".join(current_lines).strip(), is_user)
+        for rec in messages:
+            self.display_message((rec.get("content") or "").strip(), rec.get("role") == "user")
 
     def send_message(self, instance):
         user_input = self.input.text.strip()
         if user_input:
             self.input.text = ""
-            if self.conversation_filepath is None:
-                self.conversation_filepath = create_new_conversation()
-                # Rafraîchir la sidebar et sélectionner la nouvelle conversation
-                if hasattr(self, "sidebar"):
-                    try:
-                        self.sidebar.build_list()
-                        filename = os.path.basename(self.conversation_filepath)
-                        if hasattr(self.sidebar, "_apply_selection"):
-                            self.sidebar._apply_selection(filename)
-                    except Exception:
-                        import traceback; traceback.print_exc()
-
-            # On enregistre le message utilisateur "pur" dans le .txt
-            append_message(self.conversation_filepath, "user", user_input)
-
-            # On envoie à l'IA une version enrichie avec les docs liés
-            enriched = self._build_prompt_with_docs(user_input)
-            Clock.schedule_once(lambda dt: self.lancer_generation(enriched))
+            self._ensure_conversation(partial(self._send_user_message, user_input))
+
+    def _send_user_message(self, user_input):
+        # On enregistre le message utilisateur "pur" dans le .txt
+        append_message(self.conversation_filepath, "user", user_input)
+
+        # On envoie à l'IA une version enrichie avec les docs liés ; la sélection
+        # des passages se fait dans la génération, pas sur le thread UI
+        build_prompt = partial(self._build_prompt_with_docs, retriever=self._reference_retriever)
+        Clock.schedule_once(lambda dt: self.lancer_generation(user_input, build_prompt))
 
     def display_message(self, text, is_user):
         bubble = Bubble(text=text, is_user=is_user)
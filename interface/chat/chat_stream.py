@@ -1,12 +1,13 @@
 from kivy.clock import Clock
 from kivy.uix.image import Image
 from ..custom_widgets import ImageHoverButton
-from ollama_api import query_ollama_stream
+from ollama_api import CancelToken, stream_chat, get_bridge
 from historique import enregistrer_echange
-import threading
+import asyncio
 import os
 
-from conversations.conversation_manager import append_message, read_conversation
+from conversations.conversation_manager import append_message, read_conversation_messages, conversation_exists
+from config import CHAT_CONTEXT_MAX_MESSAGES
 
 # Charger le message système depuis le fichier partagé avec le mode console
 PROMPT_FILE = os.path.join(
@@ -22,7 +23,12 @@ with open(PROMPT_FILE, "r", encoding="utf-8") as f:
     SYSTEM_MESSAGE = f.read().strip()
 
 class ChatStreamMixin:
-    def lancer_generation(self, prompt):
+    def lancer_generation(self, prompt, build_prompt=None, options=None):
+        """
+        Affiche `prompt` et lance la génération. build_prompt(prompt) -> prompt
+        envoyé à Ollama (docs de référence), exécuté hors thread UI.
+        options : options Ollama (déterministes -> réponse servie par le cache).
+        """
         try:
             self.display_message(prompt, is_user=True)
             self.last_prompt = prompt
@@ -38,11 +44,12 @@ class ChatStreamMixin:
             self.stop_stream = False
             Clock.schedule_once(lambda dt: self.show_stop_button())
 
-            threading.Thread(
-                target=self.start_streaming_response,
-                args=(prompt,),
-                daemon=True
-            ).start()
+            # Génération sur la boucle asyncio partagée (pas de thread par requête) ;
+            # Stop -> cancel_token.cancel() coupe la connexion à Ollama
+            self.cancel_token = CancelToken()
+            self.generation_future = get_bridge().submit(
+                self.start_streaming_response(prompt, self.cancel_token, build_prompt, options)
+            )
         except Exception as e:
             print(f"[ERREUR lancer_generation] {e}", flush=True)
 
@@ -50,52 +57,51 @@ class ChatStreamMixin:
         """
         Construit la liste 'messages' pour Ollama :
         - message system en premier
-        - tout l'historique existant (user/assistant)
+        - l'historique existant (user/assistant), borné aux CHAT_CONTEXT_MAX_MESSAGES derniers
         - nouveau message utilisateur
         """
         messages = [{"role": "system", "content": SYSTEM_MESSAGE}]
 
-        if self.conversation_filepath and os.path.exists(self.conversation_filepath):
-            contenu = read_conversation(self.conversation_filepath)
-            lignes = contenu.strip().split("\n")
-            for ligne in lignes:
-                if ligne.startswith("[") and "]" in ligne:
-                    try:
-                        _, reste = ligne.split("]", 1)
-                        role, message = reste.strip().split(":", 1)
-                        role = role.strip().lower()
-                        message = message.strip()
-                        if role in ("user", "assistant"):
-                            messages.append({"role": role, "content": message})
-                    except ValueError:
-                        continue
+        if self.conversation_filepath and conversation_exists(self.conversation_filepath):
+            start = -CHAT_CONTEXT_MAX_MESSAGES if CHAT_CONTEXT_MAX_MESSAGES else 0
+            for rec in read_conversation_messages(self.conversation_filepath, start):
+                if rec.get("role") in ("user", "assistant"):
+                    messages.append({"role": rec["role"], "content": rec.get("content", "")})
 
         # Ajouter le nouveau message utilisateur
         messages.append({"role": "user", "content": new_user_message})
 
         return messages
 
-    def start_streaming_response(self, prompt):
+    async def start_streaming_response(self, prompt, cancel_token=None, build_prompt=None, options=None):
         self.partial_response = ""
 
-        # Construire l'historique complet
-        messages = self._build_message_history(prompt)
+        # Passages des docs (recherche, embedding de la requête) hors boucle
+        if build_prompt is not None:
+            prompt = await asyncio.to_thread(build_prompt, prompt)
+
+        # Construire l'historique complet (lecture disque hors boucle)
+        messages = await asyncio.to_thread(self._build_message_history, prompt)
 
-        def on_token(token):
-            if self.stop_stream:
-                return
+        Clock.schedule_once(lambda dt: self.prepare_stream_bubble())
+        stats = {}
+        async for token in stream_chat(messages, stats, cancel_token, options):
             self.partial_response += token
             Clock.schedule_once(lambda dt: self.update_bubble_text(self.partial_response))
 
-        Clock.schedule_once(lambda dt: self.prepare_stream_bubble())
-        query_ollama_stream(messages, on_token)
+        partial = cancel_token is not None and cancel_token.cancelled
+        await asyncio.to_thread(self._save_exchange, prompt, self.partial_response, stats, partial)
 
-        enregistrer_echange(prompt, self.partial_response)
+        Clock.schedule_once(lambda dt: self.on_stream_end_final())
 
-        if self.conversation_filepath:
-            append_message(self.conversation_filepath, "assistant", self.partial_response)
+    def _save_exchange(self, prompt, response, stats, partial=False):
+        enregistrer_echange(prompt, response)
 
-        Clock.schedule_once(lambda dt: self.on_stream_end_final())
+        if self.conversation_filepath:
+            append_message(
+                self.conversation_filepath, "assistant", response,
+                model=stats.get("model"), tokens=stats.get("tokens"), partial=partial,
+            )
 
     def prepare_stream_bubble(self):
         self.current_bubble = self.display_message("", is_user=False)
@@ -8,15 +8,18 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.popup import Popup
 from kivy.uix.button import Button
 from kivy.clock import Clock
+from kivy.utils import escape_markup
 import os
+import threading
 
-from config import FONT_SIZE, ICON_PLUS_PATH, SIDEBAR_ICON_SIZE
+from config import FONT_SIZE, ICON_PLUS_PATH, SIDEBAR_ICON_SIZE, SIDEBAR_PAGE_SIZE
 from conversations.conversation_manager import (
-    list_conversations,
-    read_conversation,
-    rename_conversation_file,
-    delete_conversation_file,
-    create_new_conversation   # ✅ ajout pour créer une nouvelle conversation
+    list_conversations_page,
+    rename_conversation_file_async,
+    delete_conversation_file_async,
+    create_new_conversation_async,   # ✅ création en file, sélection au retour
+    conversation_exists,
+    search,
 )
 from ..hover_sidebar_button import HoverSidebarButton
 from ..image_hover_button import ImageHoverButton
@@ -37,6 +40,14 @@ class SidebarConversations(BoxLayout):
         self._rows_by_filename: dict[str, HoverRow] = {}
         self._current_selected: HoverRow | None = None
 
+        # Recherche plein texte (saisie temporisée)
+        self._search_query = ""
+        self._search_event = None
+
+        # Pagination de la liste (curseur de la page suivante, bouton "Plus…")
+        self._next_cursor = None
+        self._more_btn = None
+
         with self.canvas.before:
             Color(0.1, 0.1, 0.1, 1)
             self.bg_rect = RoundedRectangle(radius=[0], pos=self.pos, size=self.size)
@@ -75,13 +86,55 @@ class SidebarConversations(BoxLayout):
         header.add_widget(plus_btn)
         self.add_widget(header)
 
+        # ---------- Recherche ----------
+        search_input = TextInput(
+            text=self._search_query,
+            hint_text="Rechercher…",
+            multiline=False,
+            size_hint=(1, None),
+            height=dp(30),
+            font_size=12,
+        )
+        search_input.bind(text=self.on_search_text)
+        self.add_widget(search_input)
+
         # ---------- Liste défilante des conversations ----------
         scroll = ScrollView(size_hint=(1, 1))
         layout = GridLayout(cols=1, spacing=4, size_hint_y=None, padding=(0, 5))
         layout.bind(minimum_height=layout.setter('height'))
+        self._list_layout = layout
+        self._refresh_list_content()
+
+        scroll.add_widget(layout)
+        self.add_widget(scroll)
+
+    def _fill_conversations(self):
+        layout = self._list_layout
+        layout.clear_widgets()
+        self._rows_by_filename.clear()
+        self._current_selected = None
+        self._next_cursor = None
+        self._more_btn = None
+        self._append_page()
+
+    def _append_page(self, *_):
+        """Ajoute la page suivante de conversations (la première si pas de curseur)."""
+        layout = self._list_layout
+        if self._more_btn is not None:
+            layout.remove_widget(self._more_btn)
+            self._more_btn = None
+        try:
+            page = list_conversations_page(cursor=self._next_cursor, limit=SIDEBAR_PAGE_SIZE)
+        except Exception:
+            import traceback; traceback.print_exc()
+            page = {"items": [], "next_cursor": None}
+        self._next_cursor = page["next_cursor"]
 
-        for filename in list_conversations():
-            label = self.extract_preview(filename)
+        for item in page["items"]:
+            filename = item.get("file")
+            if not filename or filename in self._rows_by_filename:
+                continue
+            label = self.row_label(item)
             btn = HoverSidebarButton(
                 text=label,
                 size_hint=(1, 1),
@@ -108,29 +161,80 @@ class SidebarConversations(BoxLayout):
             self._rows_by_filename[filename] = row
             layout.add_widget(row)
 
-        scroll.add_widget(layout)
-        self.add_widget(scroll)
+        if self._next_cursor:
+            self._more_btn = Button(text="Plus…", font_size=12, size_hint=(1, None), height=32)
+            self._more_btn.bind(on_release=self._append_page)
+            layout.add_widget(self._more_btn)
+
+    # ---------- Recherche ----------
+    def on_search_text(self, _instance, text):
+        """Relance la recherche 250 ms après la dernière frappe."""
+        self._search_query = text
+        if self._search_event is not None:
+            self._search_event.cancel()
+        self._search_event = Clock.schedule_once(lambda dt: self._refresh_list_content(), 0.25)
+
+    def _refresh_list_content(self):
+        if self._search_query.strip():
+            self._fill_search_results()
+        else:
+            self._fill_conversations()
+
+    def _fill_search_results(self):
+        layout = self._list_layout
+        layout.clear_widgets()
+        self._rows_by_filename.clear()
+        self._current_selected = None
+        layout.add_widget(Label(text="Recherche…", font_size=12, size_hint=(1, None), height=32))
+        query = self._search_query
+        threading.Thread(target=self._run_search, args=(query,), name="sidebar-search", daemon=True).start()
+
+    def _run_search(self, query):
+        """Thread de recherche : index (journal) et requête hors thread UI."""
+        try:
+            results = search(query, limit=50)
+        except Exception:
+            import traceback; traceback.print_exc()
+            results = []
+        Clock.schedule_once(lambda dt: self._show_search_results(query, results))
+
+    def _show_search_results(self, query, results):
+        if query != self._search_query:
+            return  # requête dépassée : une recherche plus récente est en cours
+        layout = self._list_layout
+        layout.clear_widgets()
+        if not results:
+            layout.add_widget(Label(text="Aucun résultat", font_size=12, size_hint=(1, None), height=32))
+            return
+
+        for res in results:
+            filename = res.get("file")
+            if not filename:
+                continue
+            btn = HoverSidebarButton(
+                text=f"[b]{escape_markup(res.get('title', ''))}[/b]\n{escape_markup(res.get('snippet', ''))}",
+                markup=True,
+                size_hint=(1, None),
+                height=48,
+                font_size=11,
+                halign="left",
+                valign="middle",
+                text_size=(dp(180), None),
+                shorten=True,
+                max_lines=2,
+                color=(1, 1, 1, 1),
+            )
+            btn.bind(on_press=lambda instance, name=filename: self.select_conversation(name))
+            layout.add_widget(btn)
 
     def update_bg(self, *args):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
 
-    def extract_preview(self, filename):
-        try:
-            contenu = read_conversation(f"{filename}")
-            lignes = contenu.strip().split("\n")
-            for ligne in lignes:
-                if "]" in ligne and "USER:" in ligne.upper():
-                    try:
-                        _, reste = ligne.split("]", 1)
-                        role, message = reste.strip().split(":", 1)
-                        if role.strip().upper() == "USER":
-                            return message.strip().capitalize()
-                    except:
-                        continue
-        except Exception:
-            pass
-        return filename
+    @staticmethod
+    def row_label(item):
+        """Libellé d'une ligne, tiré de l'index seul (aucune lecture de conversation)."""
+        return item.get("display_title") or item.get("preview") or item.get("file", "")
 
     # ---------- Sélection exclusive ----------
     def _apply_selection(self, filename: str):
@@ -150,9 +254,17 @@ class SidebarConversations(BoxLayout):
 
     # ---------- Bouton PLUS ----------
     def on_plus_click(self, *_):
-        """Crée une nouvelle conversation et la sélectionne."""
-        new_filepath = create_new_conversation()
-        if new_filepath and os.path.exists(new_filepath):
+        """Crée une nouvelle conversation (thread d'écriture) et la sélectionne au retour."""
+        future = create_new_conversation_async()
+        future.add_done_callback(lambda f: Clock.schedule_once(lambda dt: self._on_conversation_created(f)))
+
+    def _on_conversation_created(self, future):
+        try:
+            new_filepath = future.result()
+        except Exception:
+            import traceback; traceback.print_exc()
+            new_filepath = None
+        if new_filepath and conversation_exists(new_filepath):
             filename = os.path.basename(new_filepath)
             self.build_list()
             self._apply_selection(filename)
@@ -185,9 +297,7 @@ class SidebarConversations(BoxLayout):
         popup = Popup(title="Renommer la conversation", content=content, size_hint=(0.5, 0.3))
         popup.bind(on_open=focus_and_select)
 
-        def valider(_):
-            new_name = input_name.text.strip() + ".txt"
-            success, msg = rename_conversation_file(filename, new_name)
+        def termine(success, msg, new_name):
             if success:
                 popup.dismiss()
                 self.build_list()
@@ -195,6 +305,13 @@ class SidebarConversations(BoxLayout):
             else:
                 popup.title = f"Erreur : {msg}"
 
+        def valider(_):
+            new_name = input_name.text.strip() + ".txt"
+            future = rename_conversation_file_async(filename, new_name)
+            future.add_done_callback(
+                lambda f: Clock.schedule_once(lambda dt: termine(*f.result(), new_name))
+            )
+
         btn_ok.bind(on_release=valider)
         btn_cancel.bind(on_release=lambda _: popup.dismiss())
         popup.open()
@@ -212,8 +329,7 @@ class SidebarConversations(BoxLayout):
 
         popup = Popup(title="Confirmation", content=content, size_hint=(0.5, 0.3))
 
-        def confirmer(_):
-            success, msg = delete_conversation_file(filename)
+        def termine(success, msg):
             if success:
                 popup.dismiss()
                 if self._current_selected and self._current_selected.filename == filename:
@@ -222,6 +338,10 @@ class SidebarConversations(BoxLayout):
             else:
                 popup.title = f"Erreur : {msg}"
 
+        def confirmer(_):
+            future = delete_conversation_file_async(filename)
+            future.add_done_callback(lambda f: Clock.schedule_once(lambda dt: termine(*f.result())))
+
         btn_yes.bind(on_release=confirmer)
         btn_no.bind(on_release=lambda _: popup.dismiss())
         popup.open()
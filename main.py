@@ -1,6 +1,12 @@
 import os
 import sys
 
+# Python 3.11+ (client Ollama asyncio : asyncio.timeout) ; vérifié avant la
+# redirection de la sortie pour que le message reste visible
+if sys.version_info < (3, 11):
+    sys.exit("ServOMorph IA requiert Python 3.11 ou plus récent "
+             f"(version utilisée : {sys.version.split()[0]}).")
+
 os.environ["KIVY_NO_FILELOG"] = "1"
 os.environ["KIVY_NO_CONSOLELOG"] = "1"
 
@@ -17,12 +23,23 @@ Config.set('graphics', 'left', str(WINDOW_LEFT))
 Config.set('graphics', 'top', str(WINDOW_TOP))
 
 from kivy.app import App
+from kivy.clock import Clock
 from interface import ChatInterface
+from conversations.conversation_manager import start_background_repair
 
 class ServOMorph_IAApp(App):
     def build(self):
         return ChatInterface()
 
+    def on_start(self):
+        # Vérification incrémentale des conversations après l'affichage de l'UI
+        start_background_repair(on_done=self._on_repair_done)
+
+    def _on_repair_done(self, report):
+        # Appelé depuis le thread de réparation : rafraîchir la sidebar côté UI
+        if report.get("removed") or report.get("orphans") or report.get("previews"):
+            Clock.schedule_once(lambda dt: self.root.sidebar.build_list())
+
 if __name__ == '__main__':
     print("Lancement de l'application", flush=True)
     ServOMorph_IAApp().run()
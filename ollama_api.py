@@ -1,109 +1,702 @@
+import asyncio
 import requests
 import json
 import os
-from datetime import datetime
-from config import OLLAMA_URL, OLLAMA_MODEL, DEBUG_API, API_TRACE_FILE
-
-# === Vidage du fichier à chaque lancement ===
-if DEBUG_API:
-    try:
-        with open(API_TRACE_FILE, "w", encoding="utf-8") as f:
-            f.write("")  # vide le fichier
-    except Exception:
-        pass
-
-def _ts():
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-def _trace(line: str):
-    if not DEBUG_API:
-        return
-    try:
-        with open(API_TRACE_FILE, "a", encoding="utf-8") as f:
-            f.write(f"{_ts()} {line}\n")
-    except Exception:
-        pass
-
-def _trace_json(obj, prefix=""):
-    if not DEBUG_API:
-        return
-    try:
-        text = json.dumps(obj, ensure_ascii=False, indent=2)
-        for l in text.splitlines():
-            _trace(f"{prefix}{l}")
-    except Exception as e:
-        _trace(f"[TRACE_JSON_ERROR] {e}")
-
-def query_ollama(prompt_or_messages):
+import socket
+import threading
+from contextlib import aclosing
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from config import (
+    OLLAMA_URL, OLLAMA_MODEL,
+    OLLAMA_POOL_SIZE, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_MAX_RETRIES,
+)
+from api_trace import start_request
+from response_cache import from_config as _cache_from_config
+
+# réponse renvoyée en mode replay quand la requête n'est pas dans le cache
+CACHE_MISS_REPLY = "[Réponse absente du cache]"
+
+# Ollama occupé / proxy : requête non traitée, renvoyée (clients sync et asyncio)
+_RETRY_STATUSES = (502, 503, 504)
+_RETRY_BACKOFF = 0.2
+
+def _as_messages(prompt_or_messages):
     if isinstance(prompt_or_messages, str):
-        messages = [{"role": "user", "content": prompt_or_messages}]
-    else:
-        messages = prompt_or_messages
-
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": messages,
-        "stream": False
-    }
-
-    _trace(f"[OUTGOING] POST {OLLAMA_URL}")
-    _trace_json(payload, prefix="[PAYLOAD] ")
-
-    try:
-        resp = requests.post(OLLAMA_URL, json=payload)
-        _trace(f"[HTTP] status={resp.status_code}")
+        return [{"role": "user", "content": prompt_or_messages}]
+    return prompt_or_messages
+
+class CancelToken:
+    """
+    Annulation d'une génération en cours, depuis n'importe quel thread (ex. bouton Stop) :
+    cancel() ferme aussitôt la connexion de la requête liée, Ollama cesse de générer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._closer = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            closer, self._closer = self._closer, None
+        if closer is not None:
+            closer()
+
+    def bind(self, closer):
+        """Fermeture de la requête en cours ; appelée tout de suite si déjà annulé."""
+        with self._lock:
+            if not self._cancelled:
+                self._closer = closer
+                return
+        closer()
+
+    def unbind(self):
+        with self._lock:
+            self._closer = None
+
+def _cache_lookup(cache, tr, model, messages, options, force):
+    """
+    (clé, réponse) : réponse du cache (ou CACHE_MISS_REPLY en mode replay),
+    None s'il faut interroger Ollama ; clé None si la requête ne passe pas par le cache.
+    """
+    if cache is None:
+        return None, None
+    key = cache.key_for(model, messages, options, force)
+    cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        tr.line(f"[CACHE_HIT] {key[:16]}")
+        return key, cached
+    if cache.replay_only:
+        tr.error(f"[CACHE_MISS] mode replay, requête non envoyée ({model})")
+        return key, CACHE_MISS_REPLY
+    return key, None
+
+def _is_cancelled(cancel_token):
+    return cancel_token is not None and cancel_token.cancelled
+
+def _abort_response(resp):
+    # shutdown débloque le thread qui attend dans recv() (close seul ne suffit pas)
+    sock = getattr(getattr(resp.raw, "_connection", None), "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    resp.close()
+
+# jeton d'annulation de la requête en cours d'envoi, par thread (voir _CancellableAdapter)
+_sending = threading.local()
+
+def _shutdown_conn(conn):
+    sock = conn.sock
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class _CancellableHTTPConnection(HTTPConnection):
+    """Connexion liée au jeton du thread émetteur : cancel() coupe l'attente des en-têtes."""
+
+    def request(self, *args, **kwargs):
+        token = getattr(_sending, "token", None)
+        if token is not None:
+            token.bind(lambda: _shutdown_conn(self))
+        super().request(*args, **kwargs)
+        if _is_cancelled(token):  # annulé pendant la connexion : socket pas encore créé
+            _shutdown_conn(self)
+
+class _CancellableHTTPSConnection(_CancellableHTTPConnection, HTTPSConnection):
+    pass
+
+class _CancellableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CancellableHTTPConnection
+
+class _CancellableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CancellableHTTPSConnection
+
+class _CancellableAdapter(HTTPAdapter):
+    """
+    HTTPAdapter dont les connexions se lient au CancelToken du thread (_sending.token) :
+    le flux est annulable avant la réception des en-têtes (modèle en chargement).
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CancellableHTTPConnectionPool,
+            "https": _CancellableHTTPSConnectionPool,
+        }
+
+class OllamaClient:
+    """
+    Client HTTP Ollama à session persistante (keep-alive) :
+    - pool de connexions réutilisées (pool_size)
+    - timeouts (connexion, lecture entre deux morceaux reçus)
+    - nouvelles tentatives seulement quand la requête n'a pas été traitée :
+      échec de connexion, ou 502/503/504 (Ollama occupé / proxy), POST compris ;
+      jamais après un timeout de lecture (génération peut-être en cours)
+    Endpoint et modèle propres à chaque client.
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=OLLAMA_MODEL, pool_size=OLLAMA_POOL_SIZE,
+                 connect_timeout=OLLAMA_CONNECT_TIMEOUT, read_timeout=OLLAMA_READ_TIMEOUT,
+                 max_retries=OLLAMA_MAX_RETRIES, cache=None):
+        self.url = url
+        self.model = model
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=max_retries, connect=max_retries, read=0, status=max_retries,
+            status_forcelist=_RETRY_STATUSES, backoff_factor=_RETRY_BACKOFF,
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "POST"}), raise_on_status=False,
+        )
+        adapter = _CancellableAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def embed(self, texts, model, url, read_timeout=None):
+        """
+        Vecteurs d'embeddings (POST {url} {"model", "input"}) sur la session du
+        client : mêmes connexions du pool, mêmes nouvelles tentatives.
+        """
+        resp = self.session.post(url, json={"model": model, "input": list(texts)},
+                                 timeout=(self.timeout[0], read_timeout or self.timeout[1]))
         resp.raise_for_status()
-        data = resp.json()
-        _trace_json(data, prefix="[RAW_RESPONSE] ")
+        return resp.json().get("embeddings") or []
 
-        content = data.get("message", {}).get("content", "")
-        _trace(f"[ASSISTANT_COMPLETE] {content}")
-        return content or "[Pas de réponse]"
-    except Exception as e:
-        _trace(f"[ERROR] {e}")
-        return "[Erreur de connexion à Ollama]"
+    def _post(self, payload, stream=False, cancel_token=None):
+        """cancel_token : cancel() ferme la connexion dès l'envoi, en-têtes reçus ou non."""
+        _sending.token = cancel_token
+        try:
+            return self.session.post(self.url, json=payload, stream=stream, timeout=self.timeout)
+        finally:
+            _sending.token = None
 
-def query_ollama_stream(prompt_or_messages, on_token_callback):
-    if isinstance(prompt_or_messages, str):
-        messages = [{"role": "user", "content": prompt_or_messages}]
-    else:
-        messages = prompt_or_messages
-
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": messages,
-        "stream": True
-    }
-
-    _trace(f"[OUTGOING] POST {OLLAMA_URL} (stream=True)")
-    _trace_json(payload, prefix="[PAYLOAD] ")
-
-    collected = []
-    try:
-        with requests.post(OLLAMA_URL, json=payload, stream=True) as resp:
-            _trace(f"[HTTP] status={resp.status_code} (stream)")
+    def chat(self, prompt_or_messages, options=None, force_cache=None):
+        """
+        Réponse complète. options : options Ollama (ex. {"temperature": 0}) ;
+        force_cache : passer par le cache même si la requête est échantillonnée.
+        """
+        messages = _as_messages(prompt_or_messages)
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        }
+        if options:
+            payload["options"] = options
+
+        tr = start_request()
+        key, cached = _cache_lookup(self.cache, tr, self.model, messages, options, force_cache)
+        if cached is not None:
+            return cached
+        tr.line(f"[OUTGOING] POST {self.url}")
+        tr.json("[PAYLOAD]", payload)
+
+        try:
+            resp = self._post(payload)
+            tr.line(f"[HTTP] status={resp.status_code}")
             resp.raise_for_status()
-            for line in resp.iter_lines():
-                if not line:
-                    continue
-                try:
-                    data = line.decode("utf-8").strip()
-                    if data.startswith("data: "):
-                        data = data[6:]
-                    parsed = json.loads(data)
-                except Exception as parse_err:
-                    _trace(f"[STREAM_PARSE_ERROR] {parse_err} / raw={line!r}")
+            data = resp.json()
+            tr.json("[RAW_RESPONSE]", data)
+
+            content = data.get("message", {}).get("content", "")
+            tr.text("[ASSISTANT_COMPLETE]", content)
+            if key is not None and content:
+                self.cache.put(key, self.model, content)
+            return content or "[Pas de réponse]"
+        except Exception as e:
+            tr.error(f"[ERROR] {e}")
+            return "[Erreur de connexion à Ollama]"
+
+    def chat_stream(self, prompt_or_messages, on_token_callback, cancel_token=None):
+        """
+        Stream la réponse token par token vers on_token_callback.
+        Retourne les stats finales d'Ollama : {"model", "tokens": {"prompt", "completion"}}
+        (dict vide si indisponibles ou si cancel_token a été annulé).
+        """
+        payload = {
+            "model": self.model,
+            "messages": _as_messages(prompt_or_messages),
+            "stream": True
+        }
+
+        tr = start_request()
+        tr.line(f"[OUTGOING] POST {self.url} (stream=True)")
+        tr.json("[PAYLOAD]", payload)
+
+        collected = []
+        stats = {}
+        if _is_cancelled(cancel_token):
+            return stats
+        try:
+            with self._post(payload, stream=True, cancel_token=cancel_token) as resp:
+                if cancel_token is not None:
+                    cancel_token.bind(lambda: _abort_response(resp))
+                tr.line(f"[HTTP] status={resp.status_code} (stream)")
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if _is_cancelled(cancel_token):
+                        break
+                    if not line:
+                        continue
+                    try:
+                        data = line.decode("utf-8").strip()
+                        if data.startswith("data: "):
+                            data = data[6:]
+                        parsed = json.loads(data)
+                    except Exception as parse_err:
+                        tr.error(f"[STREAM_PARSE_ERROR] {parse_err} / raw={line[:200]!r}")
+                        continue
+
+                    token = parsed.get("message", {}).get("content", "")
+                    if token:
+                        collected.append(token)
+                        tr.token(token)
+                        on_token_callback(token)
+
+                    if parsed.get("done"):
+                        stats = {
+                            "model": parsed.get("model", self.model),
+                            "tokens": {
+                                "prompt": parsed.get("prompt_eval_count", 0),
+                                "completion": parsed.get("eval_count", 0),
+                            },
+                        }
+
+            # réponse complète après le stream
+            full_text = "".join(collected)
+            if _is_cancelled(cancel_token):
+                tr.text("[CANCELLED]", full_text)
+                return {}
+            tr.text("[ASSISTANT_COMPLETE]", full_text)
+        except Exception as e:
+            if _is_cancelled(cancel_token):
+                tr.text("[CANCELLED]", "".join(collected))
+                return {}
+            tr.error(f"[ERROR] {e}")
+            on_token_callback("\n[Erreur de connexion à Ollama]")
+        finally:
+            if cancel_token is not None:
+                cancel_token.unbind()
+        return stats
+
+# Cache des réponses (OLLAMA_CACHE_MODE) partagé par les clients du process
+_response_cache = _cache_from_config()
+
+# Client partagé du process (connexions réutilisées entre toutes les requêtes)
+_client = OllamaClient(cache=_response_cache)
+
+def get_client():
+    return _client
+
+def query_ollama(prompt_or_messages, options=None, force_cache=None):
+    return _client.chat(prompt_or_messages, options, force_cache)
+
+def query_ollama_stream(prompt_or_messages, on_token_callback, cancel_token=None):
+    """
+    Stream la réponse token par token vers on_token_callback.
+    Retourne les stats finales d'Ollama : {"model", "tokens": {"prompt", "completion"}}
+    (dict vide si indisponibles).
+    cancel_token (CancelToken) : cancel() interrompt la génération et ferme la connexion.
+    """
+    return _client.chat_stream(prompt_or_messages, on_token_callback, cancel_token)
+
+
+# === Client asyncio (sans thread par requête) ===
+
+class _Connection:
+    """Connexion HTTP/1.1 keep-alive, liée à la boucle asyncio qui l'a ouverte."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+class AsyncOllamaClient:
+    """
+    Client Ollama asyncio (HTTP/1.1 via asyncio.open_connection, stdlib seule) :
+    - `async for token in client.stream_chat(messages)` / `await client.chat(messages)`
+    - connexions keep-alive réutilisées (au plus pool_size au repos)
+    - annulation (tâche annulée ou boucle `async for` interrompue) : la connexion
+      est fermée, Ollama arrête la génération
+    - 502/503/504 : requête renvoyée (au plus max_retries fois), comme OllamaClient
+    Mêmes messages d'erreur que OllamaClient. Python 3.11+ (asyncio.timeout) :
+    wait_for n'est pas un substitut, il peut perdre une annulation venue d'un
+    autre thread (bouton Stop) ; version vérifiée au lancement (main.py).
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=OLLAMA_MODEL, pool_size=OLLAMA_POOL_SIZE,
+                 connect_timeout=OLLAMA_CONNECT_TIMEOUT, read_timeout=OLLAMA_READ_TIMEOUT,
+                 max_retries=OLLAMA_MAX_RETRIES, cache=None):
+        parts = urlsplit(url)
+        self.url = url
+        self.model = model
+        self.cache = cache
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = parts.scheme == "https"
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self._idle = []
+
+    # --- connexions ---
+    async def _acquire(self):
+        loop = asyncio.get_running_loop()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.loop is loop and not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+        reader, writer = await self._timed(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl or None),
+            self.connect_timeout,
+        )
+        return _Connection(reader, writer), False
+
+    def _release(self, conn):
+        if len(self._idle) < self.pool_size:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    async def aclose(self):
+        while self._idle:
+            self._idle.pop().close()
+
+    @staticmethod
+    async def _timed(aw, delay):
+        # asyncio.timeout plutôt que wait_for : une annulation arrivant pendant
+        # que la lecture se termine n'est pas perdue (Python 3.11)
+        async with asyncio.timeout(delay):
+            return await aw
+
+    async def _readline(self, conn):
+        return await self._timed(conn.reader.readline(), self.read_timeout)
+
+    # --- HTTP ---
+    async def _send(self, payload, cancel_token=None):
+        """Envoie la requête ; retourne (connexion, status, en-têtes)."""
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("ascii")
+        while True:
+            conn, reused = await self._acquire()
+            if cancel_token is not None:
+                # cancel() peut venir d'un autre thread : fermeture sur la boucle de la connexion
+                cancel_token.bind(lambda c=conn: c.loop.call_soon_threadsafe(c.close))
+            try:
+                conn.writer.write(head + body)
+                await conn.writer.drain()
+                status_line = await self._readline(conn)
+            except TimeoutError:
+                conn.close()
+                raise
+            except OSError:
+                conn.close()
+                if reused and not _is_cancelled(cancel_token):
+                    continue  # connexion au repos fermée par le serveur entre-temps
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if not status_line:
+                conn.close()
+                if reused and not _is_cancelled(cancel_token):
                     continue
+                raise ConnectionError("connexion fermée par le serveur")
+            break
+        try:
+            status = int(status_line.split(None, 2)[1])
+            headers = {}
+            while True:
+                line = await self._readline(conn)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            conn.close()
+            raise
+        return conn, status, headers
+
+    async def _iter_body(self, conn, headers):
+        """Morceaux du corps (chunked, Content-Length ou jusqu'à la fermeture)."""
+        reader = conn.reader
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size_line = await self._readline(conn)
+                if not size_line:
+                    raise ConnectionError("réponse tronquée")
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    while (await self._readline(conn)) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    return
+                yield await self._timed(reader.readexactly(size), self.read_timeout)
+                await self._readline(conn)
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining > 0:
+                data = await self._timed(reader.read(min(remaining, 65536)), self.read_timeout)
+                if not data:
+                    raise ConnectionError("réponse tronquée")
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await self._timed(reader.read(65536), self.read_timeout)
+                if not data:
+                    return
+                yield data
+
+    @staticmethod
+    def _reusable(headers):
+        framed = "content-length" in headers or "chunked" in headers.get("transfer-encoding", "").lower()
+        return framed and headers.get("connection", "").lower() != "close"
+
+    async def _post(self, payload, tr, cancel_token=None):
+        """
+        Génère les lignes (bytes) de la réponse ; connexion rendue au pool si lue en entier.
+        502/503/504 : renvoyée avant toute lecture du corps (au plus max_retries fois).
+        """
+        for attempt in range(self.max_retries + 1):
+            conn, status, headers = await self._send(payload, cancel_token)
+            if status not in _RETRY_STATUSES or attempt == self.max_retries or _is_cancelled(cancel_token):
+                break
+            conn.close()  # corps non lu : connexion abandonnée
+            tr.line(f"[HTTP] status={status}, nouvelle tentative")
+            await asyncio.sleep(_RETRY_BACKOFF * (2 ** attempt))
+        done = False
+        try:
+            tr.line(f"[HTTP] status={status}" + (" (stream)" if payload.get("stream") else ""))
+            if status >= 400:
+                raise ConnectionError(f"HTTP {status}")
+            buffer = b""
+            async for data in self._iter_body(conn, headers):
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    yield line
+            if buffer:
+                yield buffer
+            done = True
+        finally:
+            if done and self._reusable(headers):
+                self._release(conn)
+            else:
+                conn.close()
+
+    # --- API ---
+    async def chat(self, prompt_or_messages, options=None, force_cache=None):
+        messages = _as_messages(prompt_or_messages)
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        }
+        if options:
+            payload["options"] = options
+
+        tr = start_request()
+        key, cached = None, None
+        if self.cache is not None:
+            key, cached = await asyncio.to_thread(
+                _cache_lookup, self.cache, tr, self.model, messages, options, force_cache
+            )
+        if cached is not None:
+            return cached
+        tr.line(f"[OUTGOING] POST {self.url} (async)")
+        tr.json("[PAYLOAD]", payload)
+
+        try:
+            raw = b""
+            async with aclosing(self._post(payload, tr)) as lines:
+                async for line in lines:
+                    raw += line + b"\n"
+            data = json.loads(raw)
+            tr.json("[RAW_RESPONSE]", data)
+
+            content = data.get("message", {}).get("content", "")
+            tr.text("[ASSISTANT_COMPLETE]", content)
+            if key is not None and content:
+                await asyncio.to_thread(self.cache.put, key, self.model, content)
+            return content or "[Pas de réponse]"
+        except Exception as e:
+            tr.error(f"[ERROR] {e}")
+            return "[Erreur de connexion à Ollama]"
+
+    async def stream_chat(self, prompt_or_messages, stats=None, cancel_token=None,
+                          options=None, force_cache=None):
+        """
+        Génère la réponse token par token. Si `stats` (dict) est fourni, il reçoit
+        les stats finales d'Ollama : {"model", "tokens": {"prompt", "completion"}}.
+        cancel_token (CancelToken) : cancel() ferme la connexion, le flux s'arrête sans erreur.
+        options déterministes (ou force_cache) : réponse servie par le cache en un
+        seul morceau, réponse complète mise en cache.
+        """
+        messages = _as_messages(prompt_or_messages)
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }
+        if options:
+            payload["options"] = options
+
+        tr = start_request()
+        key, cached = None, None
+        if self.cache is not None:
+            key, cached = await asyncio.to_thread(
+                _cache_lookup, self.cache, tr, self.model, messages, options, force_cache
+            )
+        if cached is not None:
+            if stats is not None:
+                stats["model"] = self.model
+            yield cached
+            return
+        tr.line(f"[OUTGOING] POST {self.url} (async, stream=True)")
+        tr.json("[PAYLOAD]", payload)
+
+        collected = []
+        if _is_cancelled(cancel_token):
+            return
+        try:
+            async with aclosing(self._post(payload, tr, cancel_token)) as lines:
+                async for line in lines:
+                    if _is_cancelled(cancel_token):
+                        break
+                    if not line.strip():
+                        continue
+                    try:
+                        data = line.decode("utf-8").strip()
+                        if data.startswith("data: "):
+                            data = data[6:]
+                        parsed = json.loads(data)
+                    except Exception as parse_err:
+                        tr.error(f"[STREAM_PARSE_ERROR] {parse_err} / raw={line[:200]!r}")
+                        continue
+
+                    token = parsed.get("message", {}).get("content", "")
+                    if token:
+                        collected.append(token)
+                        tr.token(token)
+                        yield token
+
+                    if parsed.get("done") and stats is not None:
+                        stats.update({
+                            "model": parsed.get("model", self.model),
+                            "tokens": {
+                                "prompt": parsed.get("prompt_eval_count", 0),
+                                "completion": parsed.get("eval_count", 0),
+                            },
+                        })
+
+            if _is_cancelled(cancel_token):
+                tr.text("[CANCELLED]", "".join(collected))
+                return
+            tr.text("[ASSISTANT_COMPLETE]", "".join(collected))
+            if key is not None and collected:
+                await asyncio.to_thread(self.cache.put, key, self.model, "".join(collected))
+        except Exception as e:
+            if _is_cancelled(cancel_token):
+                tr.text("[CANCELLED]", "".join(collected))
+                return
+            tr.error(f"[ERROR] {e}")
+            yield "\n[Erreur de connexion à Ollama]"
+        finally:
+            if cancel_token is not None:
+                cancel_token.unbind()
+
+_async_client = AsyncOllamaClient(cache=_response_cache)
+
+def get_async_client():
+    return _async_client
+
+async def chat(prompt_or_messages, options=None, force_cache=None):
+    return await _async_client.chat(prompt_or_messages, options, force_cache)
+
+async def stream_chat(prompt_or_messages, stats=None, cancel_token=None, options=None, force_cache=None):
+    async with aclosing(_async_client.stream_chat(prompt_or_messages, stats, cancel_token,
+                                                  options, force_cache)) as tokens:
+        async for token in tokens:
+            yield token
+
+class AsyncBridge:
+    """
+    Boucle asyncio unique dans un thread de fond, partagée par l'interface :
+    submit(coro) retourne un concurrent.futures.Future (result(), cancel()).
+    Annuler le Future annule la coroutine (et ferme son flux HTTP).
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop, ready), name="ollama-asyncio", daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    @staticmethod
+    def _run(loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+_bridge = AsyncBridge()
 
-                token = parsed.get("message", {}).get("content", "")
-                if token:
-                    collected.append(token)
-                    _trace(f"[TOKEN] {token}")
-                    on_token_callback(token)
-
-        # réponse complète après le stream
-        full_text = "".join(collected)
-        _trace(f"[ASSISTANT_COMPLETE] {full_text}")
-    except Exception as e:
-        _trace(f"[ERROR] {e}")
-        on_token_callback("\n[Erreur de connexion à Ollama]")
+def get_bridge():
+    return _bridge
@@ -0,0 +1,149 @@
+"""
+response_cache.py
+Cache disque des réponses Ollama pour les requêtes déterministes
+(évals, raccourcis de dev : mêmes prompts rejoués) :
+- clé = sha256 canonique de (modèle, messages, options)
+- seulement si temperature <= 0 dans les options, sauf force=True
+  (sans option, Ollama échantillonne : réponses non reproductibles)
+- un fichier JSON par réponse, écriture atomique ; éviction LRU
+  (date de dernier accès) au-delà de max_bytes
+- mode "replay" : aucune requête réseau, absence du cache = erreur
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from config import OLLAMA_CACHE_MODE, OLLAMA_CACHE_DIR, OLLAMA_CACHE_MAX_BYTES, OLLAMA_CACHE_FORCE
+
+MODE_OFF = "off"
+MODE_ON = "on"
+MODE_REPLAY = "replay"
+ENTRY_EXT = ".json"
+
+def cache_key(model, messages, options=None):
+    """Empreinte canonique (clés triées, séparateurs fixes) de la requête."""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "options": options or {}},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def is_deterministic(options):
+    temperature = (options or {}).get("temperature")
+    return temperature is not None and float(temperature) <= 0
+
+class ResponseCache:
+    """Réponses par clé dans `directory` (sous-dossiers par 2 premiers caractères)."""
+
+    def __init__(self, directory=OLLAMA_CACHE_DIR, max_bytes=OLLAMA_CACHE_MAX_BYTES,
+                 mode=MODE_ON, force=OLLAMA_CACHE_FORCE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # clé -> (taille, dernier accès), chargé au premier besoin
+        self._entries = None
+        self._total = 0
+
+    @property
+    def replay_only(self):
+        return self.mode == MODE_REPLAY
+
+    def key_for(self, model, messages, options=None, force=None):
+        """Clé de la requête, ou None si elle ne doit pas passer par le cache."""
+        if not (is_deterministic(options) or (self.force if force is None else force)):
+            return None
+        return cache_key(model, messages, options)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_EXT)
+
+    def _load_entries(self):
+        if self._entries is not None:
+            return
+        self._entries, self._total = {}, 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(ENTRY_EXT):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._entries[name[:-len(ENTRY_EXT)]] = (st.st_size, st.st_mtime)
+                self._total += st.st_size
+
+    def get(self, key):
+        """Réponse en cache (str) ou None ; un accès rafraîchit l'entrée (LRU)."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                content = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            self.hits += 1
+            if self._entries is not None and key in self._entries:
+                self._entries[key] = (self._entries[key][0], now)
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return content
+
+    def put(self, key, model, response):
+        if self.replay_only:
+            return
+        data = json.dumps({"model": model, "response": response, "created": time.time()}, ensure_ascii=False)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            self._load_entries()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+                size = os.path.getsize(path)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                return
+            old = self._entries.get(key)
+            self._total += size - (old[0] if old else 0)
+            self._entries[key] = (size, time.time())
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, (size, _atime) in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._total -= size
+
+    def stats(self):
+        with self._lock:
+            self._load_entries()
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self._total, "max_bytes": self.max_bytes, "mode": self.mode}
+
+def from_config():
+    """Cache du process selon OLLAMA_CACHE_MODE ; None si désactivé."""
+    mode = str(OLLAMA_CACHE_MODE or MODE_OFF).strip().lower()
+    if mode not in (MODE_ON, MODE_REPLAY):
+        return None
+    return ResponseCache(mode=mode)